@@ -4,31 +4,34 @@ import streamlit as st
 st.set_page_config(page_title="Code Documentation Assistant", layout="wide")
 
 # Import everything else AFTER st.set_page_config
-import openai
-from config import OPENAI_API_KEY
+import importlib
+import uuid
 
-# Import UI modules
-from src.ui.project_tab import render_project_tab
-from src.ui.file_tab import render_file_tab
-from src.ui.snippet_tab import render_snippet_tab
-from src.ui.chat_tab import render_chat_tab
+from src.core.chunk_store import ChunkStore
 
-# Initialize OpenAI
-openai.api_key = OPENAI_API_KEY
+# UI sections and the module/function rendering each one. Modules are imported
+# when their section is first shown.
+TABS = {
+    "Project Documentation": ("src.ui.project_tab", "render_project_tab"),
+    "File Documentation": ("src.ui.file_tab", "render_file_tab"),
+    "Code Snippet Documentation": ("src.ui.snippet_tab", "render_snippet_tab"),
+    "Code Chatbot": ("src.ui.chat_tab", "render_chat_tab"),
+}
 
 st.title("📄 Code Documentation Assistant")
 
-# Initialize session state variables
-if 'processed_chunks' not in st.session_state:
-    st.session_state.processed_chunks = []
+# Each browser session indexes its uploads in its own vector store namespaces;
+# namespaces unused past their TTL are dropped in the background when an ingest starts
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'project_namespace' not in st.session_state:
+    st.session_state.project_namespace = None
+if 'files_namespace' not in st.session_state:
+    st.session_state.files_namespace = None
 
-# Add separate chunk storages for different sources
-if 'project_chunks' not in st.session_state:
-    st.session_state.project_chunks = []
-if 'file_chunks' not in st.session_state:
-    st.session_state.file_chunks = []
-if 'snippet_chunks' not in st.session_state:
-    st.session_state.snippet_chunks = []
+# All processed chunks, indexed by source (project / files / snippets) and file
+if 'chunk_store' not in st.session_state:
+    st.session_state.chunk_store = ChunkStore()
 
 # Initialize documentation storage
 if 'file_documentation' not in st.session_state:
@@ -44,36 +47,27 @@ if 'selected_uploaded_files' not in st.session_state:
 if 'selected_snippet_files' not in st.session_state:
     st.session_state.selected_snippet_files = []
 
-# Initialize file list variables
-if 'available_files' not in st.session_state:
-    st.session_state.available_files = []
-if 'project_files' not in st.session_state:
-    st.session_state.project_files = []
-if 'uploaded_files' not in st.session_state:
-    st.session_state.uploaded_files = []
-if 'snippet_files' not in st.session_state:
-    st.session_state.snippet_files = []
-
 # Project documentation variables
 if 'project_summary' not in st.session_state:
     st.session_state.project_summary = None
 if 'project_documentation' not in st.session_state:
     st.session_state.project_documentation = None
 
-# Create tabs for the main interface
-project_tab, doc_tab, code_paste_tab, chat_tab = st.tabs([
-    "Project Documentation",
-    "File Documentation",
-    "Code Snippet Documentation",
-    "Code Chatbot"
-])
+# Neighbour lists precomputed at ingest for documentation context
+if 'project_neighbours' not in st.session_state:
+    st.session_state.project_neighbours = None
+if 'file_neighbours' not in st.session_state:
+    st.session_state.file_neighbours = None
+
+# Tab-style navigation for the main interface. Unlike st.tabs, which executes
+# every tab on each rerun, only the selected section's code runs.
+active_tab = st.radio(
+    "Section",
+    list(TABS),
+    horizontal=True,
+    key="active_tab",
+    label_visibility="collapsed"
+)
 
-# Render each tab with its own module
-with project_tab:
-    render_project_tab()
-with doc_tab:
-    render_file_tab()
-with code_paste_tab:
-    render_snippet_tab()
-with chat_tab:
-    render_chat_tab()
\ No newline at end of file
+module_name, render_name = TABS[active_tab]
+getattr(importlib.import_module(module_name), render_name)()
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Benchmark memory versus recall@k for the local vector store storage modes.
+
+Usage:
+    python benchmarks/bench_quantization.py [--vectors embeddings.npy] [--n 50000] [--k 10]
+
+Without --vectors a synthetic clustered dataset with embedding-like statistics
+is generated. Recall@k is measured against exact float32 search, both for the
+first-pass (compact) scores alone and after exact re-ranking.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.quantization import VectorCodec
+from src.core.local_vector_store import LocalVectorPartition
+
+CONFIGS = [
+    ('float32', None),
+    ('float16', None),
+    ('int8', None),
+    ('float16', 512),
+    ('int8', 512),
+    ('int8', 256),
+]
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 500, seed: int = 0) -> np.ndarray:
+    """Generate clustered unit vectors roughly resembling code embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.8 * rng.normal(size=(n, dim))
+    # Embedding models concentrate variance in leading dimensions
+    vectors *= np.linspace(1.5, 0.5, dim)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def recall(found, expected) -> float:
+    """Mean fraction of the expected ids found per query."""
+    return float(np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vectors', help="Optional .npy file of real embeddings (one per row)")
+    parser.add_argument('--n', type=int, default=50000, help="Number of synthetic vectors")
+    parser.add_argument('--dim', type=int, default=1536, help="Dimension of synthetic vectors")
+    parser.add_argument('--queries', type=int, default=200, help="Number of queries")
+    parser.add_argument('--k', type=int, default=10, help="k for recall@k")
+    args = parser.parse_args()
+
+    if args.vectors:
+        data = np.load(args.vectors).astype(np.float32)
+    else:
+        data = synthetic_vectors(args.n, args.dim)
+    dim = data.shape[1]
+    rng = np.random.default_rng(1)
+    queries = data[rng.choice(len(data), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    records = [{'id': str(i), 'values': data[i], 'metadata': {}} for i in range(len(data))]
+
+    exact = LocalVectorPartition(dim, ann_min_vectors=len(data) + 1)
+    exact.upsert(records)
+    expected = [[m['id'] for m in exact.query(q, args.k)] for q in queries]
+
+    print(f"{len(data)} vectors x {dim} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'storage':>8} {'dims':>5} {'bytes/vec':>10} {'vs f32':>7} {'first-pass':>11} {'re-ranked':>10} {'ms/query':>9}")
+    for storage, search_dims in CONFIGS:
+        if search_dims and search_dims >= dim:
+            continue
+        codec = VectorCodec(dim, storage, search_dims)
+        store = LocalVectorPartition(dim, ann_min_vectors=len(data) + 1, storage=storage, search_dims=search_dims)
+        store.upsert(records)
+
+        # First-pass recall: rank by compact scores only
+        codes, scales = store._matrix[:len(store)], store._scales[:len(store)]
+        first_pass = []
+        for q in queries:
+            scores = codec.scores(codes, scales, codec.project(q)[0])
+            top = np.argsort(-scores)[:args.k]
+            first_pass.append([store._ids[row] for row in top])
+
+        started = time.perf_counter()
+        reranked = [[m['id'] for m in store.query(q, args.k)] for q in queries]
+        ms_per_query = (time.perf_counter() - started) * 1000 / len(queries)
+
+        print(f"{storage:>8} {codec.search_dims:>5} {codec.bytes_per_vector:>10} "
+              f"{codec.bytes_per_vector / (dim * 4):>6.1%} {recall(first_pass, expected):>11.3f} "
+              f"{recall(reranked, expected):>10.3f} {ms_per_query:>9.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure the import time of the app entry point with `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_startup.py [--entry app.py] [--budget-ms 250] [--top 15]
+
+The modules imported at the top level of the entry script are imported in a
+fresh interpreter. Streamlit is imported first and reported separately, since
+`streamlit run` pays for it before the app starts; the remaining import time
+is what the app adds to every cold start and is checked against the budget.
+Exits with status 1 when the budget is exceeded.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import time the app may add on top of Streamlit itself
+IMPORT_BUDGET_MS = 250
+
+# Written to stderr before the entry imports, separating them from interpreter startup
+_MARKER = "--entry-imports--"
+
+def entry_modules(path: str) -> List[str]:
+    """Return the modules imported at module level by an entry script, in order."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    # Imports nested in with/if blocks still run at startup; ones inside functions don't
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop(0)
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+        elif isinstance(node, (ast.With, ast.If, ast.Try)):
+            nodes[:0] = [child for child in ast.iter_child_nodes(node) if isinstance(child, ast.stmt)]
+    return list(dict.fromkeys(modules))
+
+def measure(modules: List[str]) -> List[Tuple[str, int, int, int]]:
+    """
+    Import modules in a fresh interpreter and parse its -X importtime report.
+
+    Returns:
+        List of (module, self_us, cumulative_us, depth) in report order
+    """
+    code = "; ".join([f"import sys; sys.stderr.write({_MARKER!r} + '\\n')"] + [f"import {m}" for m in modules])
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f"Importing the entry modules failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    report = result.stderr.splitlines()
+    for line in report[report.index(_MARKER) + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Names are indented by one space plus two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entry', default=os.path.join(ROOT, "app.py"), help="Entry script to analyze")
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS, help="Budget for the app's own imports")
+    parser.add_argument('--top', type=int, default=15, help="Number of slowest modules to list")
+    args = parser.parse_args()
+
+    modules = entry_modules(args.entry)
+    framework = [m for m in modules if m.split('.')[0] == "streamlit"]
+    rows = measure(framework + [m for m in modules if m not in framework])
+
+    # Top-level rows carry the cumulative time of everything they pulled in
+    top_level: Dict[str, int] = {name: cumulative for name, _, cumulative, depth in rows if depth == 0}
+    framework_ms = sum(us for name, us in top_level.items() if name.split('.')[0] == "streamlit") / 1000
+    app_ms = sum(us for name, us in top_level.items() if name.split('.')[0] != "streamlit") / 1000
+
+    print(f"Entry point: {os.path.relpath(args.entry, ROOT)} ({len(modules)} top-level imports)")
+    print(f"{'module':<50} {'cumulative ms':>14}")
+    for name, us in top_level.items():
+        print(f"{name:<50} {us / 1000:>14.1f}")
+
+    print("\nSlowest modules by self time:")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{name:<50} {self_us / 1000:>8.1f} ms self {cumulative_us / 1000:>8.1f} ms cumulative")
+
+    print(f"\nstreamlit: {framework_ms:.1f} ms, app imports: {app_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if app_ms > args.budget_ms:
+        print("Import-time budget exceeded")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
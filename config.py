@@ -3,59 +3,101 @@ import os
 from pathlib import Path
 import sys
 
-# Flag to determine if we're using Streamlit secrets or local config
-using_secrets = False
-
-# First try to get credentials from Streamlit secrets
-try:
-    import streamlit as st
-    # Try accessing secrets
-    OPENAI_API_KEY = st.secrets["openai"]["api_key"]
-    PINECONE_API_KEY = st.secrets["pinecone"]["api_key"]
-    PINECONE_INDEX = st.secrets["pinecone"]["index"]
-    print("Successfully loaded credentials from Streamlit secrets")
-    using_secrets = True
-except (ImportError, FileNotFoundError, KeyError) as e:
-    print(f"Could not load from Streamlit secrets: {e}")
+# Credentials (OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX) are loaded on first
+# access rather than at import time, so importing config stays cheap
+_CREDENTIAL_NAMES = ("OPENAI_API_KEY", "PINECONE_API_KEY", "PINECONE_INDEX", "using_secrets")
+
+def _load_credentials():
+    """Load API credentials from Streamlit secrets, falling back to config.ini."""
+    global OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX, using_secrets
+
+    # Flag to determine if we're using Streamlit secrets or local config
     using_secrets = False
 
-# Only try to use config.ini if secrets didn't work
-if not using_secrets:
-    # Use config.ini approach for local development
-    cfg = configparser.ConfigParser()
-    config_path = Path(__file__).parent / "config.ini"
+    # First try to get credentials from Streamlit secrets
+    try:
+        import streamlit as st
+        # Try accessing secrets
+        OPENAI_API_KEY = st.secrets["openai"]["api_key"]
+        PINECONE_API_KEY = st.secrets["pinecone"]["api_key"]
+        PINECONE_INDEX = st.secrets["pinecone"]["index"]
+        print("Successfully loaded credentials from Streamlit secrets")
+        using_secrets = True
+    except (ImportError, FileNotFoundError, KeyError) as e:
+        print(f"Could not load from Streamlit secrets: {e}")
+        using_secrets = False
+
+    # Only try to use config.ini if secrets didn't work
+    if not using_secrets:
+        # Use config.ini approach for local development
+        cfg = configparser.ConfigParser()
+        config_path = Path(__file__).parent / "config.ini"
     
-    # Check if config.ini exists
-    if not config_path.exists():
-        print(f"WARNING: config.ini not found at {config_path}")
-        print("Setting empty API keys - application will not function correctly")
-        OPENAI_API_KEY = ""
-        PINECONE_API_KEY = ""
-        PINECONE_INDEX = ""
-    else:
-        # Read the config file
-        cfg.read(config_path)
+        # Check if config.ini exists
+        if not config_path.exists():
+            print(f"WARNING: config.ini not found at {config_path}")
+            print("Setting empty API keys - application will not function correctly")
+            OPENAI_API_KEY = ""
+            PINECONE_API_KEY = ""
+            PINECONE_INDEX = ""
+        else:
+            # Read the config file
+            cfg.read(config_path)
         
-        try:
-            # OpenAI
-            OPENAI_API_KEY = cfg["openai"]["api_key"]
-            if OPENAI_API_KEY == "your_openai_api_key_here":
-                print("ERROR: Please set your actual OpenAI API key in config.ini")
+            try:
+                # OpenAI
+                OPENAI_API_KEY = cfg["openai"]["api_key"]
+                if OPENAI_API_KEY == "your_openai_api_key_here":
+                    print("ERROR: Please set your actual OpenAI API key in config.ini")
                 
-            # Pinecone
-            PINECONE_API_KEY = cfg["pinecone"]["api_key"]
-            if PINECONE_API_KEY == "your_pinecone_api_key_here":
-                print("ERROR: Please set your actual Pinecone API key in config.ini")
+                # Pinecone
+                PINECONE_API_KEY = cfg["pinecone"]["api_key"]
+                if PINECONE_API_KEY == "your_pinecone_api_key_here":
+                    print("ERROR: Please set your actual Pinecone API key in config.ini")
                 
-            PINECONE_INDEX = cfg["pinecone"]["index"]
-            if PINECONE_INDEX == "your_pinecone_index_name_here":
-                print("ERROR: Please set your actual Pinecone index name in config.ini")
+                PINECONE_INDEX = cfg["pinecone"]["index"]
+                if PINECONE_INDEX == "your_pinecone_index_name_here":
+                    print("ERROR: Please set your actual Pinecone index name in config.ini")
                 
-            print("Successfully loaded credentials from config.ini")
+                print("Successfully loaded credentials from config.ini")
             
-        except KeyError as e:
-            print(f"ERROR: Missing required configuration in config.ini: {e}")
-            print("Setting empty API keys - application will not function correctly")
-            OPENAI_API_KEY = ""
-            PINECONE_API_KEY = ""
-            PINECONE_INDEX = ""
\ No newline at end of file
+            except KeyError as e:
+                print(f"ERROR: Missing required configuration in config.ini: {e}")
+                print("Setting empty API keys - application will not function correctly")
+                OPENAI_API_KEY = ""
+                PINECONE_API_KEY = ""
+                PINECONE_INDEX = ""
+
+def __getattr__(name):
+    # Module-level __getattr__ only runs for names not yet defined, i.e. before the first load
+    if name in _CREDENTIAL_NAMES:
+        _load_credentials()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Local directory for persistent caches (ingest manifests, embeddings, ...)
+CACHE_DIR = os.environ.get("CODE_DOC_CACHE_DIR", str(Path(__file__).parent / ".cache"))
+
+# Vector index backend: "pinecone" (hosted) or "local" (in-process NumPy store under CACHE_DIR)
+VECTOR_STORE_BACKEND = os.environ.get("VECTOR_STORE_BACKEND", "pinecone")
+
+# Local vector store search matrix: "float32", "float16" or "int8", optionally truncated to N dims
+LOCAL_VECTOR_STORAGE = os.environ.get("LOCAL_VECTOR_STORAGE", "float32")
+LOCAL_VECTOR_SEARCH_DIMS = int(os.environ["LOCAL_VECTOR_SEARCH_DIMS"]) if os.environ.get("LOCAL_VECTOR_SEARCH_DIMS") else None
+
+# Namespaces (projects / sessions) not used for this many hours are garbage-collected
+NAMESPACE_TTL_HOURS = float(os.environ.get("NAMESPACE_TTL_HOURS", "168"))
+
+# Number of vector index upsert requests in flight at once
+UPSERT_CONCURRENCY = int(os.environ.get("UPSERT_CONCURRENCY", "4"))
+
+# Estimated tokens of code the chatbot may put into one prompt; larger selections are retrieved from
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get("CHAT_CONTEXT_TOKEN_BUDGET", "12000"))
+
+# Process-wide limits on concurrent LLM calls and context retrievals during documentation generation
+DOC_LLM_CONCURRENCY = int(os.environ.get("DOC_LLM_CONCURRENCY", "8"))
+DOC_RETRIEVAL_CONCURRENCY = int(os.environ.get("DOC_RETRIEVAL_CONCURRENCY", "4"))
+
+# LLM response cache: total size of cached responses and maximum age of an entry
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+LLM_CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30"))
@@ -0,0 +1,139 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+# Rows scored per matrix product when assigning vectors to centroids
+_ASSIGN_BLOCK = 65536
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Return the index of the most similar centroid for every (normalized) vector."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_BLOCK):
+        block = vectors[start:start+_ASSIGN_BLOCK]
+        assignments[start:start+len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest neighbour index over unit vectors.
+
+    Vectors are clustered around n_lists coarse centroids (spherical k-means).
+    A query only scores the vectors in its n_probe closest lists, so a query
+    costs roughly O(n_lists + N * n_probe / n_lists) dot products instead of O(N).
+    Raising n_probe trades latency for recall.
+
+    The index stores row numbers of the owning matrix, not the vectors
+    themselves; callers keep it in sync with assign() and remove().
+    """
+
+    def __init__(self, n_lists: int, n_probe: int = 8):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._row_list: Dict[int, int] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._row_list)
+
+    def train(self, vectors: np.ndarray, iterations: int = 10, sample_size: int = 100000, seed: int = 0) -> None:
+        """
+        Learn the coarse centroids from (a sample of) the vectors.
+
+        Args:
+            vectors: Unit-length float32 vectors, one per row
+            iterations: Number of k-means iterations
+            sample_size: Maximum number of vectors used for training
+            seed: Random seed for sampling and initialization
+        """
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        n_lists = min(self.n_lists, len(vectors))
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = _nearest_centroids(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=n_lists)
+            # Re-seed empty clusters with random vectors
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        self.n_lists = n_lists
+        self.centroids = centroids.astype(np.float32)
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+        self._row_list = {}
+
+    def assign(self, rows: List[int], vectors: np.ndarray) -> None:
+        """
+        Add (or re-add) matrix rows to the lists of their nearest centroids.
+
+        Args:
+            rows: Row numbers in the owning matrix
+            vectors: The vectors stored at those rows
+        """
+        if not len(rows):
+            return
+        for row, list_id in zip(rows, _nearest_centroids(vectors, self.centroids).tolist()):
+            if row in self._row_list:
+                self.remove(row)
+            self._lists[list_id].append(row)
+            self._list_arrays[list_id] = None
+            self._row_list[row] = list_id
+
+    def remove(self, row: int) -> None:
+        """Remove a matrix row from the index if present."""
+        list_id = self._row_list.pop(row, None)
+        if list_id is not None:
+            self._lists[list_id].remove(row)
+            self._list_arrays[list_id] = None
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """
+        Return the rows in the lists closest to the query.
+
+        Args:
+            query: Unit-length query vector
+            n_probe: Number of lists to scan (defaults to self.n_probe)
+
+        Returns:
+            Array of candidate row numbers
+        """
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        scores = self.centroids @ query
+        probe = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        arrays = []
+        for list_id in probe:
+            if self._list_arrays[list_id] is None:
+                self._list_arrays[list_id] = np.array(self._lists[list_id], dtype=np.int64)
+            arrays.append(self._list_arrays[list_id])
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+
+    def save(self, path) -> None:
+        """Write the centroids and row assignments to path (.npz) or a binary file object."""
+        rows = np.fromiter(self._row_list.keys(), dtype=np.int64, count=len(self._row_list))
+        lists = np.fromiter(self._row_list.values(), dtype=np.int32, count=len(self._row_list))
+        np.savez(path, centroids=self.centroids, rows=rows, lists=lists, n_probe=self.n_probe)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load an index written by save()."""
+        data = np.load(path)
+        index = cls(len(data['centroids']), int(data['n_probe']))
+        index.centroids = data['centroids']
+        index._lists = [[] for _ in range(index.n_lists)]
+        index._list_arrays = [None] * index.n_lists
+        for row, list_id in zip(data['rows'].tolist(), data['lists'].tolist()):
+            index._lists[list_id].append(row)
+            index._row_list[row] = list_id
+        return index
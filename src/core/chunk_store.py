@@ -0,0 +1,275 @@
+import mmap
+import os
+import sys
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import CACHE_DIR
+
+# Where chunks in a session came from
+PROJECT_SOURCE = "project"
+FILES_SOURCE = "files"
+SNIPPETS_SOURCE = "snippets"
+SOURCES = (PROJECT_SOURCE, FILES_SOURCE, SNIPPETS_SOURCE)
+
+# Directory for the per-session code heap files (kept off tmpfs, which would be RAM)
+CODE_HEAP_DIR = os.path.join(CACHE_DIR, "code_heaps")
+# A heap is rewritten once more than this fraction of its bytes belongs to replaced chunks
+HEAP_COMPACT_RATIO = 0.5
+
+class CodeHeap:
+    """
+    Append-only file of UTF-8 code bodies, read back through a memory map.
+
+    The file is anonymous (deleted when closed or when the process exits), so
+    code bodies live in the OS page cache instead of the Python heap.
+    """
+
+    def __init__(self, directory: str = CODE_HEAP_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, text: str) -> Tuple[int, int]:
+        """Append a code body and return its (offset, length) in bytes."""
+        data = text.encode('utf-8')
+        with self._lock:
+            offset = self._size
+            self._file.seek(offset)
+            self._file.write(data)
+            self._size += len(data)
+        return offset, len(data)
+
+    def read(self, offset: int, length: int) -> str:
+        """Return the code body stored at offset."""
+        if not length:
+            return ""
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                # Remap to cover bytes appended since the last mapping
+                self._file.flush()
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length].decode('utf-8')
+
+    def close(self) -> None:
+        """Release the mapping and delete the file."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+
+class ChunkMetadata(Mapping):
+    """Read-only metadata mapping ('file', 'name', 'type') backed by a ChunkRecord's slots."""
+
+    __slots__ = ('_record',)
+    _KEYS = ('file', 'name', 'type')
+
+    def __init__(self, record: "ChunkRecord"):
+        self._record = record
+
+    def __getitem__(self, key: str) -> str:
+        if key in self._KEYS:
+            return getattr(self._record, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def copy(self) -> Dict[str, str]:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+class ChunkRecord:
+    """
+    Compact chunk: id and metadata fields in slots, code in a CodeHeap.
+
+    Supports the chunk-dictionary reads used across the app (chunk['id'],
+    chunk['code'], chunk['metadata']['file'], ...), so records can be passed
+    wherever chunk dictionaries are expected; the fields can also be read
+    directly (record.file). File paths are interned so all chunks of a file
+    share one string.
+    """
+
+    __slots__ = ('id', 'file', 'name', 'type', '_heap', '_offset', '_length', '_metadata')
+
+    def __init__(self, chunk: Dict[str, Any], heap: CodeHeap):
+        metadata = chunk['metadata']
+        self.id = chunk['id']
+        self.file = sys.intern(metadata['file'])
+        self.name = metadata['name']
+        self.type = sys.intern(metadata['type'])
+        self._heap = heap
+        self._offset, self._length = heap.append(chunk['code'])
+        self._metadata = None
+
+    @property
+    def code(self) -> str:
+        return self._heap.read(self._offset, self._length)
+
+    @property
+    def metadata(self) -> ChunkMetadata:
+        # Created on first access and reused, instead of building a dict per read
+        if self._metadata is None:
+            self._metadata = ChunkMetadata(self)
+        return self._metadata
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ('id', 'code', 'metadata'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+class ChunkStore:
+    """
+    Session-level collection of code chunks indexed by source and file.
+
+    The source -> files and (source, file) -> chunks indexes are updated on
+    every insert, so listing files or collecting the chunks of selected files
+    never scans the whole collection. Files and chunks keep insertion order.
+
+    Chunks are stored as ChunkRecords whose code lives in an append-only
+    CodeHeap, one per source. Replacing a source closes its heap outright;
+    a heap whose files are replaced one by one is compacted once replaced
+    chunks make up most of it.
+    """
+
+    def __init__(self):
+        # source -> file -> list of chunk records
+        self._files: Dict[str, Dict[str, List[ChunkRecord]]] = {source: {} for source in SOURCES}
+        self._size = 0
+        # Heaps are created on a source's first insert
+        self._heaps: Dict[str, CodeHeap] = {}
+        self._live_bytes = {source: 0 for source in SOURCES}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _heap(self, source: str) -> CodeHeap:
+        heap = self._heaps.get(source)
+        if heap is None:
+            heap = self._heaps[source] = CodeHeap()
+        return heap
+
+    def _insert(self, source: str, chunks: Iterable[Dict[str, Any]]) -> List[ChunkRecord]:
+        files = self._files[source]
+        heap = None
+        records = []
+        for chunk in chunks:
+            if heap is None:
+                heap = self._heap(source)
+            record = ChunkRecord(chunk, heap)
+            files.setdefault(record.file, []).append(record)
+            self._size += 1
+            self._live_bytes[source] += record._length
+            records.append(record)
+        return records
+
+    def _discard(self, source: str, records: List[ChunkRecord]) -> None:
+        self._size -= len(records)
+        self._live_bytes[source] -= sum(record._length for record in records)
+
+    def _maybe_compact(self, source: str) -> None:
+        """Copy a source's live code bodies into a fresh heap once the old one is mostly garbage."""
+        old_heap = self._heaps.get(source)
+        if (old_heap is None or len(old_heap) <= 1 << 20
+                or self._live_bytes[source] >= len(old_heap) * (1 - HEAP_COMPACT_RATIO)):
+            return
+        heap = self._heaps[source] = CodeHeap()
+        for records in self._files[source].values():
+            for record in records:
+                code = old_heap.read(record._offset, record._length)
+                record._heap = heap
+                record._offset, record._length = heap.append(code)
+        old_heap.close()
+
+    def replace_source(self, source: str, chunks: Iterable[Dict[str, Any]]) -> None:
+        """Replace every chunk of a source, e.g. when a new project is processed."""
+        for records in self._files[source].values():
+            self._discard(source, records)
+        self._files[source] = {}
+        # None of the heap's code is live any more, so its file is released at once
+        heap = self._heaps.pop(source, None)
+        if heap is not None:
+            heap.close()
+        self._insert(source, chunks)
+
+    def replace_files(self, source: str, chunks: List[Dict[str, Any]]) -> List[ChunkRecord]:
+        """Replace the chunks of the files the given chunks belong to, keeping other files; return the new records."""
+        files = self._files[source]
+        for file_name in {chunk['metadata']['file'] for chunk in chunks}:
+            self._discard(source, files.pop(file_name, []))
+        self._maybe_compact(source)
+        return self._insert(source, chunks)
+
+    def close(self) -> None:
+        """Drop every chunk and delete the heap files."""
+        for source in SOURCES:
+            self.replace_source(source, [])
+
+    def code_bytes(self) -> int:
+        """Return the bytes of code held by live chunks (stored in the heap files, not in RAM)."""
+        return sum(self._live_bytes.values())
+
+    def add(self, source: str, chunks: Iterable[Dict[str, Any]]) -> List[ChunkRecord]:
+        """Append chunks to a source and return their records."""
+        return self._insert(source, chunks)
+
+    def files(self, source: Optional[str] = None) -> List[str]:
+        """
+        List file names in insertion order.
+
+        Args:
+            source: Only list files of this source; all sources if not given
+
+        Returns:
+            List of distinct file names
+        """
+        sources = [source] if source else SOURCES
+        return list(dict.fromkeys(f for s in sources for f in self._files[s]))
+
+    def file_chunks(self, source: str, file_name: str) -> List[ChunkRecord]:
+        """Return the chunks of one file of a source."""
+        return self._files[source].get(file_name, [])
+
+    def chunks(self, source: Optional[str] = None) -> List[ChunkRecord]:
+        """Return every chunk of a source (or of all sources) in insertion order."""
+        sources = [source] if source else SOURCES
+        return [chunk for s in sources for file_chunks in self._files[s].values() for chunk in file_chunks]
+
+    def chunks_for_files(self, file_names: Iterable[str], source: Optional[str] = None) -> List[ChunkRecord]:
+        """
+        Return the chunks of the given files with one lookup per file and source.
+
+        Args:
+            file_names: Selected file names
+            source: Only look in this source; all sources if not given
+
+        Returns:
+            List of chunks of the selected files
+        """
+        sources = [source] if source else SOURCES
+        return [
+            chunk
+            for file_name in dict.fromkeys(file_names)
+            for s in sources
+            for chunk in self._files[s].get(file_name, [])
+        ]
@@ -1,109 +1,207 @@
 import ast
 import os
 import traceback
-from asttokens import ASTTokens
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterator, Optional
 
-def extract_chunks(source_dir: str) -> List[Dict[str, Any]]:
+# Default number of worker processes for parallel chunk extraction
+CHUNK_WORKERS = os.cpu_count() or 1
+
+def list_python_files(source_dir: str) -> List[str]:
     """
-    Walk through .py files under source_dir and extract each
-    class/function as a code chunk with metadata.
-    
+    Walk source_dir and collect the paths of all .py files in walk order.
+
     Args:
         source_dir: Directory containing Python files
-        
+
     Returns:
-        List of dictionaries with 'id', 'code', and 'metadata' keys
+        List of file paths under source_dir
     """
-    chunks = []
+    paths = []
     print(f"Searching for Python files in: {source_dir}")
-    
+
     for root, _, files in os.walk(source_dir):
         print(f"Checking directory: {root}")
         print(f"Files found: {files}")
-        
+
         for fname in files:
-            if not fname.endswith('.py'):
-                continue
-                
-            print(f"Processing Python file: {fname}")
-            path = os.path.join(root, fname)
-            
-            try:
-                with open(path, encoding='utf-8') as f:
-                    src = f.read()
-                
-                print(f"File content length: {len(src)} chars")
-                print(f"First 100 chars of file: {src[:100].replace(chr(10), ' ')}")
-                
-                # If file doesn't contain any functions or classes, create a chunk for the entire file
-                has_functions_or_classes = False
-                
-                try:
-                    # Parse the AST
-                    atok = ASTTokens(src, parse=True)
-                    
-                    # Count nodes for debugging
-                    function_count = 0
-                    class_count = 0
-                    
-                    for node in ast.walk(atok.tree):
-                        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                            has_functions_or_classes = True
-                            function_count += 1
-                            code = atok.get_text(node)
-                            obj_id = f"{os.path.relpath(path, source_dir)}::{node.name}"
-                            metadata = {
-                                'file': os.path.relpath(path, source_dir),
-                                'name': node.name,
-                                'type': type(node).__name__
-                            }
-                            chunks.append({'id': obj_id, 'code': code, 'metadata': metadata})
-                            print(f"Added function: {node.name}")
-                            
-                        elif isinstance(node, ast.ClassDef):
-                            has_functions_or_classes = True
-                            class_count += 1
-                            code = atok.get_text(node)
-                            obj_id = f"{os.path.relpath(path, source_dir)}::{node.name}"
-                            metadata = {
-                                'file': os.path.relpath(path, source_dir),
-                                'name': node.name,
-                                'type': type(node).__name__
-                            }
-                            chunks.append({'id': obj_id, 'code': code, 'metadata': metadata})
-                            print(f"Added class: {node.name}")
-                    
-                    print(f"Found {function_count} functions and {class_count} classes in {fname}")
-                    
-                    # If no functions or classes were found, add the whole file as a chunk
-                    if not has_functions_or_classes:
-                        print(f"No functions or classes found in {fname}, adding entire file as a chunk")
-                        obj_id = f"{os.path.relpath(path, source_dir)}::whole_file"
-                        metadata = {
-                            'file': os.path.relpath(path, source_dir),
-                            'name': os.path.basename(path),
-                            'type': 'Module'
-                        }
-                        chunks.append({'id': obj_id, 'code': src, 'metadata': metadata})
-                    
-                except SyntaxError as e:
-                    print(f"Syntax error in {path}: {e}")
-                    print(f"Line {e.lineno}, column {e.offset}: {e.text}")
-                    
-                    # Even if there's a syntax error, try to add the file as a chunk
-                    print(f"Adding file with syntax error as a chunk")
-                    obj_id = f"{os.path.relpath(path, source_dir)}::whole_file"
+            if fname.endswith('.py'):
+                paths.append(os.path.join(root, fname))
+
+    return paths
+
+def extract_file_chunks(path: str, source_dir: str) -> List[Dict[str, Any]]:
+    """
+    Parse a single Python file and extract each class/function as a code chunk.
+
+    Errors are contained to the file: a syntax error yields a whole-file chunk
+    and any other failure keeps the chunks extracted before it.
+
+    Args:
+        path: Path to the Python file
+        source_dir: Root directory the chunk ids are made relative to
+
+    Returns:
+        List of dictionaries with 'id', 'code', and 'metadata' keys
+    """
+    # Imported on first use (once per worker process) to keep module import cheap
+    from asttokens import ASTTokens
+    chunks = []
+    fname = os.path.basename(path)
+    print(f"Processing Python file: {fname}")
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            src = f.read()
+
+        print(f"File content length: {len(src)} chars")
+        print(f"First 100 chars of file: {src[:100].replace(chr(10), ' ')}")
+
+        # If file doesn't contain any functions or classes, create a chunk for the entire file
+        has_functions_or_classes = False
+
+        try:
+            # Parse the AST
+            atok = ASTTokens(src, parse=True)
+
+            # Count nodes for debugging
+            function_count = 0
+            class_count = 0
+
+            for node in ast.walk(atok.tree):
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    has_functions_or_classes = True
+                    function_count += 1
+                    code = atok.get_text(node)
+                    obj_id = f"{os.path.relpath(path, source_dir)}::{node.name}"
+                    metadata = {
+                        'file': os.path.relpath(path, source_dir),
+                        'name': node.name,
+                        'type': type(node).__name__
+                    }
+                    chunks.append({'id': obj_id, 'code': code, 'metadata': metadata})
+                    print(f"Added function: {node.name}")
+
+                elif isinstance(node, ast.ClassDef):
+                    has_functions_or_classes = True
+                    class_count += 1
+                    code = atok.get_text(node)
+                    obj_id = f"{os.path.relpath(path, source_dir)}::{node.name}"
                     metadata = {
                         'file': os.path.relpath(path, source_dir),
-                        'name': os.path.basename(path),
-                        'type': 'Module'
+                        'name': node.name,
+                        'type': type(node).__name__
                     }
-                    chunks.append({'id': obj_id, 'code': src, 'metadata': metadata})
-                    
-            except Exception as e:
-                print(f"Error processing {path}: {e}")
-                print(traceback.format_exc())
-    
+                    chunks.append({'id': obj_id, 'code': code, 'metadata': metadata})
+                    print(f"Added class: {node.name}")
+
+            print(f"Found {function_count} functions and {class_count} classes in {fname}")
+
+            # If no functions or classes were found, add the whole file as a chunk
+            if not has_functions_or_classes:
+                print(f"No functions or classes found in {fname}, adding entire file as a chunk")
+                obj_id = f"{os.path.relpath(path, source_dir)}::whole_file"
+                metadata = {
+                    'file': os.path.relpath(path, source_dir),
+                    'name': os.path.basename(path),
+                    'type': 'Module'
+                }
+                chunks.append({'id': obj_id, 'code': src, 'metadata': metadata})
+
+        except SyntaxError as e:
+            print(f"Syntax error in {path}: {e}")
+            print(f"Line {e.lineno}, column {e.offset}: {e.text}")
+
+            # Even if there's a syntax error, try to add the file as a chunk
+            print(f"Adding file with syntax error as a chunk")
+            obj_id = f"{os.path.relpath(path, source_dir)}::whole_file"
+            metadata = {
+                'file': os.path.relpath(path, source_dir),
+                'name': os.path.basename(path),
+                'type': 'Module'
+            }
+            chunks.append({'id': obj_id, 'code': src, 'metadata': metadata})
+
+    except Exception as e:
+        print(f"Error processing {path}: {e}")
+        print(traceback.format_exc())
+
+    return chunks
+
+def iter_file_chunks(source_dir: str, workers: int = 1,
+                     paths: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lazily parse Python files under source_dir, yielding each file's chunks in walk order.
+
+    With workers > 1 files are parsed in a process pool, but only a small window
+    of files is in flight at a time so memory stays flat regardless of project size.
+
+    Args:
+        source_dir: Directory containing Python files
+        workers: Number of worker processes (1 parses in the current process)
+        paths: Optional list of files to parse instead of walking source_dir
+
+    Yields:
+        List of chunk dictionaries for one file
+    """
+    if paths is None:
+        paths = list_python_files(source_dir)
+    done = 0
+
+    if workers > 1 and len(paths) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for path in paths:
+                    pending.append(executor.submit(extract_file_chunks, path, source_dir))
+                    # Keep a few files per worker queued so no worker sits idle
+                    if len(pending) >= workers * 4:
+                        yield pending.popleft().result()
+                        done += 1
+                while pending:
+                    yield pending.popleft().result()
+                    done += 1
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); finish the remaining files serially
+            print(f"Process pool failed after {done} files, continuing serially: {e}")
+
+    for path in paths[done:]:
+        yield extract_file_chunks(path, source_dir)
+
+def iter_chunks(source_dir: str, workers: int = 1,
+                paths: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generator version of extract_chunks that yields chunks as files are parsed.
+
+    Args:
+        source_dir: Directory containing Python files
+        workers: Number of worker processes (1 parses in the current process)
+        paths: Optional list of files to parse instead of walking source_dir
+
+    Yields:
+        Dictionaries with 'id', 'code', and 'metadata' keys
+    """
+    for file_chunks in iter_file_chunks(source_dir, workers, paths):
+        yield from file_chunks
+
+def extract_chunks(source_dir: str, workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Walk through .py files under source_dir and extract each
+    class/function as a code chunk with metadata.
+
+    With workers > 1 the per-file parsing is spread across a process pool.
+    The result is identical to the serial path: chunks come back in file walk
+    order and a failure in one file never affects the others.
+
+    Args:
+        source_dir: Directory containing Python files
+        workers: Number of worker processes (1 parses in the current process)
+
+    Returns:
+        List of dictionaries with 'id', 'code', and 'metadata' keys
+    """
+    chunks = list(iter_chunks(source_dir, workers))
     print(f"Total chunks extracted: {len(chunks)}")
-    return chunks
\ No newline at end of file
+    return chunks
@@ -0,0 +1,66 @@
+import threading
+import config
+
+# Shared API clients, created on first use so importing a module opens no connections.
+# The SDKs themselves are imported on first use too, as they dominate startup time.
+_lock = threading.Lock()
+_openai_configured = False
+_pinecone_client = None
+_pinecone_indexes = {}
+
+def get_openai():
+    """
+    Return the openai module, configuring its API key on first use.
+
+    Returns:
+        The configured openai module
+    """
+    global _openai_configured
+    import openai
+    with _lock:
+        if not _openai_configured:
+            openai.api_key = config.OPENAI_API_KEY
+            _openai_configured = True
+    return openai
+
+def get_pinecone_client():
+    """Return the process-wide Pinecone client, creating it on first use."""
+    global _pinecone_client
+    with _lock:
+        if _pinecone_client is None:
+            from pinecone import Pinecone
+            _pinecone_client = Pinecone(api_key=config.PINECONE_API_KEY)
+        return _pinecone_client
+
+def get_pinecone_index(name: str, dimension: int):
+    """
+    Return a cached handle to a Pinecone index, creating the index if it doesn't exist.
+
+    The existence check runs once per index and process; later calls reuse
+    the handle and its connection pool.
+
+    Args:
+        name: Index name
+        dimension: Vector dimension used if the index has to be created
+
+    Returns:
+        Pinecone index handle
+    """
+    client = get_pinecone_client()
+    with _lock:
+        index = _pinecone_indexes.get(name)
+        if index is None:
+            if name not in [index.name for index in client.list_indexes()]:
+                from pinecone import ServerlessSpec
+                client.create_index(
+                    name=name,
+                    dimension=dimension,
+                    metric="cosine",
+                    spec=ServerlessSpec(
+                        cloud="aws",
+                        region="us-west-2"
+                    )
+                )
+            index = client.Index(name)
+            _pinecone_indexes[name] = index
+        return index
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List
+from config import CACHE_DIR
+
+# On-disk location of the chunk content store
+CONTENT_STORE_PATH = os.path.join(CACHE_DIR, "content.sqlite3")
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+class ContentStore:
+    """
+    Persistent store of chunk source code keyed by (namespace, chunk id), backed by SQLite.
+
+    Keeps code bodies out of vector metadata: vectors carry only small
+    metadata and search results are filled in with one bulk lookup.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str = CONTENT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " namespace TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " code TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, id))"
+        )
+        self._conn.commit()
+
+    def put_many(self, namespace: str, chunks: List[Dict[str, Any]]) -> None:
+        """Store the code of chunks, replacing earlier versions with the same id."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (namespace, id, code) VALUES (?, ?, ?)",
+                [(namespace, c['id'], c['code']) for c in chunks]
+            )
+            self._conn.commit()
+
+    def get_many(self, namespace: str, chunk_ids: List[str]) -> Dict[str, str]:
+        """
+        Look up the code of many chunks at once.
+
+        Args:
+            namespace: Namespace the chunks belong to
+            chunk_ids: Ids to look up
+
+        Returns:
+            Dictionary mapping each found chunk id to its code
+        """
+        found = {}
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        with self._lock:
+            for i in range(0, len(unique_ids), _SQL_BATCH):
+                batch = unique_ids[i:i+_SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT id, code FROM chunks WHERE namespace = ? AND id IN ({placeholders})",
+                    [namespace] + batch
+                ).fetchall())
+        return found
+
+    def delete(self, namespace: str, chunk_ids: List[str]) -> None:
+        """Remove chunks by id; unknown ids are ignored."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE namespace = ? AND id = ?",
+                [(namespace, chunk_id) for chunk_id in chunk_ids]
+            )
+            self._conn.commit()
+
+    def delete_namespace(self, namespace: str) -> None:
+        """Remove every chunk of a namespace."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_content_store() -> ContentStore:
+    """Return the process-wide content store, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ContentStore()
+        return _store
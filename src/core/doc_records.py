@@ -0,0 +1,85 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Optional
+from config import CACHE_DIR
+
+# Directory holding one documentation record per project scope
+DOC_RECORD_DIR = os.path.join(CACHE_DIR, "doc_records")
+# Bumped when recorded sections stop matching what generation would produce (e.g. new prompts)
+DOC_RECORD_VERSION = 1
+
+class DocumentationRecord:
+    """
+    Persistent record of generated documentation sections for one project scope.
+
+    Each section (a file summary, a package's documentation or the project
+    overview) is stored with the inputs it was generated from: the content
+    hashes of its code chunks and context chunks, or of the sections below
+    it. A section whose current inputs equal the recorded ones is reused
+    instead of being regenerated.
+    """
+
+    def __init__(self, scope: str, data: Optional[Dict[str, Any]] = None):
+        self.scope = scope
+        data = data or {}
+        # section key -> {'inputs': {...}, 'text': ...}
+        self.sections: Dict[str, Dict[str, Any]] = data.get('sections', {})
+
+    @staticmethod
+    def path_for(scope: str) -> str:
+        """Return the record file path for a scope."""
+        safe_scope = re.sub(r'[^A-Za-z0-9_.-]', '_', scope)
+        return os.path.join(DOC_RECORD_DIR, f"{safe_scope}.json")
+
+    @classmethod
+    def load(cls, scope: str, model: str) -> "DocumentationRecord":
+        """
+        Load the record for a scope, or start an empty one.
+
+        Args:
+            scope: Name identifying the project; also its vector store namespace
+            model: LLM model the documentation is generated with; records made
+                with another model are ignored
+
+        Returns:
+            DocumentationRecord instance
+        """
+        path = cls.path_for(scope)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(scope)
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable documentation record {path}: {e}")
+            return cls(scope)
+        if data.get('version') != DOC_RECORD_VERSION or data.get('model') != model:
+            print(f"Ignoring outdated documentation record {path}")
+            return cls(scope)
+        return cls(scope, data)
+
+    def save(self, model: str) -> None:
+        """Write the record to disk atomically."""
+        path = self.path_for(self.scope)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': DOC_RECORD_VERSION, 'model': model, 'sections': self.sections}, f)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str, inputs: Dict[str, Any]) -> Optional[str]:
+        """Return the recorded text of a section if it was generated from exactly these inputs."""
+        entry = self.sections.get(key)
+        if entry is None or entry['inputs'] != inputs:
+            return None
+        return entry['text']
+
+    def put(self, key: str, inputs: Dict[str, Any], text: str) -> None:
+        """Record a generated section with its inputs."""
+        self.sections[key] = {'inputs': inputs, 'text': text}
+
+    def retain(self, keys: Iterable[str]) -> None:
+        """Drop sections not in keys, e.g. of files deleted from the project."""
+        keep = set(keys)
+        self.sections = {key: entry for key, entry in self.sections.items() if key in keep}
@@ -1,2 +1,2 @@
 # Export main functions for backward compatibility
-from .generator import generate_documentation, generate_project_documentation, generate_file_documentation
\ No newline at end of file
+from .generator import generate_documentation, generate_documentation_stream, generate_project_documentation, generate_file_documentation, generate_files_documentation
\ No newline at end of file
@@ -1,34 +1,97 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from src.core.retriever import semantic_search
 
-def get_context_for_code(metadata: Dict[str, str]) -> str:
+def format_context(context_chunks: List[Dict[str, Any]]) -> str:
+    """Join the code of context chunks into the context string used in prompts."""
+    return "\n---\n".join(c['code'] for c in context_chunks) or "No additional context."
+
+def retrieve_context_chunks(metadata: Dict[str, str], namespaces: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Retrieve relevant chunks from the vector store based on code metadata.
     
     Args:
         metadata: Dictionary with information about the code (type, name, file)
+        namespaces: Namespaces to search (the default namespace if not given)
         
     Returns:
-        String of context from similar code chunks
+        List of similar code chunks
     """
     query = f"Document {metadata['type']} {metadata['name']}"
-    context_chunks = semantic_search(query)
-    return "\n---\n".join(c['code'] for c in context_chunks) or "No additional context."
+    return semantic_search(query, namespaces=namespaces)
+
+def get_context_for_code(metadata: Dict[str, str], namespaces: Optional[List[str]] = None) -> str:
+    """
+    Retrieve relevant chunks from the vector store based on code metadata.
+    
+    Args:
+        metadata: Dictionary with information about the code (type, name, file)
+        namespaces: Namespaces to search (the default namespace if not given)
+        
+    Returns:
+        String of context from similar code chunks
+    """
+    return format_context(retrieve_context_chunks(metadata, namespaces))
+
+def get_context_from_neighbours(chunk_ids: List[str], neighbours: Dict[str, List[Tuple[str, float]]],
+                                chunks_by_id: Dict[str, Dict[str, Any]], top_k: int = 5) -> str:
+    """
+    Build context for a group of chunks from neighbour lists precomputed at ingest.
+    
+    Args:
+        chunk_ids: Ids of the chunks being documented
+        neighbours: Mapping of chunk id to (neighbour id, similarity) pairs
+        chunks_by_id: Mapping of chunk id to chunk dictionary
+        top_k: Number of context chunks to include
+        
+    Returns:
+        String of context from similar code chunks
+    """
+    return format_context(neighbour_context_chunks(chunk_ids, neighbours, chunks_by_id, top_k))
+
+def neighbour_context_chunks(chunk_ids: List[str], neighbours: Dict[str, List[Tuple[str, float]]],
+                             chunks_by_id: Dict[str, Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
+    """
+    Select context chunks for a group of chunks from neighbour lists precomputed at ingest.
+    
+    No embedding or vector store calls are made: the neighbours of all the
+    chunks are merged, chunks of the group itself are skipped, and the top_k
+    most similar remaining chunks are returned.
+    
+    Args:
+        chunk_ids: Ids of the chunks being documented
+        neighbours: Mapping of chunk id to (neighbour id, similarity) pairs
+        chunks_by_id: Mapping of chunk id to chunk dictionary
+        top_k: Number of context chunks to select
+        
+    Returns:
+        List of the most similar other chunks, best first
+    """
+    own_ids = set(chunk_ids)
+    best = {}
+    for chunk_id in chunk_ids:
+        for neighbour_id, score in neighbours.get(chunk_id, []):
+            if neighbour_id not in own_ids and neighbour_id in chunks_by_id:
+                best[neighbour_id] = max(score, best.get(neighbour_id, score))
+    
+    ranked = sorted(best, key=best.get, reverse=True)[:top_k]
+    return [chunks_by_id[i] for i in ranked]
 
-def get_context_for_project(project_name: str, key_modules: List[str]) -> str:
+def get_context_for_project(project_name: str, key_modules: List[str],
+                            namespaces: Optional[List[str]] = None) -> str:
     """
     Retrieve relevant chunks for project-level documentation.
     
     Args:
         project_name: Name of the project
         key_modules: List of key module names in the project
+        namespaces: Namespaces to search (the default namespace if not given)
         
     Returns:
         String of context from relevant code chunks
     """
     # Build a query that captures the project structure
     query = f"Document project {project_name} with modules {', '.join(key_modules)}"
-    context_chunks = semantic_search(query)
+    context_chunks = semantic_search(query, namespaces=namespaces)
     
     # Format the context for use in documentation
     formatted_context = ""
@@ -1,27 +1,59 @@
-import openai
+import hashlib
 import os
-from typing import Dict, List, Any
-from config import OPENAI_API_KEY
-from .prompts import STANDARDIZED_DOC_PROMPT, PROJECT_DOCUMENTATION_PROMPT
-from .context_retriever import get_context_for_code
+import threading
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from config import DOC_LLM_CONCURRENCY, DOC_RETRIEVAL_CONCURRENCY
+from src.core.doc_records import DocumentationRecord
+from src.core.embeddings import estimate_tokens
+from src.core.manifest import content_hash
+from src.core.llm import CompletionStream, chat_completion
+from src.core.llm_cache import CacheTally
+from src.core.rate_limit import run_concurrently
+from .prompts import (STANDARDIZED_DOC_PROMPT, PROJECT_DOCUMENTATION_PROMPT, CODE_SUMMARY_PROMPT,
+                      SUMMARY_REDUCE_PROMPT, PACKAGE_DOC_PROMPT)
+from .context_retriever import (get_context_for_code, get_context_from_neighbours, format_context,
+                                neighbour_context_chunks, retrieve_context_chunks)
 from .code_analyzer import infer_code_type
 from src.processing.project_analyzer import generate_project_summary
 
-# Initialize OpenAI
-openai.api_key = OPENAI_API_KEY
 LLM_MODEL = "gpt-4o-mini-2024-07-18"
+SYSTEM_PROMPT = "You are a professional technical writer specializing in creating clear, accurate, and comprehensive software documentation."
 
-def generate_documentation(code: str, metadata: Dict[str, str]) -> str:
-    """
-    Generate standardized professional documentation for the provided code.
+# Process-wide limit on context retrievals (LLM calls are limited in src.core.llm)
+_retrieval_slots = threading.BoundedSemaphore(DOC_RETRIEVAL_CONCURRENCY)
+# Workers per generation run: enough to keep every LLM slot busy while others retrieve context
+DOC_WORKERS = DOC_LLM_CONCURRENCY + DOC_RETRIEVAL_CONCURRENCY
+
+# Estimated tokens of code or summaries given to one summarization prompt
+DOC_MAX_INPUT_TOKENS = 6000
+# Share of a package prompt's input reserved for related-code context
+DOC_CONTEXT_SHARE = 0.25
+# Rounds of condensing summaries before giving up on fitting them into one prompt
+_MAX_REDUCE_ROUNDS = 4
+
+# Progress callback receiving (items completed, total items, name of the completed item)
+ProgressCallback = Callable[[int, int, str], None]
+
+def _complete(prompt: str, use_cache: bool = True, tally: Optional[CacheTally] = None) -> str:
+    """Run one documentation chat completion, served from the response cache when possible."""
+    return chat_completion(SYSTEM_PROMPT, prompt, LLM_MODEL, use_cache, tally)['content']
+
+def _generate_all(generate: Callable[[Any], str], items: List[Any], names: List[str],
+                  on_progress: Optional[ProgressCallback] = None) -> List[str]:
+    """Run generate over items concurrently, reporting each completed item to on_progress."""
+    completed = 0
     
-    Args:
-        code: The Python code to document
-        metadata: Dictionary with file, name, and type information
-        
-    Returns:
-        Markdown formatted documentation
-    """
+    def on_done(i, _):
+        nonlocal completed
+        completed += 1
+        if on_progress:
+            on_progress(completed, len(items), names[i])
+    
+    return run_concurrently(generate, items, DOC_WORKERS, on_done, in_completion_order=True)
+
+def _documentation_prompt(code: str, metadata: Dict[str, str], context: Optional[str],
+                          namespaces: Optional[List[str]]) -> str:
+    """Build the documentation prompt for code, retrieving context unless it was precomputed."""
     # If code type is generic, try to infer it
     if metadata['type'] in ['Code', 'code_snippet']:
         code_type, code_name = infer_code_type(code)
@@ -35,110 +67,380 @@ def generate_documentation(code: str, metadata: Dict[str, str]) -> str:
     if metadata['type'] in ['File', 'Module'] and metadata['name'] == 'code_snippet':
         metadata['name'] = os.path.basename(metadata['file']) if metadata['file'] != 'user_input' else 'Module'
     
-    # Retrieve relevant context
-    context = get_context_for_code(metadata)
+    # Retrieve relevant context unless it was precomputed
+    if context is None:
+        with _retrieval_slots:
+            context = get_context_for_code(metadata, namespaces)
 
     # Use standardized prompt for all code types
-    prompt = STANDARDIZED_DOC_PROMPT.format(
+    return STANDARDIZED_DOC_PROMPT.format(
         code=code,
         metadata=metadata,
         context=context
     )
 
-    # Call LLM
-    resp = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a professional technical writer specializing in creating clear, accurate, and comprehensive software documentation."},
-            {"role": "user", "content": prompt}
+def generate_documentation(code: str, metadata: Dict[str, str], context: Optional[str] = None,
+                           namespaces: Optional[List[str]] = None, use_cache: bool = True,
+                           tally: Optional[CacheTally] = None) -> str:
+    """
+    Generate standardized professional documentation for the provided code.
+    
+    Args:
+        code: The Python code to document
+        metadata: Dictionary with file, name, and type information
+        context: Optional precomputed context; retrieved by semantic search if not given
+        namespaces: Namespaces searched for context (the default namespace if not given)
+        use_cache: Whether to serve the response from the LLM response cache
+        tally: Optional counters recording the cache hit or miss
+        
+    Returns:
+        Markdown formatted documentation
+    """
+    prompt = _documentation_prompt(code, metadata, context, namespaces)
+    return _complete(prompt, use_cache, tally)
+
+def generate_documentation_stream(code: str, metadata: Dict[str, str], context: Optional[str] = None,
+                                  namespaces: Optional[List[str]] = None, use_cache: bool = True) -> CompletionStream:
+    """
+    Generate documentation like generate_documentation, streaming it as it is written.
+    
+    Context is retrieved before returning; the LLM request is sent once the
+    stream is iterated.
+    
+    Args:
+        code: The Python code to document
+        metadata: Dictionary with file, name, and type information
+        context: Optional precomputed context; retrieved by semantic search if not given
+        namespaces: Namespaces searched for context (the default namespace if not given)
+        use_cache: Whether to serve the response from the LLM response cache
+        
+    Returns:
+        CompletionStream yielding markdown text; its content holds the full
+        documentation after iteration
+    """
+    prompt = _documentation_prompt(code, metadata, context, namespaces)
+    return CompletionStream(SYSTEM_PROMPT, prompt, LLM_MODEL, use_cache)
+
+def _split_text(text: str, max_tokens: int) -> List[str]:
+    """Split text at line boundaries into pieces of at most max_tokens (over-long lines are cut)."""
+    # Inverse of estimate_tokens
+    max_chars = max_tokens * 3
+    pieces = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        for start in range(0, len(line), max_chars):
+            segment = line[start:start + max_chars]
+            tokens = estimate_tokens(segment)
+            if current and size + tokens > max_tokens:
+                pieces.append("".join(current))
+                current = []
+                size = 0
+            current.append(segment)
+            size += tokens
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+def _pack_texts(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    Group texts, in order, into groups whose estimated size fits max_tokens.
+    
+    A text too large for a group of its own is split into several pieces first.
+    """
+    groups = []
+    group = []
+    size = 0
+    for text in texts:
+        pieces = _split_text(text, max_tokens) if estimate_tokens(text) > max_tokens else [text]
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if group and size + tokens > max_tokens:
+                groups.append(group)
+                group = []
+                size = 0
+            group.append(piece)
+            size += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+class ProjectSummarizer:
+    """
+    Map-reduce summarizer documenting a project bottom-up: chunk -> file -> package -> project.
+    
+    Every prompt's input is bounded by max_input_tokens: oversized files are
+    summarized in groups of chunks (chunks too large on their own are split
+    by lines) whose summaries are combined, and summaries too long to fit one
+    prompt are condensed in groups first. Summaries are memoized on their
+    prompt, so each is computed once per run and then reused by the next
+    level up; across runs the LLM response cache serves unchanged inputs.
+    Safe to share between threads.
+    """
+    
+    def __init__(self, max_input_tokens: int = DOC_MAX_INPUT_TOKENS, use_cache: bool = True,
+                 tally: Optional[CacheTally] = None):
+        self.max_input_tokens = max_input_tokens
+        self.use_cache = use_cache
+        self.tally = tally
+        self._memo: Dict[str, str] = {}
+        self._memo_lock = threading.Lock()
+    
+    def _summarize(self, template: str, **fields) -> str:
+        """Fill in a prompt template and run it, at most once per distinct prompt."""
+        prompt = template.format(**fields)
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        summary = _complete(prompt, self.use_cache, self.tally)
+        with self._memo_lock:
+            self._memo[key] = summary
+        return summary
+    
+    def condense(self, name: str, summaries: List[str], max_tokens: Optional[int] = None) -> List[str]:
+        """
+        Condense summaries in groups until together they fit one prompt.
+        
+        Args:
+            name: Name of the file, package or project being summarized
+            summaries: Summaries in order
+            max_tokens: Input budget to fit (max_input_tokens if not given)
+            
+        Returns:
+            Summaries whose combined estimated size fits max_tokens (the input
+            itself if it already fits)
+        """
+        max_tokens = max_tokens or self.max_input_tokens
+        for _ in range(_MAX_REDUCE_ROUNDS):
+            if sum(estimate_tokens(summary) for summary in summaries) <= max_tokens:
+                break
+            summaries = [
+                self._summarize(SUMMARY_REDUCE_PROMPT, name=name, summaries="\n\n".join(group))
+                for group in _pack_texts(summaries, max_tokens)
+            ]
+        return summaries
+    
+    def summarize_file(self, file_name: str, chunks: List[Dict[str, Any]]) -> str:
+        """
+        Summarize one file from its chunks.
+        
+        Args:
+            file_name: Path of the file
+            chunks: The file's code chunks
+            
+        Returns:
+            Concise markdown summary of the file
+        """
+        sections = [f"# {chunk['metadata']['type']}: {chunk['metadata']['name']}\n{chunk['code']}\n"
+                    for chunk in chunks]
+        # An oversized file is summarized part by part (map), then the parts are combined (reduce)
+        summaries = [
+            self._summarize(CODE_SUMMARY_PROMPT, name=file_name, code="\n".join(group))
+            for group in _pack_texts(sections, self.max_input_tokens)
         ]
-    )
-    return resp.choices[0].message.content
+        if len(summaries) == 1:
+            return summaries[0]
+        return self._summarize(SUMMARY_REDUCE_PROMPT, name=file_name,
+                               summaries="\n\n".join(self.condense(file_name, summaries)))
+    
+    def document_package(self, package_name: str, file_summaries: Dict[str, str], context: str) -> str:
+        """
+        Document a package from the summaries of its files.
+        
+        Args:
+            package_name: Name of the package (directory)
+            file_summaries: Mapping of file path to its summary
+            context: Related code from elsewhere in the project; cut to its share of the input
+            
+        Returns:
+            Markdown documentation of the package
+        """
+        summaries_budget = int(self.max_input_tokens * (1 - DOC_CONTEXT_SHARE))
+        summaries = self.condense(
+            package_name,
+            [f"### {file_name}\n{summary}" for file_name, summary in file_summaries.items()],
+            summaries_budget
+        )
+        context = context[:(self.max_input_tokens - summaries_budget) * 3]
+        return self._summarize(PACKAGE_DOC_PROMPT, name=package_name,
+                               summaries="\n\n".join(summaries), context=context)
+    
+    def document_project(self, project_info: Dict[str, Any], package_docs: Dict[str, str]) -> str:
+        """
+        Write the project overview from the package documentation.
+        
+        Args:
+            project_info: Dictionary with project structure information
+            package_docs: Mapping of package name to its documentation
+            
+        Returns:
+            Markdown project overview
+        """
+        summaries = self.condense(
+            project_info['root_dir'],
+            [f"## {package_name}\n{docs}" for package_name, docs in package_docs.items()]
+        )
+        return self._summarize(
+            PROJECT_DOCUMENTATION_PROMPT,
+            project_structure=generate_project_summary(project_info),
+            module_summaries="\n\n".join(summaries)
+        )
 
-def generate_project_documentation(project_info: Dict[str, Any], chunks: List[Dict[str, Any]]) -> str:
+def generate_project_documentation(project_info: Dict[str, Any], chunks: List[Dict[str, Any]],
+                                   neighbours: Optional[Dict[str, List[Tuple[str, float]]]] = None,
+                                   namespaces: Optional[List[str]] = None,
+                                   on_progress: Optional[ProgressCallback] = None,
+                                   use_cache: bool = True,
+                                   record: Optional[DocumentationRecord] = None,
+                                   tally: Optional[CacheTally] = None) -> str:
     """
     Generate comprehensive documentation for an entire project.
     
+    Documentation is built bottom-up with a ProjectSummarizer: each file is
+    summarized, each package (directory) is documented from its file
+    summaries, and the project overview is written from the package
+    documentation. Files and packages are processed concurrently; the output
+    keeps package order.
+    
+    With a record, every section is stored with the hashes of the chunks and
+    context chunks it was generated from, and sections whose inputs are
+    unchanged since the last run are reused without calling the LLM. Only
+    changed sections are regenerated and spliced into the document.
+    
     Args:
         project_info: Dictionary with project structure information
         chunks: List of code chunks from the project
+        neighbours: Optional neighbour lists from compute_neighbours; when given,
+            package context is looked up from them instead of semantic search
+        namespaces: Namespaces searched for context when no neighbours are given
+        on_progress: Optional callback called in the calling thread as each
+            regenerated file and package is done
+        use_cache: Whether to reuse cached responses and recorded sections
+        record: Optional documentation record of the project, updated in place
+            (the caller saves it)
+        tally: Optional counters recording the run's LLM cache hits and misses
         
     Returns:
         Markdown formatted project documentation
     """
-    # Create context from all chunks for project overview
-    context = "Project Structure:\n" + generate_project_summary(project_info)
+    summarizer = ProjectSummarizer(use_cache=use_cache, tally=tally)
+    record = record if record is not None else DocumentationRecord("")
+    # Bypassing the cache also regenerates recorded sections
+    reuse = use_cache
     
-    # Group chunks by module/directory for better organization
-    modules = {}
+    # Group chunks by file, and files by package (directory)
+    files = {}
     for chunk in chunks:
-        file_path = chunk['metadata']['file']
-        directory = os.path.dirname(file_path)
-        
-        if directory not in modules:
-            modules[directory] = []
-        
-        modules[directory].append(chunk)
-    
-    # Create a high-level summary of each module
-    module_summaries = {}
-    for module_path, module_chunks in modules.items():
-        # Combine all code from this module
-        module_name = module_path if module_path else "root"
-        combined_code = f"# Module: {module_name}\n\n"
-        
-        for chunk in module_chunks:
-            combined_code += f"## {chunk['metadata']['type']}: {chunk['metadata']['name']}\n"
-            combined_code += chunk['code'] + "\n\n"
-        
-        # Generate documentation for this module
-        module_metadata = {
-            'file': module_path,
-            'name': module_name,
-            'type': 'Module'
+        files.setdefault(chunk['metadata']['file'], []).append(chunk)
+    packages = {}
+    for file_name in files:
+        packages.setdefault(os.path.dirname(file_name), []).append(file_name)
+    
+    chunks_by_id = {chunk['id']: chunk for chunk in chunks}
+    chunk_hashes = {chunk['id']: content_hash(chunk['code']) for chunk in chunks}
+    
+    # Map: summarize every file whose chunks changed since it was last summarized
+    file_inputs = {file_name: {'chunks': {chunk['id']: chunk_hashes[chunk['id']] for chunk in file_chunks}}
+                   for file_name, file_chunks in files.items()}
+    file_summaries = {file_name: record.get(f"file:{file_name}", file_inputs[file_name]) if reuse else None
+                      for file_name in files}
+    stale_files = [file_name for file_name, summary in file_summaries.items() if summary is None]
+    for file_name, summary in zip(stale_files, _generate_all(
+        lambda file_name: summarizer.summarize_file(file_name, files[file_name]),
+        stale_files,
+        [f"file {file_name}" for file_name in stale_files],
+        on_progress
+    )):
+        file_summaries[file_name] = summary
+        record.put(f"file:{file_name}", file_inputs[file_name], summary)
+    
+    # Look up each package's context chunks, which are inputs of its section too
+    package_paths = list(packages)
+    package_names = {path: path if path else "root" for path in package_paths}
+    
+    def package_context(package_path):
+        if neighbours is not None:
+            package_ids = [chunk['id'] for file_name in packages[package_path] for chunk in files[file_name]]
+            return neighbour_context_chunks(package_ids, neighbours, chunks_by_id)
+        with _retrieval_slots:
+            return retrieve_context_chunks(
+                {'file': package_path, 'name': package_names[package_path], 'type': 'Module'}, namespaces
+            )
+    
+    contexts = dict(zip(package_paths, run_concurrently(package_context, package_paths, DOC_RETRIEVAL_CONCURRENCY)))
+    package_inputs = {
+        path: {
+            'chunks': {chunk_id: chunk_hash for file_name in packages[path]
+                       for chunk_id, chunk_hash in file_inputs[file_name]['chunks'].items()},
+            'context': {chunk['id']: content_hash(chunk['code']) for chunk in contexts[path]}
         }
-        
-        module_docs = generate_documentation(combined_code, module_metadata)
-        module_summaries[module_name] = module_docs
+        for path in package_paths
+    }
     
-    # Create project-level documentation
-    project_name = project_info['root_dir']
-    project_prompt = PROJECT_DOCUMENTATION_PROMPT.format(
-        project_name=project_name,
-        project_structure=generate_project_summary(project_info),
-        key_modules=', '.join(modules.keys())
-    )
+    # Reduce: document every package whose chunks or context changed, from its file summaries
+    package_docs = {path: record.get(f"package:{package_names[path]}", package_inputs[path]) if reuse else None
+                    for path in package_paths}
+    stale_packages = [path for path, docs in package_docs.items() if docs is None]
+    for path, docs in zip(stale_packages, _generate_all(
+        lambda path: summarizer.document_package(
+            package_names[path], {file_name: file_summaries[file_name] for file_name in packages[path]},
+            format_context(contexts[path])
+        ),
+        stale_packages,
+        [f"package {package_names[path]}" for path in stale_packages],
+        on_progress
+    )):
+        package_docs[path] = docs
+        record.put(f"package:{package_names[path]}", package_inputs[path], docs)
+    package_docs = {package_names[path]: docs for path, docs in package_docs.items()}
     
-    # Call LLM for project-level docs
-    project_docs_response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a professional technical writer specializing in creating clear, accurate, and comprehensive software documentation."},
-            {"role": "user", "content": project_prompt}
-        ]
-    )
+    # Create project-level documentation from the package documentation, unless nothing changed
+    project_name = project_info['root_dir']
+    project_inputs = {
+        # The root directory is a fresh temporary directory on every upload, so it is left out
+        'structure': content_hash(generate_project_summary({**project_info, 'root_dir': ''})),
+        'packages': {name: content_hash(docs) for name, docs in package_docs.items()}
+    }
+    project_docs = record.get("project", project_inputs) if reuse else None
+    if project_docs is None:
+        project_docs = summarizer.document_project(project_info, package_docs)
+        record.put("project", project_inputs, project_docs)
     
-    project_docs = project_docs_response.choices[0].message.content
+    # Forget sections of files and packages that no longer exist
+    record.retain(["project"] + [f"file:{file_name}" for file_name in files] +
+                  [f"package:{name}" for name in package_docs])
+    print(f"Regenerated {len(stale_files)} of {len(files)} file summaries and "
+          f"{len(stale_packages)} of {len(package_paths)} package sections")
     
-    # Combine all documentation
+    # Splice reused and regenerated sections into the document
     full_docs = f"# {project_name} - Project Documentation\n\n"
     full_docs += project_docs + "\n\n"
     full_docs += "# Module Documentation\n\n"
     
-    for module_name, module_docs in module_summaries.items():
+    for module_name, module_docs in package_docs.items():
         full_docs += f"## Module: {module_name}\n\n"
         full_docs += module_docs + "\n\n"
         full_docs += "---\n\n"
     
     return full_docs
 
-def generate_file_documentation(file_name: str, file_chunks: List[Dict[str, Any]]) -> str:
+def generate_file_documentation(file_name: str, file_chunks: List[Dict[str, Any]],
+                                neighbours: Optional[Dict[str, List[Tuple[str, float]]]] = None,
+                                chunks_by_id: Optional[Dict[str, Dict[str, Any]]] = None,
+                                namespaces: Optional[List[str]] = None, use_cache: bool = True,
+                                tally: Optional[CacheTally] = None) -> str:
     """
     Generate documentation for a specific file by combining its chunks.
     
     Args:
         file_name: Name of the file to document
         file_chunks: List of code chunks from the file
+        neighbours: Optional neighbour lists from compute_neighbours
+        chunks_by_id: Mapping of chunk id to chunk, required with neighbours
+        namespaces: Namespaces searched for context when no neighbours are given
+        use_cache: Whether to serve the response from the LLM response cache
+        tally: Optional counters recording the cache hit or miss
         
     Returns:
         Markdown formatted file documentation
@@ -156,7 +458,45 @@ def generate_file_documentation(file_name: str, file_chunks: List[Dict[str, Any]
         'type': 'File'
     }
     
+    # Use precomputed neighbours as context when available
+    context = None
+    if neighbours is not None and chunks_by_id is not None:
+        context = get_context_from_neighbours([chunk['id'] for chunk in file_chunks], neighbours, chunks_by_id)
+    
     # Generate documentation for the combined code
-    docs = generate_documentation(combined_code, file_metadata)
+    docs = generate_documentation(combined_code, file_metadata, context, namespaces, use_cache, tally)
+    
+    return docs
+
+def generate_files_documentation(file_chunks: Dict[str, List[Dict[str, Any]]],
+                                 neighbours: Optional[Dict[str, List[Tuple[str, float]]]] = None,
+                                 chunks_by_id: Optional[Dict[str, Dict[str, Any]]] = None,
+                                 namespaces: Optional[List[str]] = None,
+                                 on_progress: Optional[ProgressCallback] = None,
+                                 use_cache: bool = True,
+                                 tally: Optional[CacheTally] = None) -> Dict[str, str]:
+    """
+    Generate documentation for several files concurrently.
     
-    return docs
\ No newline at end of file
+    Args:
+        file_chunks: Mapping of file name to its code chunks
+        neighbours: Optional neighbour lists from compute_neighbours
+        chunks_by_id: Mapping of chunk id to chunk, required with neighbours
+        namespaces: Namespaces searched for context when no neighbours are given
+        on_progress: Optional callback called in the calling thread as each file is done
+        use_cache: Whether to serve responses from the LLM response cache
+        tally: Optional counters recording the run's LLM cache hits and misses
+        
+    Returns:
+        Mapping of file name to markdown documentation, in the order of file_chunks
+    """
+    file_names = list(file_chunks)
+    docs = _generate_all(
+        lambda file_name: generate_file_documentation(
+            file_name, file_chunks[file_name], neighbours, chunks_by_id, namespaces, use_cache, tally
+        ),
+        file_names,
+        file_names,
+        on_progress
+    )
+    return dict(zip(file_names, docs))
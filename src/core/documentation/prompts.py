@@ -25,6 +25,9 @@ Create concise documentation for this Python project.
 
 PROJECT STRUCTURE: {project_structure}
 
+MODULE SUMMARIES:
+{module_summaries}
+
 First, carefully analyze the codebase to determine a meaningful project name based on:
 - Main functionality and purpose
 - Key features observed in the code
@@ -62,3 +65,43 @@ Then create documentation with these sections:
 
 Be professional and include proper file structure with descriptions.
 """
+
+# Summary of a file, or of one part of an oversized file (map step)
+CODE_SUMMARY_PROMPT = """
+Summarize this Python code from {name} for a developer who has not read it:
+
+```python
+{code}
+```
+
+Cover its purpose, the key classes and functions with their responsibilities,
+important data flow, and what it depends on. Be concise (at most ~200 words).
+Use plain markdown without headings.
+"""
+
+# Condensed summary of several summaries of the same file, package or project (reduce step)
+SUMMARY_REDUCE_PROMPT = """
+Combine these summaries of parts of {name} into one concise summary:
+
+{summaries}
+
+Keep the purpose, the key components and how they interact; drop repetition.
+Be concise (at most ~300 words). Use plain markdown without headings.
+"""
+
+# Package documentation built from the summaries of its files
+PACKAGE_DOC_PROMPT = """
+Document the Python package {name} using these summaries of its files:
+
+{summaries}
+
+RELATED CODE: {context}
+
+Include:
+1. Brief overview of the package's role
+2. Responsibilities of each file
+3. Key classes and functions with usage
+4. How the files interact with each other and the rest of the project
+
+Use markdown with proper headings and code blocks.
+"""
@@ -1,33 +1,140 @@
-import openai
-from pinecone import Pinecone, ServerlessSpec
-from config import OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX
+import os
+import threading
+import config
+from config import (CACHE_DIR, VECTOR_STORE_BACKEND, LOCAL_VECTOR_STORAGE, LOCAL_VECTOR_SEARCH_DIMS,
+                    UPSERT_CONCURRENCY)
 from typing import List, Dict, Any
-
-# Initialize clients
-openai.api_key = OPENAI_API_KEY
-pc = Pinecone(api_key=PINECONE_API_KEY)
+from src.core import clients
+from src.core.content_store import get_content_store
+from src.core.embedding_cache import get_embedding_cache
+from src.core.rate_limit import RateLimiter, retry_with_backoff, run_concurrently
+from src.core.namespaces import get_namespace_registry
+from src.core.vector_store import DEFAULT_NAMESPACE, UpsertError, VectorStore, PineconeVectorStore
 
 # Embedding model
 EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIMENSION = 1536
+
+# Request limits for batched embedding calls (the API allows 2048 inputs / 300k tokens)
+EMBED_BATCH_MAX_ITEMS = 512
+EMBED_BATCH_MAX_TOKENS = 250000
 
-def initialize_pinecone_index() -> None:
-    """Create Pinecone index if it doesn't exist."""
-    index_list = [index.name for index in pc.list_indexes()]
-    if PINECONE_INDEX not in index_list:
-        pc.create_index(
-            name=PINECONE_INDEX,
-            dimension=1536,
-            metric="cosine",
-            spec=ServerlessSpec(
-                cloud="aws",
-                region="us-west-2"
-            )
-        )
+# Concurrency and account rate limits for embedding requests
+EMBED_CONCURRENCY = 4
+EMBED_REQUESTS_PER_MINUTE = 3000
+EMBED_TOKENS_PER_MINUTE = 1000000
+embed_rate_limiter = RateLimiter(EMBED_REQUESTS_PER_MINUTE, EMBED_TOKENS_PER_MINUTE)
 
 def get_pinecone_index():
-    """Get the Pinecone index, initializing it if needed."""
-    initialize_pinecone_index()
-    return pc.Index(PINECONE_INDEX)
+    """Get the shared Pinecone index handle, creating the index on first use if needed."""
+    return clients.get_pinecone_index(config.PINECONE_INDEX, EMBED_DIMENSION)
+
+_vector_store = None
+_vector_store_lock = threading.Lock()
+
+def get_vector_store() -> VectorStore:
+    """
+    Get the process-wide vector store for the configured backend.
+    
+    VECTOR_STORE_BACKEND selects Pinecone ("pinecone") or the in-process
+    NumPy store ("local"), which keeps one partition per namespace under
+    CACHE_DIR and can keep a quantized search matrix (LOCAL_VECTOR_STORAGE / LOCAL_VECTOR_SEARCH_DIMS).
+    
+    Returns:
+        VectorStore instance
+    """
+    global _vector_store
+    with _vector_store_lock:
+        if _vector_store is None:
+            if VECTOR_STORE_BACKEND == "local":
+                # Imported here so the default Pinecone backend never loads NumPy
+                from src.core.local_vector_store import LocalVectorStore
+                _vector_store = LocalVectorStore(
+                    EMBED_DIMENSION,
+                    path=os.path.join(CACHE_DIR, "local_index"),
+                    storage=LOCAL_VECTOR_STORAGE,
+                    search_dims=LOCAL_VECTOR_SEARCH_DIMS
+                )
+            else:
+                _vector_store = PineconeVectorStore(get_pinecone_index(), concurrency=UPSERT_CONCURRENCY)
+        return _vector_store
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the token count of a text without a tokenizer.
+
+    Code tokenizes denser than prose, so this assumes ~3 characters per token
+    to stay on the safe side of the request limits.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    return len(text) // 3 + 1
+
+def _iter_embedding_batches(texts: List[str]):
+    """Yield (start, end) index ranges that fit the item and token limits."""
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if i > start and (i - start >= EMBED_BATCH_MAX_ITEMS or tokens + text_tokens > EMBED_BATCH_MAX_TOKENS):
+            yield start, i
+            start = i
+            tokens = 0
+        tokens += text_tokens
+    if start < len(texts):
+        yield start, len(texts)
+
+def _request_embeddings(texts: List[str]) -> List[List[float]]:
+    """Call the embedding API for texts, packing them into as few requests as the limits allow."""
+    def request(bounds):
+        start, end = bounds
+        batch = texts[start:end]
+        
+        def call():
+            embed_rate_limiter.acquire(sum(estimate_tokens(t) for t in batch))
+            return clients.get_openai().Embedding.create(model=EMBED_MODEL, input=batch)
+        
+        resp = retry_with_backoff(call)
+        # The API tags each result with its input position
+        data = sorted(resp['data'], key=lambda item: item['index'])
+        return [item['embedding'] for item in data]
+    
+    batches = run_concurrently(request, _iter_embedding_batches(texts), EMBED_CONCURRENCY)
+    return [vec for batch in batches for vec in batch]
+
+def embed_texts(texts: List[str], use_cache: bool = True) -> List[List[float]]:
+    """
+    Generate embedding vectors for many texts with as few requests as possible.
+    
+    Embeddings are served from the on-disk cache where possible; the remaining
+    distinct texts are packed into requests bounded by EMBED_BATCH_MAX_ITEMS and
+    EMBED_BATCH_MAX_TOKENS.
+    
+    Args:
+        texts: The texts to embed
+        use_cache: Whether to read from and write to the embedding cache
+        
+    Returns:
+        List of embeddings, in the same order as texts
+    """
+    if not use_cache:
+        return _request_embeddings(texts)
+    
+    cache = get_embedding_cache()
+    embeddings = cache.get_many(EMBED_MODEL, texts)
+    
+    # Embed each distinct missing text only once
+    missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+    if missing:
+        fresh = dict(zip(missing, _request_embeddings(missing)))
+        cache.put_many(EMBED_MODEL, missing, [fresh[t] for t in missing])
+        embeddings = [e if e is not None else fresh[t] for t, e in zip(texts, embeddings)]
+    
+    return embeddings
 
 def embed_text(text: str) -> List[float]:
     """
@@ -39,37 +146,96 @@ def embed_text(text: str) -> List[float]:
     Returns:
         List of embedding values
     """
-    resp = openai.Embedding.create(model=EMBED_MODEL, input=text)
-    return resp['data'][0]['embedding']
+    return embed_texts([text])[0]
+
+def chunk_to_vector(chunk: Dict[str, Any], vec: List[float]) -> Dict[str, Any]:
+    """
+    Build the vector store record for an embedded chunk.
+
+    Args:
+        chunk: Chunk dictionary with 'id', 'code', and 'metadata'
+        vec: Embedding of the chunk's code
+
+    Returns:
+        Dictionary with 'id', 'values', and 'metadata' keys
+    """
+    # Code lives in the content store (see store_chunk_code), keeping vector payloads small
+    return {"id": chunk['id'], "values": vec, "metadata": chunk['metadata'].copy()}
 
-def upsert_chunks(chunks: List[Dict[str, Any]]):
+def store_chunk_code(chunks: List[Dict[str, Any]], namespace: str = DEFAULT_NAMESPACE):
     """
-    Embed code chunks and upsert into Pinecone.
+    Save chunk source code to the local content store used to fill in search results.
+
+    Args:
+        chunks: Chunk dictionaries with 'id' and 'code'
+        namespace: Namespace the chunks belong to
+    """
+    get_content_store().put_many(namespace, chunks)
+
+def upsert_vectors(vectors: List[Dict[str, Any]], store: VectorStore = None,
+                   namespace: str = DEFAULT_NAMESPACE) -> List[Dict[str, Any]]:
+    """
+    Upsert prepared vector records into the vector store.
+
+    If some request batches fail even after their own retries, only the
+    vectors of those batches are sent once more.
+
+    Args:
+        vectors: Vector records as built by chunk_to_vector
+        store: Optional vector store (the configured one if not given)
+        namespace: Namespace (project or session) the vectors belong to
+
+    Returns:
+        Per-batch reports of every request sent, including failed batches and
+        their re-sends
+
+    Raises:
+        UpsertError: If re-sending the failed batches failed as well
+    """
+    if store is None:
+        store = get_vector_store()
+    try:
+        reports = store.upsert(vectors, namespace)
+    except UpsertError as e:
+        print(f"{e}; re-sending {len(e.failed_vectors)} vectors of the failed batches")
+        reports = e.reports + store.upsert(e.failed_vectors, namespace)
+    get_namespace_registry().touch(namespace)
+    return reports
+
+def delete_chunks(chunk_ids: List[str], store: VectorStore = None, namespace: str = DEFAULT_NAMESPACE):
+    """
+    Delete the vectors of removed chunks from the vector store.
+
+    Args:
+        chunk_ids: Ids of the chunks to delete
+        store: Optional vector store (the configured one if not given)
+        namespace: Namespace the chunks were upserted into
+    """
+    if not chunk_ids:
+        return
+    if store is None:
+        store = get_vector_store()
+
+    store.delete(chunk_ids, namespace)
+    store.flush()
+    get_content_store().delete(namespace, chunk_ids)
+
+    print(f"Deleted {len(chunk_ids)} chunks from the vector store.")
+
+def upsert_chunks(chunks: List[Dict[str, Any]], namespace: str = DEFAULT_NAMESPACE):
+    """
+    Embed code chunks and upsert into the vector store.
     
     Args:
         chunks: List of chunk dictionaries with 'id', 'code', and 'metadata'
+        namespace: Namespace (project or session) the chunks belong to
     """
-    vectors = []
-    for c in chunks:
-        vec = embed_text(c['code'])
-        # include code in metadata for easy retrieval
-        meta = c['metadata'].copy()
-        meta['code'] = c['code']
-        vectors.append((c['id'], vec, meta))
-    
-    # Batch upsert to Pinecone
-    # Convert to format expected by new Pinecone API
-    pinecone_vectors = [
-        {"id": id, "values": vec, "metadata": meta}
-        for id, vec, meta in vectors
-    ]
-    
-    index = get_pinecone_index()
+    embeddings = embed_texts([c['code'] for c in chunks])
+    vectors = [chunk_to_vector(c, vec) for c, vec in zip(chunks, embeddings)]
+    store_chunk_code(chunks, namespace)
     
-    # Upsert in batches of 100
-    batch_size = 100
-    for i in range(0, len(pinecone_vectors), batch_size):
-        batch = pinecone_vectors[i:i+batch_size]
-        index.upsert(vectors=batch)
+    store = get_vector_store()
+    upsert_vectors(vectors, store, namespace)
+    store.flush()
     
-    print(f"Upserted {len(vectors)} chunks to Pinecone.")
\ No newline at end of file
+    print(f"Upserted {len(vectors)} chunks to the vector store.")
@@ -0,0 +1,183 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from src.core.vector_store import DEFAULT_NAMESPACE, compile_filter
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Extra weight given to tokens of the chunk's own name (function/class/module)
+NAME_BOOST = 3
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+_QUERY_WORD_RE = re.compile(r'[A-Za-z_][\w.]*(\(\))?')
+
+def split_identifier(identifier: str) -> List[str]:
+    """
+    Split an identifier into its lowercase snake_case and CamelCase parts.
+
+    Args:
+        identifier: e.g. "upsert_chunks" or "LocalVectorStore"
+
+    Returns:
+        List of parts, e.g. ["upsert", "chunks"] or ["local", "vector", "store"]
+    """
+    parts = []
+    for piece in identifier.split('_'):
+        parts.extend(p.lower() for p in _CAMEL_RE.findall(piece))
+    return parts
+
+def tokenize_code(text: str) -> List[str]:
+    """
+    Tokenize code or a query into searchable terms.
+
+    Each identifier yields its full lowercase form plus its parts, so
+    "upsert_chunks" matches queries for "upsert_chunks", "upsert" or "chunks".
+
+    Args:
+        text: Source code or query text
+
+    Returns:
+        List of terms (with repetitions)
+    """
+    tokens = []
+    for identifier in _IDENTIFIER_RE.findall(text):
+        full = identifier.lower()
+        tokens.append(full)
+        parts = split_identifier(identifier)
+        if len(parts) > 1 or (parts and parts[0] != full):
+            tokens.extend(parts)
+    return tokens
+
+def is_identifier_query(query: str) -> bool:
+    """
+    Return True if the query consists only of code identifiers.
+
+    Words must look like code (snake_case, camelCase, dotted or called), so
+    "`upsert_chunks`" or "LocalVectorStore.query()" qualify but "parse files" doesn't.
+
+    Args:
+        query: The search query
+
+    Returns:
+        True if the query can be answered lexically without embedding it
+    """
+    words = query.replace('`', ' ').split()
+    if not words or not all(_QUERY_WORD_RE.fullmatch(word) for word in words):
+        return False
+    return all('_' in word or '.' in word or word.endswith('()') or re.search(r'[a-z][A-Z]', word)
+               for word in words)
+
+class BM25Index:
+    """
+    In-memory inverted index over code chunks scored with Okapi BM25.
+
+    Documents are tokenized with tokenize_code; tokens of the chunk's name
+    from its metadata are boosted. Chunks can be added, replaced and removed
+    incrementally. Only term statistics and metadata are kept, not the code:
+    hits carry the chunk's id and metadata, and callers read the code from
+    wherever the chunks are stored.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._metadata)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._metadata
+
+    def add(self, chunks: List[Dict[str, Any]]) -> None:
+        """Index chunks, replacing any already indexed under the same id."""
+        with self._lock:
+            for chunk in chunks:
+                self._remove(chunk['id'])
+                terms = Counter(tokenize_code(chunk['code']))
+                metadata = dict(chunk.get('metadata', {}))
+                name = metadata.get('name', '')
+                for term in tokenize_code(name):
+                    terms[term] += NAME_BOOST
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[chunk['id']] = tf
+                length = sum(terms.values())
+                self._doc_terms[chunk['id']] = terms
+                self._doc_lengths[chunk['id']] = length
+                self._metadata[chunk['id']] = metadata
+                self._total_length += length
+
+    def remove(self, chunk_ids: List[str]) -> None:
+        """Drop chunks from the index; unknown ids are ignored."""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+
+    def _remove(self, chunk_id: str) -> None:
+        terms = self._doc_terms.pop(chunk_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[chunk_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(chunk_id)
+        del self._metadata[chunk_id]
+
+    def search(self, query: str, top_k: int = 5,
+               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Return the top_k chunks by BM25 score for the query terms.
+
+        Args:
+            query: Free text or identifier query
+            top_k: Number of results
+            filter: Optional metadata filter (see compile_filter)
+
+        Returns:
+            List of (hit, score) pairs, best first; each hit is a dictionary
+            with the chunk's 'id' and 'metadata'
+        """
+        with self._lock:
+            n_docs = len(self._metadata)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[str, float] = {}
+            for term in set(tokenize_code(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            if filter:
+                matches = compile_filter(filter)
+                scores = {chunk_id: score for chunk_id, score in scores.items()
+                          if matches(self._metadata[chunk_id])}
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [({'id': chunk_id, 'metadata': self._metadata[chunk_id]}, score) for chunk_id, score in ranked]
+
+_lexical_indexes: Dict[str, BM25Index] = {}
+_lexical_indexes_lock = threading.Lock()
+
+def get_lexical_index(namespace: str = DEFAULT_NAMESPACE) -> BM25Index:
+    """Return the process-wide lexical index of a namespace, creating it if needed."""
+    with _lexical_indexes_lock:
+        if namespace not in _lexical_indexes:
+            _lexical_indexes[namespace] = BM25Index()
+        return _lexical_indexes[namespace]
+
+def drop_lexical_index(namespace: str) -> None:
+    """Discard the lexical index of a namespace."""
+    with _lexical_indexes_lock:
+        _lexical_indexes.pop(namespace, None)
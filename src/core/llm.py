@@ -0,0 +1,127 @@
+import threading
+from typing import Any, Dict, Iterator, Optional
+from config import DOC_LLM_CONCURRENCY
+from src.core.clients import get_openai
+from src.core.embeddings import estimate_tokens
+from src.core.llm_cache import CacheTally, get_llm_cache, request_key
+from src.core.rate_limit import retry_with_backoff
+
+# Process-wide limit on LLM requests in flight, shared by all sessions so
+# parallel generation stays within API rate limits
+_llm_slots = threading.BoundedSemaphore(DOC_LLM_CONCURRENCY)
+
+def chat_completion(system_prompt: str, user_prompt: str, model: str, use_cache: bool = True,
+                    tally: Optional[CacheTally] = None, **params) -> Dict[str, Any]:
+    """
+    Run a chat completion, serving repeated requests from the response cache.
+
+    Cache hits return without waiting for an LLM slot. With use_cache=False
+    the lookup is skipped, and the fresh response replaces the cached one.
+
+    Args:
+        system_prompt: System message
+        user_prompt: User message
+        model: Chat model name
+        use_cache: Whether to look the request up in the response cache
+        tally: Optional per-run counters recording whether the request was a cache hit
+        **params: Sampling parameters passed to the API (e.g. temperature)
+
+    Returns:
+        Dictionary with 'content', 'usage' (prompt, completion and total tokens)
+        and 'cached' (True if served from the cache)
+    """
+    cache = get_llm_cache()
+    key = request_key(model, system_prompt, user_prompt, params)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            if tally is not None:
+                tally.record(True)
+            return {**cached, 'cached': True}
+    if tally is not None:
+        tally.record(False)
+
+    with _llm_slots:
+        resp = retry_with_backoff(lambda: get_openai().ChatCompletion.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            **params
+        ))
+    content = resp.choices[0].message.content
+    usage = {
+        'prompt_tokens': resp.usage.prompt_tokens,
+        'completion_tokens': resp.usage.completion_tokens,
+        'total_tokens': resp.usage.total_tokens
+    }
+    cache.put(key, model, content, usage)
+    return {'content': content, 'usage': usage, 'cached': False}
+
+class CompletionStream:
+    """
+    Iterable over the text of a chat completion as it is generated.
+
+    Iterating sends the request and yields text deltas as they arrive (a cache
+    hit yields the whole response at once). Once iteration finishes, content,
+    usage and cached hold the same values chat_completion returns, and a
+    streamed response is stored in the response cache. Streamed responses
+    carry no token counts, so their usage is estimated and flagged with
+    'estimated'. An optional tally records whether the request was a cache hit.
+    """
+
+    def __init__(self, system_prompt: str, user_prompt: str, model: str, use_cache: bool = True,
+                 tally: Optional[CacheTally] = None, **params):
+        self.system_prompt = system_prompt
+        self.user_prompt = user_prompt
+        self.model = model
+        self.use_cache = use_cache
+        self.tally = tally
+        self.params = params
+        self.content = None
+        self.usage = None
+        self.cached = False
+
+    def __iter__(self) -> Iterator[str]:
+        cache = get_llm_cache()
+        key = request_key(self.model, self.system_prompt, self.user_prompt, self.params)
+        if self.use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                self.content, self.usage, self.cached = cached['content'], cached['usage'], True
+                if self.tally is not None:
+                    self.tally.record(True)
+                yield self.content
+                return
+        if self.tally is not None:
+            self.tally.record(False)
+
+        parts = []
+        # The LLM slot is held until the stream ends or the consumer stops iterating
+        with _llm_slots:
+            events = retry_with_backoff(lambda: get_openai().ChatCompletion.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": self.user_prompt}
+                ],
+                stream=True,
+                **self.params
+            ))
+            for event in events:
+                delta = event['choices'][0]['delta'].get('content')
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        self.content = "".join(parts)
+        prompt_tokens = estimate_tokens(self.system_prompt) + estimate_tokens(self.user_prompt)
+        completion_tokens = estimate_tokens(self.content)
+        self.usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'estimated': True
+        }
+        cache.put(key, self.model, self.content, self.usage)
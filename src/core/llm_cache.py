@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from config import CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_MAX_AGE_DAYS
+
+# On-disk location of the LLM response cache
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite3")
+
+def request_key(model: str, system_prompt: str, user_prompt: str, params: Dict[str, Any]) -> str:
+    """Return the sha256 hex digest identifying a completion request."""
+    request = json.dumps(
+        {'model': model, 'system': system_prompt, 'user': user_prompt, 'params': params},
+        sort_keys=True
+    )
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+def format_cache_stats(stats: Dict[str, float], tally: Optional["CacheTally"] = None) -> str:
+    """
+    Format LLM cache statistics as a one-line summary.
+
+    Args:
+        stats: Statistics as returned by LLMResponseCache.stats
+        tally: Hits and misses of one run, reported instead of the process-wide
+            counters (which include other sessions' requests)
+
+    Returns:
+        String like "LLM cache: 12 hits / 3 misses (80% hit rate), 215 entries, 1.4 MB"
+    """
+    if tally is not None:
+        stats = {**stats, **tally.stats()}
+    return (f"LLM cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+            f"{stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB")
+
+class CacheTally:
+    """
+    Thread-safe hit/miss counters for the completions of one run.
+
+    Pass one to chat_completion (or the documentation generators) to count
+    only that run's requests; requests that bypass the cache count as misses.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, cached: bool) -> None:
+        """Count one request as a hit or a miss."""
+        with self._lock:
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return 'hits', 'misses' and 'hit_rate'."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
+
+class LLMResponseCache:
+    """
+    Persistent cache of chat completion responses backed by SQLite.
+
+    Entries are keyed on a hash of the model, system prompt, user prompt and
+    sampling parameters. Entries older than max_age_seconds are treated as
+    misses and dropped; when the stored responses exceed max_bytes the least
+    recently used entries are evicted. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 max_age_seconds: float = LLM_CACHE_MAX_AGE_DAYS * 86400):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " usage TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Request key from request_key
+
+        Returns:
+            Dictionary with 'content' and 'usage', or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, usage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.max_age_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return {'content': row[0], 'usage': json.loads(row[1])}
+
+    def put(self, key: str, model: str, content: str, usage: Dict[str, int]) -> None:
+        """
+        Store a response, then evict expired entries and least recently used ones beyond the size cap.
+
+        Args:
+            key: Request key from request_key
+            model: Model that produced the response
+            content: Completion text
+            usage: Token counts reported for the request
+        """
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, usage, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, json.dumps(usage), size, now, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age_seconds,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Evict down to 90% of the cap so eviction doesn't run on every insert
+                target = int(self.max_bytes * 0.9)
+                freed = 0
+                evict = []
+                for rowid, row_size in self._conn.execute(
+                    "SELECT rowid, size FROM responses ORDER BY last_used"
+                ):
+                    if total - freed <= target:
+                        break
+                    evict.append((rowid,))
+                    freed += row_size
+                self._conn.executemany("DELETE FROM responses WHERE rowid = ?", evict)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters for this process and the size of the cache.
+
+        Returns:
+            Dictionary with 'hits', 'misses', 'hit_rate', 'entries' and 'bytes'
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': entries,
+                'bytes': size
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide LLM response cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
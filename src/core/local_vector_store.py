@@ -0,0 +1,561 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+import numpy as np
+from src.core.ann_index import IVFIndex
+from src.core.quantization import VectorCodec
+from src.core.vector_store import DEFAULT_NAMESPACE, VectorStore, compile_filter, estimate_vector_bytes
+
+# Local stores smaller than this are searched exactly; larger ones build an IVF index
+ANN_MIN_VECTORS = 20000
+# Number of IVF lists scanned per query (higher = better recall, slower queries)
+ANN_N_PROBE = 16
+# With compact storage, top_k * RERANK_FACTOR first-pass candidates are re-scored exactly
+RERANK_FACTOR = 4
+
+@contextmanager
+def _atomic_file(path: str):
+    """Open path + '.tmp' for binary writing and move it over path once the block succeeds."""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class LocalVectorPartition:
+    """
+    In-process vector index holding one namespace's L2-normalized vectors in a NumPy matrix.
+
+    Cosine similarity against every stored vector is a single matrix-vector
+    product. Ids map to matrix rows; deleting a row moves the last row into
+    its place so the matrix stays dense. Writes are kept in memory until
+    flush() saves them to path (if given).
+
+    Once the store holds ann_min_vectors vectors, an IVF index is built in a
+    background thread (and rebuilt whenever the store doubles in size); queries
+    then scan only the n_probe closest lists and re-score those candidates
+    exactly. Until the index is ready queries fall back to the exact scan.
+
+    With storage='float16'/'int8' and/or search_dims, the in-memory search
+    matrix holds compact, optionally truncated vectors (see VectorCodec). The
+    full float32 vectors are kept in a memory-mapped file next to path and are
+    only read to re-rank the best first-pass candidates exactly.
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None,
+                 ann_min_vectors: int = ANN_MIN_VECTORS, n_probe: int = ANN_N_PROBE,
+                 storage: str = 'float32', search_dims: Optional[int] = None,
+                 rerank_factor: int = RERANK_FACTOR):
+        self.dimension = dimension
+        self.path = path
+        self.ann_min_vectors = ann_min_vectors
+        self.n_probe = n_probe
+        self.rerank_factor = rerank_factor
+        self.codec = VectorCodec(dimension, storage, search_dims)
+        self.ann: Optional[IVFIndex] = None
+        self._matrix = np.zeros((0, self.codec.search_dims), dtype=self.codec.dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        # Full-precision vectors for re-ranking; only needed when the codec is lossy
+        self._full: Optional[np.ndarray] = None
+        self._full_path = path + ".full.f32" if path and not self.codec.is_exact else None
+        self._size = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._metadata: List[Dict[str, Any]] = []
+        # 'file' metadata value -> rows, so file-filtered queries only visit those rows
+        self._file_rows: Dict[Any, set] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        # Rows written while an index is being built/loaded, re-assigned when it is installed
+        self._ann_pending: Optional[set] = None
+        self._ann_builds = 0
+        self._ann_trained_size = 0
+
+        if not self.codec.is_exact:
+            self._grow_full(0)
+        if path and os.path.exists(path + ".npy"):
+            self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def memory_usage(self) -> int:
+        """Return the bytes held in RAM by the search matrix and its scales."""
+        return self._size * self.codec.bytes_per_vector
+
+    def _normalize(self, values) -> np.ndarray:
+        """Return values as a unit-length float32 vector (zero vectors stay zero)."""
+        vec = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _grow_full(self, capacity: int) -> None:
+        """Resize the full-precision vector storage (a memmap when the store has a path)."""
+        if self._full_path:
+            os.makedirs(os.path.dirname(self._full_path) or '.', exist_ok=True)
+            if isinstance(self._full, np.memmap):
+                self._full.flush()
+            with open(self._full_path, 'r+b' if os.path.exists(self._full_path) else 'w+b') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < capacity * self.dimension * 4:
+                    f.truncate(capacity * self.dimension * 4)
+            if capacity:
+                self._full = np.memmap(self._full_path, dtype=np.float32, mode='r+',
+                                       shape=(capacity, self.dimension))
+            else:
+                self._full = np.zeros((0, self.dimension), dtype=np.float32)
+        else:
+            grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+            if self._full is not None:
+                grown[:self._size] = self._full[:self._size]
+            self._full = grown
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the storage geometrically so appends are amortized O(1)."""
+        if rows <= self._matrix.shape[0]:
+            return
+        capacity = max(rows, self._matrix.shape[0] * 2, 1024)
+        grown = np.zeros((capacity, self.codec.search_dims), dtype=self.codec.dtype)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        self._scales = scales
+        if self._full is not None:
+            self._grow_full(capacity)
+
+    def _set_metadata(self, row: int, metadata: Dict[str, Any]) -> None:
+        """Store a row's metadata, keeping the file -> rows index in sync."""
+        if row < len(self._metadata):
+            self._unindex_file(row)
+            self._metadata[row] = metadata
+        else:
+            self._metadata.append(metadata)
+        self._file_rows.setdefault(metadata.get('file'), set()).add(row)
+
+    def _unindex_file(self, row: int) -> None:
+        file_name = self._metadata[row].get('file')
+        rows = self._file_rows[file_name]
+        rows.discard(row)
+        if not rows:
+            del self._file_rows[file_name]
+
+    def _filter_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Return the rows whose metadata matches filter, visiting only the filtered files' rows if possible."""
+        matches = compile_filter(filter)
+        condition = filter.get('file')
+        files = None
+        if condition is not None and not isinstance(condition, dict):
+            files = [condition]
+        elif isinstance(condition, dict) and '$eq' in condition:
+            files = [condition['$eq']]
+        elif isinstance(condition, dict) and '$in' in condition:
+            files = condition['$in']
+        if files is None:
+            candidates = range(self._size)
+        else:
+            candidates = sorted({row for file_name in files for row in self._file_rows.get(file_name, ())})
+        return np.array([row for row in candidates if matches(self._metadata[row])], dtype=np.int64)
+
+    def _search_vectors(self, rows) -> np.ndarray:
+        """Return the (approximate) search-space float32 vectors stored at rows."""
+        return self.codec.decode(self._matrix[rows], self._scales[rows])
+
+    def _row_changed(self, row: int) -> None:
+        """Keep the ANN index in sync after a row's vector changed."""
+        if self.ann is not None:
+            self.ann.assign([row], self._search_vectors([row]))
+        if self._ann_pending is not None:
+            self._ann_pending.add(row)
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        """Insert or replace vectors by id."""
+        if not vectors:
+            return
+        with self._lock:
+            self._reserve(self._size + len(vectors))
+            rows = []
+            for v in vectors:
+                row = self._rows.get(v['id'])
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[v['id']] = row
+                    self._ids.append(v['id'])
+                self._set_metadata(row, v.get('metadata') or {})
+                rows.append(row)
+
+            full = np.stack([self._normalize(v['values']) for v in vectors])
+            codes, scales = self.codec.encode(full)
+            self._matrix[rows] = codes
+            self._scales[rows] = scales
+            if self._full is not None:
+                self._full[rows] = full
+            for row in rows:
+                self._row_changed(row)
+            self._dirty = True
+
+            # Build the first index, or rebuild once the data has doubled since training
+            if (self._ann_pending is None and self._size >= self.ann_min_vectors
+                    and self._size >= 2 * self._ann_trained_size):
+                self.build_ann(background=True)
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove vectors by id; unknown ids are ignored."""
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if self.ann is not None:
+                    self.ann.remove(last)
+                self._unindex_file(last)
+                if row != last:
+                    # Move the last row into the hole to keep rows contiguous
+                    moved_id = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._scales[row] = self._scales[last]
+                    if self._full is not None:
+                        self._full[row] = self._full[last]
+                    self._ids[row] = moved_id
+                    self._set_metadata(row, self._metadata[last])
+                    self._rows[moved_id] = row
+                    self._row_changed(row)
+                self._ids.pop()
+                self._metadata.pop()
+                self._size -= 1
+            self._dirty = True
+
+    def query(self, vector: List[float], top_k: int = 5,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Return the top_k stored vectors matching filter most similar to vector."""
+        with self._lock:
+            if self._size == 0 or top_k <= 0:
+                return []
+            q = self._normalize(vector)
+            q_search = self.codec.project(q)[0]
+
+            rows = None
+            if self.ann is not None and not filter:
+                rows = self.ann.candidates(q_search, self.n_probe)
+                if len(rows) < top_k:
+                    rows = None
+            if filter:
+                # Filtered queries scan the matching rows exactly; the IVF lists could miss them
+                rows = self._filter_rows(filter)
+                if not len(rows):
+                    return []
+                scores = self.codec.scores(self._matrix[rows], self._scales[rows], q_search)
+            elif rows is None:
+                rows = np.arange(self._size)
+                scores = self.codec.scores(self._matrix[:self._size], self._scales[:self._size], q_search)
+            else:
+                scores = self.codec.scores(self._matrix[rows], self._scales[rows], q_search)
+
+            # First pass keeps extra candidates when scores are approximate
+            k = top_k if self.codec.is_exact else top_k * self.rerank_factor
+            k = min(k, len(scores))
+            # argpartition finds the top k in O(N); only those k are sorted
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+
+            if not self.codec.is_exact:
+                # Exact re-ranking of the shortlist from the full-precision vectors
+                scores = self._full[rows] @ q
+
+            order = np.argsort(-scores)[:top_k]
+            return [
+                {'id': self._ids[row], 'score': float(scores[i]), 'metadata': self._metadata[row]}
+                for i, row in zip(order, rows[order])
+            ]
+
+    def fetch(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Return the unit-length full-precision vectors of the given ids; unknown ids are skipped."""
+        with self._lock:
+            found = [vector_id for vector_id in ids if vector_id in self._rows]
+            if not found:
+                return {}
+            rows = [self._rows[vector_id] for vector_id in found]
+            # An exact codec's search matrix holds the full float32 vectors
+            vectors = self._full[rows] if self._full is not None else self._matrix[rows]
+            return dict(zip(found, vectors))
+
+    def build_ann(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Train an IVF index over the current vectors and start using it for queries.
+
+        Training runs on a snapshot of the search matrix; writes made meanwhile
+        are applied to the new index before it replaces the old one.
+
+        Args:
+            background: Run the build in a daemon thread instead of blocking
+
+        Returns:
+            The build thread when background is True, otherwise None
+        """
+        with self._lock:
+            codes = self._matrix[:self._size].copy()
+            scales = self._scales[:self._size].copy()
+            self._start_ann_tracking()
+
+        def build():
+            size = len(codes)
+            try:
+                # Around 4 * sqrt(N) lists keeps both list scans and centroid scans cheap
+                n_lists = int(min(65536, max(16, 4 * np.sqrt(size))))
+                index = IVFIndex(n_lists, self.n_probe)
+                sample = np.random.default_rng(0).choice(size, min(size, 100000), replace=False)
+                index.train(self.codec.decode(codes[sample], scales[sample]))
+                for start in range(0, size, 65536):
+                    end = min(size, start + 65536)
+                    index.assign(list(range(start, end)), self.codec.decode(codes[start:end], scales[start:end]))
+            except BaseException:
+                self._stop_ann_tracking()
+                raise
+            self._install_ann(index, size)
+            print(f"Built IVF index with {index.n_lists} lists over {size} vectors")
+
+        if background:
+            thread = threading.Thread(target=build, name="ann-build", daemon=True)
+            thread.start()
+            return thread
+        build()
+        return None
+
+    def _start_ann_tracking(self) -> None:
+        """Start recording changed rows for an index that is being built or loaded."""
+        if self._ann_pending is None:
+            self._ann_pending = set()
+        self._ann_builds += 1
+
+    def _stop_ann_tracking(self) -> None:
+        """End the tracking started by _start_ann_tracking, whether the build or load succeeded or not."""
+        with self._lock:
+            self._ann_builds -= 1
+            if not self._ann_builds:
+                self._ann_pending = None
+
+    def _install_ann(self, index: IVFIndex, snapshot_size: int) -> None:
+        """Bring an index built from a snapshot up to date and make it the active one."""
+        with self._lock:
+            try:
+                stale = {row for row in self._ann_pending if row < self._size}
+                stale.update(range(snapshot_size, self._size))
+                for row in range(self._size, snapshot_size):
+                    index.remove(row)
+                stale = sorted(stale)
+                index.assign(stale, self._search_vectors(stale))
+                self.ann = index
+                self._ann_trained_size = snapshot_size
+            finally:
+                self._stop_ann_tracking()
+
+    def flush(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Save the vectors, metadata and ANN index to path.
+
+        Args:
+            background: Write the files in a daemon thread from a consistent snapshot
+
+        Returns:
+            The writer thread when background is True, otherwise None
+        """
+        with self._lock:
+            if not self.path or not self._dirty:
+                return None
+            matrix = self._matrix[:self._size].copy()
+            scales = self._scales[:self._size].copy()
+            state = {
+                'ids': list(self._ids),
+                'metadata': list(self._metadata),
+                'storage': self.codec.storage,
+                'search_dims': self.codec.search_dims
+            }
+            ann = self.ann
+            ann_path = self.path + ".ivf.npz"
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            if ann is not None:
+                # Save the ANN index while still holding the lock so it matches the snapshot
+                with _atomic_file(ann_path) as f:
+                    ann.save(f)
+            elif os.path.exists(ann_path):
+                os.remove(ann_path)
+            if isinstance(self._full, np.memmap):
+                self._full.flush()
+            self._dirty = False
+
+        def write():
+            # Each file is replaced atomically; the JSON goes last, so _load never sees
+            # ids and metadata newer than the arrays
+            with _atomic_file(self.path + ".npy") as f:
+                np.save(f, matrix)
+            with _atomic_file(self.path + ".scales.npy") as f:
+                np.save(f, scales)
+            with _atomic_file(self.path + ".json") as f:
+                f.write(json.dumps(state).encode('utf-8'))
+
+        if background:
+            thread = threading.Thread(target=write, name="vector-store-flush", daemon=True)
+            thread.start()
+            return thread
+        write()
+        return None
+
+    def _load(self) -> None:
+        """Load a previously flushed store from path; the ANN index loads in the background."""
+        matrix = np.load(self.path + ".npy")
+        with open(self.path + ".json", encoding='utf-8') as f:
+            data = json.load(f)
+        scales_path = self.path + ".scales.npy"
+        scales = np.load(scales_path) if os.path.exists(scales_path) else np.ones(len(matrix), dtype=np.float32)
+        if not len(matrix) == len(scales) == len(data['ids']) == len(data['metadata']):
+            raise ValueError(f"Local vector store {self.path} is inconsistent: {len(matrix)} vectors, "
+                             f"{len(scales)} scales, {len(data['ids'])} ids and {len(data['metadata'])} metadata "
+                             f"entries (interrupted flush?)")
+        self._size = matrix.shape[0]
+        self._ids = data['ids']
+        self._metadata = data['metadata']
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        for row, metadata in enumerate(self._metadata):
+            self._file_rows.setdefault(metadata.get('file'), set()).add(row)
+
+        saved_codec = VectorCodec(self.dimension, data.get('storage', 'float32'), data.get('search_dims'))
+        if (saved_codec.storage, saved_codec.search_dims) == (self.codec.storage, self.codec.search_dims):
+            self._matrix = matrix
+            self._scales = scales
+            if self._full is not None:
+                self._grow_full(self._size)
+        else:
+            # The storage settings changed: re-encode from the full-precision vectors
+            print(f"Re-encoding local vector store from {saved_codec.storage}/{saved_codec.search_dims} "
+                  f"to {self.codec.storage}/{self.codec.search_dims}")
+            if saved_codec.is_exact:
+                full = matrix
+            else:
+                full = np.memmap(self.path + ".full.f32", dtype=np.float32, mode='r',
+                                 shape=(self._size, self.dimension))
+            full = np.array(full)
+            if self._size:
+                self._matrix, self._scales = self.codec.encode(full)
+            if self._full is not None:
+                self._grow_full(self._size)
+                self._full[:self._size] = full
+            self._dirty = True
+            # A saved ANN index lives in the old search space, so build a new one
+            if self._size >= self.ann_min_vectors:
+                self.build_ann(background=True)
+            return
+
+        ann_path = self.path + ".ivf.npz"
+        if os.path.exists(ann_path):
+            self._start_ann_tracking()
+            snapshot_size = self._size
+
+            def load_ann():
+                try:
+                    index = IVFIndex.load(ann_path)
+                except BaseException:
+                    self._stop_ann_tracking()
+                    raise
+                self._install_ann(index, snapshot_size)
+
+            threading.Thread(target=load_ann, name="ann-load", daemon=True).start()
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store keeping each namespace in its own LocalVectorPartition.
+
+    Partitions are opened lazily from path/<namespace>/ on first use, so a
+    query only ever scans the vectors of its own namespace, and dropping a
+    namespace removes its files. Extra keyword arguments configure the
+    partitions (storage, search_dims, ann_min_vectors, ...).
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None, **partition_options):
+        self.dimension = dimension
+        self.path = path
+        self.partition_options = partition_options
+        self._partitions: Dict[str, LocalVectorPartition] = {}
+        self._lock = threading.Lock()
+
+    def _partition_path(self, namespace: str) -> Optional[str]:
+        """Return the file prefix of a namespace's partition, or None for an in-memory store."""
+        if not self.path:
+            return None
+        safe_namespace = re.sub(r'[^A-Za-z0-9_.-]', '_', namespace) or "_default"
+        return os.path.join(self.path, safe_namespace, "index")
+
+    def partition(self, namespace: str = DEFAULT_NAMESPACE, create: bool = False) -> Optional[LocalVectorPartition]:
+        """
+        Return the partition holding a namespace.
+
+        Args:
+            namespace: Namespace name
+            create: Create an empty partition if the namespace doesn't exist yet
+
+        Returns:
+            The partition, or None if it doesn't exist and create is False
+        """
+        with self._lock:
+            partition = self._partitions.get(namespace)
+            if partition is None:
+                path = self._partition_path(namespace)
+                if not create and not (path and os.path.exists(path + ".npy")):
+                    return None
+                partition = LocalVectorPartition(self.dimension, path=path, **self.partition_options)
+                self._partitions[namespace] = partition
+            return partition
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = DEFAULT_NAMESPACE) -> List[Dict[str, Any]]:
+        # Written in one in-process batch; errors are raised rather than reported
+        if not vectors:
+            return []
+        started = time.perf_counter()
+        self.partition(namespace, create=True).upsert(vectors)
+        return [{
+            'vectors': len(vectors),
+            'bytes': sum(estimate_vector_bytes(v) for v in vectors),
+            'seconds': time.perf_counter() - started,
+            'error': None
+        }]
+
+    def delete(self, ids: List[str], namespace: str = DEFAULT_NAMESPACE) -> None:
+        partition = self.partition(namespace)
+        if partition is not None:
+            partition.delete(ids)
+
+    def query(self, vector: List[float], top_k: int = 5, namespace: str = DEFAULT_NAMESPACE,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        partition = self.partition(namespace)
+        if partition is None:
+            return []
+        return partition.query(vector, top_k, filter)
+
+    def fetch(self, ids: List[str], namespace: str = DEFAULT_NAMESPACE) -> Dict[str, Any]:
+        partition = self.partition(namespace)
+        if partition is None:
+            return {}
+        return partition.fetch(ids)
+
+    def delete_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._partitions.pop(namespace, None)
+            path = self._partition_path(namespace)
+            if path:
+                shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    def flush(self) -> None:
+        with self._lock:
+            partitions = list(self._partitions.values())
+        for partition in partitions:
+            partition.flush()
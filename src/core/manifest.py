@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional
+from config import CACHE_DIR
+from src.core.chunker import extract_file_chunks, list_python_files, iter_file_chunks
+from src.core.content_store import get_content_store
+
+# Directory holding one manifest file per ingest scope (project or upload area)
+MANIFEST_DIR = os.path.join(CACHE_DIR, "manifests")
+# Bumped when manifests stop describing the vectors actually stored (e.g. namespacing)
+# or their layout changes (3: chunk entries no longer carry code)
+MANIFEST_VERSION = 3
+
+def content_hash(text: str) -> str:
+    """Return the sha256 hex digest of a piece of text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _file_hash(path: str) -> str:
+    """Return the sha256 hex digest of a file's bytes."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class Manifest:
+    """
+    Persistent record of per-file and per-chunk content hashes for one ingest scope.
+
+    Files whose hash is unchanged are not re-parsed: their chunks are replayed
+    from the manifest, with the code read back from the content store. Chunks
+    whose hash is unchanged are not re-embedded. Chunk ids that disappear are
+    reported so their vectors can be deleted. The manifest itself holds no
+    code, so its size is independent of how large the chunks are.
+    """
+
+    def __init__(self, scope: str, data: Optional[Dict[str, Any]] = None):
+        self.scope = scope
+        data = data or {}
+        # file path -> {'sha256': ..., 'chunks': [{'id', 'sha256', 'name', 'type'}, ...]}
+        self.files = data.get('files', {})
+        # chunk id -> sha256 of its code
+        self.chunks = data.get('chunks', {})
+        self._seen_files = {}
+
+    @staticmethod
+    def _entry(chunk: Dict[str, Any]) -> Dict[str, str]:
+        """Return the code-free record of a chunk kept in the manifest."""
+        metadata = chunk['metadata']
+        return {'id': chunk['id'], 'sha256': content_hash(chunk['code']),
+                'name': metadata['name'], 'type': metadata['type']}
+
+    def _replay(self, path: str, source_dir: str, rel_path: str) -> List[Dict[str, Any]]:
+        """Rebuild an unchanged file's chunks from the manifest and the content store."""
+        entries = self.files[rel_path]['chunks']
+        code = get_content_store().get_many(self.scope, [entry['id'] for entry in entries])
+        if len(code) < len(entries):
+            # The stored code is gone (e.g. the content store was cleared): parse the file again
+            return extract_file_chunks(path, source_dir)
+        return [
+            {'id': entry['id'], 'code': code[entry['id']],
+             'metadata': {'file': rel_path, 'name': entry['name'], 'type': entry['type']}}
+            for entry in entries
+        ]
+
+    @staticmethod
+    def path_for(scope: str) -> str:
+        """Return the manifest file path for a scope."""
+        safe_scope = re.sub(r'[^A-Za-z0-9_.-]', '_', scope)
+        return os.path.join(MANIFEST_DIR, f"{safe_scope}.json")
+
+    @classmethod
+    def load(cls, scope: str) -> "Manifest":
+        """
+        Load the manifest for a scope, or start an empty one.
+
+        Args:
+            scope: Name identifying the ingest scope; also the vector store namespace it indexes
+
+        Returns:
+            Manifest instance
+        """
+        path = cls.path_for(scope)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(scope)
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable manifest {path}: {e}")
+            return cls(scope)
+        if data.get('version') != MANIFEST_VERSION:
+            print(f"Ignoring outdated manifest {path}")
+            return cls(scope)
+        return cls(scope, data)
+
+    def save(self) -> None:
+        """Write the manifest to disk atomically."""
+        path = self.path_for(self.scope)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files, 'chunks': self.chunks}, f)
+        os.replace(tmp_path, path)
+
+    def iter_chunks(self, source_dir: str, workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every chunk under source_dir in walk order, parsing only changed files.
+
+        Args:
+            source_dir: Directory containing Python files
+            workers: Number of worker processes used to parse changed files
+
+        Yields:
+            Chunk dictionaries with 'id', 'code', and 'metadata' keys
+        """
+        paths = list_python_files(source_dir)
+        hashes = {}
+        changed = []
+        for path in paths:
+            rel_path = os.path.relpath(path, source_dir)
+            try:
+                hashes[path] = _file_hash(path)
+            except OSError as e:
+                print(f"Error hashing {path}: {e}")
+                continue
+            if self.files.get(rel_path, {}).get('sha256') != hashes[path]:
+                changed.append(path)
+
+        print(f"Manifest: {len(changed)} of {len(hashes)} files changed")
+        changed_set = set(changed)
+        parsed = iter_file_chunks(source_dir, workers, changed)
+
+        for path in paths:
+            if path not in hashes:
+                continue
+            rel_path = os.path.relpath(path, source_dir)
+            if path in changed_set:
+                file_chunks = next(parsed)
+            else:
+                file_chunks = self._replay(path, source_dir, rel_path)
+            self._seen_files[rel_path] = {'sha256': hashes[path],
+                                          'chunks': [self._entry(chunk) for chunk in file_chunks]}
+            yield from file_chunks
+
+    def is_changed(self, chunk: Dict[str, Any]) -> bool:
+        """Return True if the chunk is new or its code differs from the recorded hash."""
+        return self.chunks.get(chunk['id']) != content_hash(chunk['code'])
+
+    def commit(self, full_snapshot: bool = True) -> List[str]:
+        """
+        Record the files seen by iter_chunks and return chunk ids that disappeared.
+
+        Args:
+            full_snapshot: True if the ingest covered the whole scope, so files
+                not seen were deleted; False if only the seen files were re-uploaded
+
+        Returns:
+            List of chunk ids whose vectors should be deleted
+        """
+        if full_snapshot:
+            replaced = set(self.files)
+        else:
+            replaced = set(self._seen_files) & set(self.files)
+
+        old_ids = {c['id'] for f in replaced for c in self.files[f]['chunks']}
+        new_ids = {c['id'] for entry in self._seen_files.values() for c in entry['chunks']}
+        removed = sorted(old_ids - new_ids)
+
+        for f in replaced:
+            del self.files[f]
+        self.files.update(self._seen_files)
+        for chunk_id in removed:
+            self.chunks.pop(chunk_id, None)
+        for entry in self._seen_files.values():
+            for chunk in entry['chunks']:
+                self.chunks[chunk['id']] = chunk['sha256']
+
+        self._seen_files = {}
+        return removed
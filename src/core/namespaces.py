@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List
+from config import CACHE_DIR, NAMESPACE_TTL_HOURS
+from src.core.content_store import get_content_store
+from src.core.doc_records import DocumentationRecord
+from src.core.lexical_index import drop_lexical_index
+from src.core.manifest import Manifest
+from src.core.neighbours import neighbour_record_path
+from src.core.vector_store import VectorStore
+
+# Last-used timestamps of every namespace written to the vector store
+NAMESPACE_REGISTRY_PATH = os.path.join(CACHE_DIR, "namespaces.json")
+# Minimum seconds between persisted touches of the same namespace
+TOUCH_INTERVAL = 60
+# Minimum seconds between background garbage collections of stale namespaces
+COLLECT_INTERVAL = 3600
+
+class NamespaceRegistry:
+    """
+    Persistent record of when each namespace was last written or queried.
+
+    Used to find namespaces that nobody has touched for longer than the TTL
+    so their vectors, lexical index and manifest can be dropped.
+    """
+
+    def __init__(self, path: str = NAMESPACE_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._last_used: Dict[str, float] = json.load(f)
+        except FileNotFoundError:
+            self._last_used = {}
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable namespace registry {path}: {e}")
+            self._last_used = {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._last_used, f)
+        os.replace(tmp_path, self.path)
+
+    def touch(self, namespace: str) -> None:
+        """Mark a namespace as used now (persisted at most every TOUCH_INTERVAL seconds)."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_used.get(namespace, 0) < TOUCH_INTERVAL:
+                return
+            self._last_used[namespace] = now
+            self._save()
+
+    def stale(self, ttl_seconds: float) -> List[str]:
+        """Return namespaces unused for longer than ttl_seconds."""
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            return [ns for ns, last_used in self._last_used.items() if last_used < cutoff]
+
+    def forget(self, namespace: str) -> None:
+        """Remove a namespace from the registry."""
+        with self._lock:
+            if self._last_used.pop(namespace, None) is not None:
+                self._save()
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_namespace_registry() -> NamespaceRegistry:
+    """Return the process-wide namespace registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = NamespaceRegistry()
+        return _registry
+
+_namespace_locks: Dict[str, threading.Lock] = {}
+_namespace_locks_lock = threading.Lock()
+
+def namespace_lock(namespace: str) -> threading.Lock:
+    """
+    Return the process-wide lock of a namespace.
+
+    Held while a namespace is ingested or garbage-collected, so two ingests
+    never interleave their manifest and vector updates and a namespace is
+    never dropped halfway through an ingest.
+    """
+    with _namespace_locks_lock:
+        if namespace not in _namespace_locks:
+            _namespace_locks[namespace] = threading.Lock()
+        return _namespace_locks[namespace]
+
+def _drop_namespace(store: VectorStore, namespace: str) -> None:
+    """Remove everything stored for a namespace."""
+    store.delete_namespace(namespace)
+    get_content_store().delete_namespace(namespace)
+    drop_lexical_index(namespace)
+    for path in (Manifest.path_for(namespace), DocumentationRecord.path_for(namespace),
+                 neighbour_record_path(namespace)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def collect_stale_namespaces(store: VectorStore, ttl_hours: float = NAMESPACE_TTL_HOURS) -> List[str]:
+    """
+    Drop every namespace unused for longer than the TTL.
+
+    The namespace's vectors, stored code, lexical index, ingest manifest,
+    documentation record and neighbour lists are removed, so a later upload
+    into the same namespace is indexed and documented from scratch. A
+    namespace that fails to be dropped is logged and kept in the registry,
+    so it is retried by the next collection.
+
+    Args:
+        store: Vector store holding the namespaces
+        ttl_hours: Hours of inactivity after which a namespace is dropped
+
+    Returns:
+        Names of the dropped namespaces
+    """
+    registry = get_namespace_registry()
+    ttl_seconds = ttl_hours * 3600
+    dropped = []
+    for namespace in registry.stale(ttl_seconds):
+        with namespace_lock(namespace):
+            # An ingest may have touched the namespace while we waited for its lock
+            if namespace not in registry.stale(ttl_seconds):
+                continue
+            try:
+                _drop_namespace(store, namespace)
+            except Exception as e:
+                print(f"Error garbage-collecting namespace {namespace}: {e}")
+                continue
+            registry.forget(namespace)
+            dropped.append(namespace)
+
+    if dropped:
+        print(f"Garbage-collected {len(dropped)} stale namespaces: {', '.join(dropped)}")
+    return dropped
+
+_last_collection = 0.0
+_collection_lock = threading.Lock()
+
+def collect_stale_namespaces_in_background(get_store: Callable[[], VectorStore]) -> None:
+    """
+    Run collect_stale_namespaces on a daemon thread, at most once per COLLECT_INTERVAL.
+
+    Called when an ingest starts rather than at page load, so connecting to the
+    vector store never delays the first paint and a failure never breaks it.
+
+    Args:
+        get_store: Returns the vector store; called on the background thread
+    """
+    global _last_collection
+    with _collection_lock:
+        now = time.time()
+        if now - _last_collection < COLLECT_INTERVAL:
+            return
+        _last_collection = now
+
+    def collect():
+        try:
+            collect_stale_namespaces(get_store())
+        except Exception as e:
+            print(f"Error garbage-collecting stale namespaces: {e}")
+
+    threading.Thread(target=collect, name="namespace-gc", daemon=True).start()
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+from config import CACHE_DIR
+from src.core.manifest import content_hash
+
+# Number of nearest neighbours recorded per chunk at ingest time
+NEIGHBOUR_K = 5
+# Rows (and columns) of the similarity matrix computed per matrix product
+_NEIGHBOUR_BLOCK = 1024
+# Directory holding the neighbour lists of each namespace, reused by the next upload
+NEIGHBOUR_DIR = os.path.join(CACHE_DIR, "neighbours")
+
+def neighbour_record_path(namespace: str) -> str:
+    """Return the file holding a namespace's neighbour lists and the chunk hashes they were computed from."""
+    safe_namespace = re.sub(r'[^A-Za-z0-9_.-]', '_', namespace) or "_default"
+    return os.path.join(NEIGHBOUR_DIR, f"{safe_namespace}.json")
+
+def _load_record(namespace: str) -> Dict[str, Any]:
+    path = neighbour_record_path(namespace)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable neighbour record {path}: {e}")
+    return {'hashes': {}, 'neighbours': {}}
+
+def _save_record(namespace: str, hashes: Dict[str, str], neighbours: Dict[str, List[Tuple[str, float]]]) -> None:
+    path = neighbour_record_path(namespace)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'hashes': hashes, 'neighbours': neighbours}, f)
+    os.replace(tmp_path, path)
+
+def _vectors(chunks: List[Dict[str, Any]], namespace: Optional[str]):
+    """Return the unit-length embeddings of chunks, taken from the vector store where it holds them."""
+    import numpy as np
+    # Imported here: src.core.embeddings depends on src.core.namespaces, which imports this module
+    from src.core.embeddings import embed_texts, get_vector_store
+
+    ids = [c['id'] for c in chunks]
+    vectors = get_vector_store().fetch(ids, namespace) if namespace is not None else {}
+    missing = [c for c in chunks if c['id'] not in vectors]
+    if missing:
+        # Served from the embedding cache for chunks embedded during ingest
+        vectors.update(zip([c['id'] for c in missing], embed_texts([c['code'] for c in missing])))
+    matrix = np.asarray([vectors[i] for i in ids], dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return matrix
+
+def _vector_matrix(chunks: List[Dict[str, Any]], namespace: Optional[str], f):
+    """Write the unit-length embeddings of chunks, one block at a time, into a matrix memory-mapped on file f."""
+    import numpy as np
+
+    matrix = None
+    for start in range(0, len(chunks), _NEIGHBOUR_BLOCK):
+        block = _vectors(chunks[start:start + _NEIGHBOUR_BLOCK], namespace)
+        if matrix is None:
+            matrix = np.memmap(f, dtype=np.float32, mode='w+', shape=(len(chunks), block.shape[1]))
+        matrix[start:start + len(block)] = block
+    return matrix
+
+def compute_neighbours(chunks: List[Dict[str, Any]], top_k: int = NEIGHBOUR_K,
+                       namespace: Optional[str] = None) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Compute each chunk's top_k most similar chunks with blocked matrix products.
+
+    With a namespace, embeddings are read from the vector store (falling back
+    to embed_texts, i.e. the embedding cache, for vectors it doesn't return),
+    and the result is recorded with the hash of every chunk. The next call
+    for the namespace only recomputes the rows of new or changed chunks, and
+    of chunks that lost a neighbour to a change or deletion; every other
+    row keeps its neighbours and merges in the changed chunks that came
+    closer. Embeddings are read once into a memory-mapped temporary file and
+    similarities are computed _NEIGHBOUR_BLOCK x _NEIGHBOUR_BLOCK at a time,
+    so memory doesn't grow with the number of chunks (squared or not).
+
+    Args:
+        chunks: Chunk dictionaries (or ChunkRecords) with 'id' and 'code'
+        top_k: Number of neighbours to keep per chunk
+        namespace: Vector store namespace the chunks were upserted into;
+            without one every row is computed from scratch and nothing is recorded
+
+    Returns:
+        Dictionary mapping chunk id to a list of (neighbour id, cosine similarity),
+        most similar first
+    """
+    if len(chunks) < 2:
+        return {c['id']: [] for c in chunks}
+
+    # NumPy is only needed once documents are indexed, so it is not loaded at startup
+    import numpy as np
+
+    n = len(chunks)
+    ids = [c['id'] for c in chunks]
+    hashes = {c['id']: content_hash(c['code']) for c in chunks}
+    k = min(top_k, n - 1)
+
+    record = _load_record(namespace) if namespace is not None else {'hashes': {}, 'neighbours': {}}
+    changed = {chunk_id for chunk_id in ids if record['hashes'].get(chunk_id) != hashes[chunk_id]}
+    invalid = changed | (record['hashes'].keys() - hashes.keys())
+
+    # Rows whose recorded neighbours are all still valid only need the changed chunks as new candidates
+    kept = {}
+    for chunk_id in ids:
+        if chunk_id in changed:
+            continue
+        valid = [(nid, score) for nid, score in record['neighbours'].get(chunk_id, []) if nid not in invalid][:k]
+        if len(valid) == k:
+            kept[chunk_id] = valid
+    candidates = {chunk_id: [] for chunk_id in kept}
+    is_changed = np.array([chunk_id in changed for chunk_id in ids])
+    is_kept = np.array([chunk_id in kept for chunk_id in ids])
+    rows = np.array([p for p, chunk_id in enumerate(ids) if chunk_id not in kept], dtype=np.int64)
+
+    neighbours = {}
+    with tempfile.TemporaryFile() as f:
+        # With nothing changed every row is kept and no embedding is needed
+        matrix = _vector_matrix(chunks, namespace, f) if len(rows) else None
+        for row_start in range(0, len(rows), _NEIGHBOUR_BLOCK):
+            block_rows = rows[row_start:row_start + _NEIGHBOUR_BLOCK]
+            row_vectors = matrix[block_rows]
+            best_scores = np.full((len(block_rows), k), -np.inf, dtype=np.float32)
+            best_cols = np.full((len(block_rows), k), -1, dtype=np.int64)
+            changed_rows = np.nonzero(is_changed[block_rows])[0]
+
+            for start in range(0, n, _NEIGHBOUR_BLOCK):
+                end = min(start + _NEIGHBOUR_BLOCK, n)
+                sims = row_vectors @ matrix[start:end].T
+                # A chunk is not its own neighbour
+                own = np.nonzero((block_rows >= start) & (block_rows < end))[0]
+                sims[own, block_rows[own] - start] = -np.inf
+
+                # Merge this block into each row's running top k
+                scores = np.concatenate([best_scores, sims], axis=1)
+                cols = np.concatenate([best_cols, np.broadcast_to(np.arange(start, end), sims.shape)], axis=1)
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(scores, top, axis=1)
+                best_cols = np.take_along_axis(cols, top, axis=1)
+
+                # Changed chunks are candidates for the kept rows of this block
+                kept_cols = np.nonzero(is_kept[start:end])[0]
+                if len(changed_rows) and len(kept_cols):
+                    sub = sims[np.ix_(changed_rows, kept_cols)]
+                    kc = min(k, len(changed_rows))
+                    top = np.argpartition(-sub, kc - 1, axis=0)[:kc]
+                    for j, col in enumerate(kept_cols):
+                        candidates[ids[start + col]].extend(
+                            (ids[block_rows[changed_rows[t]]], float(sub[t, j])) for t in top[:, j]
+                        )
+
+            for i, p in enumerate(block_rows):
+                order = np.argsort(-best_scores[i])
+                neighbours[ids[p]] = [(ids[best_cols[i, j]], float(best_scores[i, j])) for j in order]
+
+    for chunk_id, valid in kept.items():
+        neighbours[chunk_id] = sorted(valid + candidates[chunk_id], key=lambda item: item[1], reverse=True)[:k]
+    neighbours = {chunk_id: neighbours[chunk_id] for chunk_id in ids}
+
+    if namespace is not None:
+        _save_record(namespace, hashes, neighbours)
+    print(f"Computed {k} neighbours for {len(rows)} of {n} chunks ({len(kept)} updated in place)")
+    return neighbours
@@ -0,0 +1,197 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from src.core.embeddings import embed_texts, chunk_to_vector, store_chunk_code, upsert_vectors, get_vector_store
+from src.core.vector_store import DEFAULT_NAMESPACE
+
+# Number of chunks that travel between stages together
+PIPELINE_BATCH_SIZE = 100
+# Maximum number of batches buffered between two stages
+PIPELINE_QUEUE_SIZE = 4
+# Most vectors combined into one upsert call when several embedded batches are waiting
+PIPELINE_UPSERT_MAX_VECTORS = 1000
+
+# Marks the end of a stage's output
+_DONE = object()
+
+def _new_stats() -> Dict[str, Dict[str, float]]:
+    """Create an empty per-stage statistics record."""
+    stats = {stage: {'items': 0, 'seconds': 0.0} for stage in ('parse', 'embed', 'upsert')}
+    # Upsert requests sent, and those that failed after their retries (and were re-sent)
+    stats['upsert'].update(batches=0, failed_batches=0)
+    return stats
+
+def format_pipeline_stats(stats: Dict[str, Dict[str, float]]) -> str:
+    """
+    Format per-stage pipeline statistics as a one-line throughput summary.
+
+    Args:
+        stats: Statistics as returned by run_ingest_pipeline
+
+    Returns:
+        String like "parse: 120 chunks (850.0/s) | ... | upsert: 120 chunks (95.2/s, 1 of 4 batches failed)"
+    """
+    parts = []
+    for stage, stage_stats in stats.items():
+        rate = stage_stats['items'] / stage_stats['seconds'] if stage_stats['seconds'] else 0.0
+        part = f"{stage}: {stage_stats['items']} chunks ({rate:.1f}/s"
+        if stage_stats.get('batches'):
+            part += f", {stage_stats['failed_batches']} of {stage_stats['batches']} batches failed"
+        parts.append(part + ")")
+    return " | ".join(parts)
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put item on a bounded queue, giving up if the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    """Get the next item from a queue, returning _DONE if the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def run_ingest_pipeline(chunks: Iterable[Dict[str, Any]],
+                        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        on_progress: Optional[Callable[[Dict[str, Dict[str, float]]], None]] = None,
+                        should_index: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                        namespace: str = DEFAULT_NAMESPACE,
+                        batch_size: int = PIPELINE_BATCH_SIZE,
+                        queue_size: int = PIPELINE_QUEUE_SIZE,
+                        upsert_max_vectors: int = PIPELINE_UPSERT_MAX_VECTORS) -> Dict[str, Dict[str, float]]:
+    """
+    Parse, embed and upsert chunks into the vector store as overlapping stages.
+
+    Parsing (consuming the chunks iterable) and embedding each run in their own
+    thread while upserts run on the calling thread, so network calls overlap
+    with parsing. Stages are connected by bounded queues, so at most a few
+    batches are held in memory at any time. Embedded batches that queue up
+    while an upsert is in flight are combined into the next upsert call (up to
+    upsert_max_vectors), so the store can send their requests in parallel.
+
+    Args:
+        chunks: Iterable of chunk dictionaries, typically iter_chunks(...)
+        on_chunk: Optional callback invoked for every parsed chunk; it runs on the
+            parse thread, so it must not update Streamlit widgets
+        on_progress: Optional callback receiving the stats after each upsert;
+            it runs on the calling thread so it may update Streamlit widgets
+        should_index: Optional predicate; chunks for which it returns False are
+            passed to on_chunk but not embedded or upserted
+        namespace: Vector store namespace (project or session) to upsert into
+        batch_size: Number of chunks per batch passed between stages
+        queue_size: Maximum number of batches buffered between two stages
+        upsert_max_vectors: Most vectors combined into one upsert call
+
+    Returns:
+        Dictionary of per-stage stats with 'items' and busy 'seconds'; the
+        upsert stage also counts request 'batches' and 'failed_batches'
+    """
+    stats = _new_stats()
+    parsed = queue.Queue(maxsize=queue_size)
+    embedded = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def parse_stage():
+        try:
+            batch = []
+            started = time.perf_counter()
+            for chunk in chunks:
+                if on_chunk:
+                    on_chunk(chunk)
+                stats['parse']['items'] += 1
+                if should_index and not should_index(chunk):
+                    continue
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    stats['parse']['seconds'] += time.perf_counter() - started
+                    if not _put(parsed, batch, stop):
+                        return
+                    batch = []
+                    started = time.perf_counter()
+            stats['parse']['seconds'] += time.perf_counter() - started
+            if batch:
+                _put(parsed, batch, stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(parsed, _DONE, stop)
+
+    def embed_stage():
+        try:
+            while True:
+                batch = _get(parsed, stop)
+                if batch is _DONE:
+                    return
+                started = time.perf_counter()
+                embeddings = embed_texts([c['code'] for c in batch])
+                vectors = [chunk_to_vector(c, vec) for c, vec in zip(batch, embeddings)]
+                # Code is stored before its vector is upserted, so search hits always resolve
+                store_chunk_code(batch, namespace)
+                stats['embed']['seconds'] += time.perf_counter() - started
+                stats['embed']['items'] += len(vectors)
+                if not _put(embedded, vectors, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(embedded, _DONE, stop)
+
+    workers = [
+        threading.Thread(target=parse_stage, name="ingest-parse", daemon=True),
+        threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        store = get_vector_store()
+        while True:
+            vectors = _get(embedded, stop)
+            if vectors is _DONE:
+                break
+            # Take along batches that were embedded while the previous upsert ran
+            done = False
+            while len(vectors) < upsert_max_vectors:
+                try:
+                    more = embedded.get_nowait()
+                except queue.Empty:
+                    break
+                if more is _DONE:
+                    done = True
+                    break
+                vectors = vectors + more
+            started = time.perf_counter()
+            reports = upsert_vectors(vectors, store, namespace)
+            stats['upsert']['seconds'] += time.perf_counter() - started
+            stats['upsert']['items'] += len(vectors)
+            stats['upsert']['batches'] += len(reports)
+            stats['upsert']['failed_batches'] += sum(1 for report in reports if report['error'] is not None)
+            if on_progress:
+                on_progress(stats)
+            if done:
+                break
+    except Exception:
+        stop.set()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+
+    if errors:
+        raise errors[0]
+    store.flush()
+
+    print(f"Pipeline finished: {format_pipeline_stats(stats)}")
+    return stats
@@ -0,0 +1,87 @@
+from typing import Optional, Tuple
+import numpy as np
+
+# Supported storage types for the first-pass search matrix
+STORAGE_TYPES = ('float32', 'float16', 'int8')
+
+# Rows converted to float32 at a time when scoring compact matrices
+_SCORE_BLOCK = 65536
+
+class VectorCodec:
+    """
+    Encodes unit vectors into a compact search representation.
+
+    Vectors are optionally truncated to their first search_dims components
+    (text-embedding-3 models are trained so that prefixes remain meaningful)
+    and re-normalized, then stored as float32, float16 or int8. int8 rows are
+    scaled per row so each row uses the full [-127, 127] range; the scale is
+    kept alongside the codes.
+    """
+
+    def __init__(self, dimension: int, storage: str = 'float32', search_dims: Optional[int] = None):
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown storage type {storage!r}, expected one of {STORAGE_TYPES}")
+        self.dimension = dimension
+        self.storage = storage
+        self.search_dims = min(search_dims or dimension, dimension)
+        self.dtype = np.dtype(storage)
+
+    @property
+    def is_exact(self) -> bool:
+        """True if search scores equal exact cosine similarity (no re-ranking needed)."""
+        return self.storage == 'float32' and self.search_dims == self.dimension
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """Memory used by one encoded vector, including its int8 scale."""
+        return self.search_dims * self.dtype.itemsize + (4 if self.storage == 'int8' else 0)
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        """Truncate float vectors to search_dims and re-normalize them."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))[:, :self.search_dims]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode full-precision vectors for the search matrix.
+
+        Args:
+            vectors: Float vectors, one per row
+
+        Returns:
+            Tuple of (codes, scales) where scores are (codes @ q) * scales
+        """
+        projected = self.project(vectors)
+        if self.storage != 'int8':
+            return projected.astype(self.dtype), np.ones(len(projected), dtype=np.float32)
+        scales = np.abs(projected).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.round(projected / scales[:, None]).astype(np.int8)
+        return codes, scales
+
+    def decode(self, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Approximately reconstruct projected float32 vectors from their codes."""
+        return codes.astype(np.float32) * scales[:, None]
+
+    def scores(self, codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Approximate cosine similarity between encoded rows and a projected query.
+
+        Args:
+            codes: Encoded rows
+            scales: Per-row scales returned by encode
+            query: Query already passed through project()
+
+        Returns:
+            Array of approximate similarities
+        """
+        query = query.reshape(-1)
+        if codes.dtype == np.float32:
+            return (codes @ query) * scales
+        # Convert in blocks so a query never materializes a float32 copy of the whole matrix
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_BLOCK):
+            block = codes[start:start+_SCORE_BLOCK].astype(np.float32)
+            out[start:start+len(block)] = block @ query
+        return out * scales
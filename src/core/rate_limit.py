@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# HTTP statuses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a per-minute rate.
+
+    acquire() blocks until enough tokens are available. Requests larger than
+    the bucket are clipped to its capacity so they can never block forever.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        """Block until amount tokens can be taken from the bucket."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """Combined requests-per-minute and tokens-per-minute limiter for an API."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request carrying the given number of tokens may be sent."""
+        self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+
+def _transient_error_types() -> tuple:
+    """Return the exception types that signal a transient failure."""
+    types = (OSError,)  # includes ConnectionError and TimeoutError
+    try:
+        # Imported lazily: the OpenAI client is not loaded at startup
+        from openai import error
+    except ImportError:
+        return types
+    return types + (error.Timeout, error.APIConnectionError, error.ServiceUnavailableError, error.RateLimitError)
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Decide whether a failed API call is worth retrying.
+
+    Timeouts, connection failures, rate limiting and unavailable services are
+    retried, as are other errors carrying a rate limiting or server-side HTTP
+    status (e.g. from Pinecone). Everything else (invalid requests,
+    authentication, programming errors) is raised immediately.
+
+    Args:
+        error: The exception raised by the call
+
+    Returns:
+        True if the call should be retried
+    """
+    if isinstance(error, _transient_error_types()):
+        return True
+    status = getattr(error, 'http_status', None) or getattr(error, 'status', None)
+    try:
+        return int(status) in RETRYABLE_STATUSES
+    except (TypeError, ValueError):
+        return False
+
+def retry_with_backoff(fn: Callable[[], R], retries: int = 5, base_delay: float = 1.0,
+                       max_delay: float = 60.0,
+                       should_retry: Callable[[Exception], bool] = is_transient_error) -> R:
+    """
+    Call fn, retrying transient failures with jittered exponential backoff.
+
+    Args:
+        fn: Zero-argument callable to run
+        retries: Maximum number of retries after the first attempt
+        base_delay: Delay ceiling in seconds for the first retry
+        max_delay: Upper bound for the delay ceiling
+        should_retry: Predicate deciding whether an exception is retryable
+
+    Returns:
+        The return value of fn
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not should_retry(e):
+                raise
+            # "Full jitter": sleep a random time up to the exponential ceiling
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            attempt += 1
+            print(f"Transient error ({e}); retry {attempt}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def run_concurrently(fn: Callable[[T], R], items: Iterable[T], max_workers: int,
+                     on_done: Optional[Callable[[int, R], None]] = None,
+                     in_completion_order: bool = False) -> List[R]:
+    """
+    Apply fn to every item with bounded concurrency, keeping results in input order.
+
+    Args:
+        fn: Function to apply to each item
+        items: Items to process
+        max_workers: Maximum number of calls in flight
+        on_done: Optional callback receiving (position, result), called in the
+            calling thread (so it may update a UI) in input order
+        in_completion_order: Call on_done as soon as each item finishes instead,
+            e.g. for progress reporting
+
+    Returns:
+        List of results aligned with items
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        results = []
+        for i, item in enumerate(items):
+            results.append(fn(item))
+            if on_done:
+                on_done(i, results[-1])
+        return results
+
+    results: List[Any] = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fn, item): i for i, item in enumerate(items)}
+        for future in (as_completed(futures) if in_completion_order else futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_done:
+                on_done(i, results[i])
+    return results
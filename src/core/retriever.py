@@ -1,37 +1,217 @@
-import openai
-from typing import List, Dict, Any
-from pinecone import Pinecone
-from config import OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX
-from src.core.embeddings import embed_text
+from typing import List, Dict, Any, Optional, Tuple
+from src.core.content_store import get_content_store
+from src.core.embeddings import embed_texts, get_vector_store
+from src.core.lexical_index import BM25Index, get_lexical_index, is_identifier_query
+from src.core.namespaces import get_namespace_registry
+from src.core.vector_store import DEFAULT_NAMESPACE
 
-# Initialize clients
-openai.api_key = OPENAI_API_KEY
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX)
+# Reciprocal rank fusion constant: larger values flatten the influence of top ranks
+RRF_K = 60
 
-def semantic_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+def _format_matches(match_lists: List[List[Tuple[str, Dict[str, Any]]]]) -> List[List[Dict[str, Any]]]:
+    """
+    Convert lists of (namespace, vector store match) pairs into chunk dictionaries.
+    
+    The code of all matches is fetched from the content store with one bulk
+    lookup per namespace.
+    """
+    ids_by_namespace = {}
+    for matches in match_lists:
+        for namespace, m in matches:
+            ids_by_namespace.setdefault(namespace, []).append(m['id'])
+    content_store = get_content_store()
+    code = {namespace: content_store.get_many(namespace, ids) for namespace, ids in ids_by_namespace.items()}
+    
+    # Vectors upserted before the content store existed still carry their code in metadata
+    return [
+        [{'id': m['id'], 'metadata': m['metadata'], 'code': code[namespace].get(m['id'], m['metadata'].get('code', ''))}
+         for namespace, m in matches]
+        for matches in match_lists
+    ]
+
+def build_filter(files: Optional[List[str]] = None, types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build a metadata filter restricting results to some files and/or chunk types.
+    
+    Args:
+        files: Allowed values of the 'file' metadata field
+        types: Allowed values of the 'type' metadata field (e.g. "FunctionDef", "ClassDef")
+        
+    Returns:
+        Filter dictionary, or None if nothing is restricted
+    """
+    filter = {}
+    if files is not None:
+        filter['file'] = {'$in': list(files)}
+    if types is not None:
+        filter['type'] = {'$in': list(types)}
+    return filter or None
+
+def index_chunks(chunks: List[Dict[str, Any]], removed_ids: List[str] = (),
+                 namespace: str = DEFAULT_NAMESPACE) -> None:
+    """
+    Add ingested chunks to the lexical index and drop removed ones.
+    
+    Args:
+        chunks: Chunk dictionaries with 'id', 'code', and 'metadata'
+        removed_ids: Ids of chunks that no longer exist
+        namespace: Namespace the chunks were upserted into
+    """
+    lexical_index = get_lexical_index(namespace)
+    lexical_index.remove(list(removed_ids))
+    lexical_index.add(chunks)
+
+def _format_lexical(hits: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Convert (namespace, lexical index hit) pairs into chunk dictionaries.
+    
+    The lexical index keeps no code, so it is fetched from the content store
+    with one bulk lookup per namespace.
+    """
+    ids_by_namespace = {}
+    for namespace, hit in hits:
+        ids_by_namespace.setdefault(namespace, []).append(hit['id'])
+    content_store = get_content_store()
+    code = {namespace: content_store.get_many(namespace, ids) for namespace, ids in ids_by_namespace.items()}
+    return [{'id': hit['id'], 'metadata': hit['metadata'], 'code': code[namespace].get(hit['id'], '')}
+            for namespace, hit in hits]
+
+def fuse_rankings(rankings: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+    
+    Args:
+        rankings: Result lists, each ordered best first
+        top_k: Number of results to return
+        
+    Returns:
+        Fused list of chunk dictionaries, best first
+    """
+    scores = {}
+    results = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            scores[result['id']] = scores.get(result['id'], 0.0) + 1.0 / (RRF_K + rank + 1)
+            results.setdefault(result['id'], result)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [results[i] for i in ranked]
+
+def semantic_search(query: str, top_k: int = 5, namespaces: Optional[List[str]] = None,
+                    filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Return top_k code chunks semantically similar to query.
     
+    Vector hits are fused with BM25 hits over code identifiers; queries that
+    are just identifiers are answered from the lexical index alone.
+    
     Args:
         query: The search query
         top_k: Number of results to return
+        namespaces: Namespaces to search (the default namespace if not given)
+        filter: Optional metadata filter, e.g. from build_filter
         
     Returns:
         List of matching code chunks with their metadata
     """
-    # Generate embedding for the query
-    q_emb = embed_text(query)
+    return semantic_search_batch([query], top_k, namespaces, filter)[0]
+
+def _search_lexical(query: str, top_k: int, namespaces: List[str],
+                    filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run a BM25 search over several namespaces and merge the hits by score."""
+    hits = []
+    for namespace in namespaces:
+        for hit, score in get_lexical_index(namespace).search(query, top_k, filter):
+            hits.append((namespace, hit, score))
+    hits.sort(key=lambda hit: hit[2], reverse=True)
+    return _format_lexical([(namespace, hit) for namespace, hit, _ in hits[:top_k]])
+
+def _search_vectors(store, vector: List[float], top_k: int, namespaces: List[str],
+                    filter: Optional[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Query several namespaces of the vector store and merge the (namespace, match) pairs by score."""
+    matches = []
+    for namespace in namespaces:
+        matches.extend((namespace, m) for m in store.query(vector, top_k, namespace, filter))
+    matches.sort(key=lambda pair: pair[1]['score'], reverse=True)
+    return matches[:top_k]
+
+def semantic_search_batch(queries: List[str], top_k: int = 5, namespaces: Optional[List[str]] = None,
+                          filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Run several hybrid searches, embedding all queries that need it in a single request.
     
-    # Query Pinecone
-    res = index.query(
-        vector=q_emb,
-        top_k=top_k,
-        include_metadata=True
-    )
+    Args:
+        queries: The search queries
+        top_k: Number of results to return per query
+        namespaces: Namespaces to search (the default namespace if not given)
+        filter: Optional metadata filter, e.g. from build_filter
+        
+    Returns:
+        List of result lists, one per query in the same order
+    """
+    if namespaces is None:
+        namespaces = [DEFAULT_NAMESPACE]
+    if not namespaces:
+        return [[] for _ in queries]
+    registry = get_namespace_registry()
+    for namespace in namespaces:
+        registry.touch(namespace)
     
-    # Format results
-    return [
-        {'id': m.id, 'metadata': m.metadata, 'code': m.metadata.get('code', '')}
-        for m in res.matches
-    ]
\ No newline at end of file
+    lexical_hits = [_search_lexical(q, top_k * 2, namespaces, filter) for q in queries]
+    
+    # Pure identifier lookups with lexical matches skip the embedding round trip
+    needs_vectors = [i for i, q in enumerate(queries) if not (is_identifier_query(q) and lexical_hits[i])]
+    results = [hits[:top_k] for hits in lexical_hits]
+    if not needs_vectors:
+        return results
+    
+    # Generate embeddings for the remaining queries at once
+    q_embs = embed_texts([queries[i] for i in needs_vectors])
+    
+    # Query the vector store and fuse with the lexical ranking
+    store = get_vector_store()
+    match_lists = [
+        _search_vectors(store, q_emb, top_k * 2 if lexical_hits[i] else top_k, namespaces, filter)
+        for i, q_emb in zip(needs_vectors, q_embs)
+    ]
+    for i, vector_hits in zip(needs_vectors, _format_matches(match_lists)):
+        results[i] = fuse_rankings([vector_hits, lexical_hits[i]], top_k) if lexical_hits[i] else vector_hits
+    return results
+
+def rank_chunks(query: str, chunks: List[Dict[str, Any]], top_k: int = 20,
+                namespaces: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Rank a given set of chunks (e.g. those of the files selected in the chat) for a query.
+    
+    Chunks indexed in namespaces are ranked with the hybrid search restricted
+    to their files; the rest (e.g. pasted snippets) are ranked with a
+    throwaway BM25 index. Chunks matched by neither ranking are left out.
+    
+    Args:
+        query: The search query
+        chunks: Candidate chunks with 'id', 'code', and 'metadata'
+        top_k: Number of chunks to return
+        namespaces: Namespaces the candidates may be indexed in
+        
+    Returns:
+        The best matching chunks from chunks, best first
+    """
+    namespaces = namespaces or []
+    by_id = {chunk['id']: chunk for chunk in chunks}
+    lexical_indexes = [get_lexical_index(namespace) for namespace in namespaces]
+    indexed, unindexed = [], []
+    for chunk in chunks:
+        if any(chunk['id'] in index for index in lexical_indexes):
+            indexed.append(chunk)
+        else:
+            unindexed.append(chunk)
+    
+    rankings = []
+    if indexed:
+        files = dict.fromkeys(chunk['metadata']['file'] for chunk in indexed)
+        hits = semantic_search(query, top_k, namespaces, build_filter(files=files))
+        rankings.append([by_id[hit['id']] for hit in hits if hit['id'] in by_id])
+    if unindexed:
+        index = BM25Index()
+        index.add(unindexed)
+        rankings.append([by_id[hit['id']] for hit, _ in index.search(query, top_k)])
+    return fuse_rankings(rankings, top_k)
@@ -0,0 +1,244 @@
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+from src.core.rate_limit import retry_with_backoff, run_concurrently
+
+# Namespace used when none is given (Pinecone's default namespace)
+DEFAULT_NAMESPACE = ""
+
+# Pinecone upsert request limits (2MB and 1000 vectors), with headroom for request framing
+UPSERT_MAX_BATCH_BYTES = 1800000
+UPSERT_MAX_BATCH_ITEMS = 1000
+# Serialized size of one float in a JSON request body (e.g. "-0.012345678,")
+_FLOAT_JSON_BYTES = 20
+
+class UpsertError(Exception):
+    """Raised when some upsert batches still failed after their retries."""
+
+    def __init__(self, message: str, failed_vectors: List[Dict[str, Any]],
+                 reports: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        # Vectors of the failed batches only, so callers can re-send just those
+        self.failed_vectors = failed_vectors
+        # Per-batch reports of the whole upsert, failed and successful batches alike
+        self.reports = reports or []
+
+def estimate_vector_bytes(vector: Dict[str, Any]) -> int:
+    """Estimate the serialized request size of one vector record without encoding it."""
+    metadata = json.dumps(vector.get('metadata') or {})
+    return len(vector['id']) + len(metadata) + _FLOAT_JSON_BYTES * len(vector['values']) + 64
+
+def pack_upsert_batches(vectors: List[Dict[str, Any]], max_bytes: int = UPSERT_MAX_BATCH_BYTES,
+                        max_items: int = UPSERT_MAX_BATCH_ITEMS) -> List[List[Dict[str, Any]]]:
+    """
+    Split vectors into request batches bounded by serialized size and vector count.
+
+    Args:
+        vectors: Vector records in upsert order
+        max_bytes: Maximum estimated payload size per batch
+        max_items: Maximum number of vectors per batch
+
+    Returns:
+        List of batches; a single vector larger than max_bytes gets a batch of its own
+    """
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for vector in vectors:
+        size = estimate_vector_bytes(vector)
+        if batch and (len(batch) >= max_items or batch_bytes + size > max_bytes):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _as_set(operand: Any) -> Any:
+    """Return an $in/$nin operand as a frozenset for O(1) lookups, if its values are hashable."""
+    try:
+        return frozenset(operand)
+    except TypeError:
+        return operand
+
+def compile_filter(filter: Optional[Dict[str, Any]]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Turn a Pinecone-style metadata filter into a predicate over metadata dictionaries.
+
+    Supported conditions are plain values (equality) and the $eq, $ne, $in
+    and $nin operators, e.g. {"file": {"$in": ["a.py", "b.py"]}, "type": "FunctionDef"}.
+    All fields must match. $in/$nin operands are converted to sets once, so
+    evaluating the predicate costs O(1) per condition.
+
+    Args:
+        filter: Filter dictionary, or None to match everything
+
+    Returns:
+        Function returning True if a metadata dictionary satisfies the filter
+    """
+    conditions = []
+    for field, condition in (filter or {}).items():
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for op, operand in condition.items():
+            if op not in ('$eq', '$ne', '$in', '$nin'):
+                raise ValueError(f"Unsupported filter operator {op!r}")
+            conditions.append((field, op, _as_set(operand) if op in ('$in', '$nin') else operand))
+
+    def matches(metadata: Dict[str, Any]) -> bool:
+        for field, op, operand in conditions:
+            value = metadata.get(field)
+            if op == '$eq':
+                ok = value == operand
+            elif op == '$ne':
+                ok = value != operand
+            elif op == '$in':
+                ok = value in operand
+            else:
+                ok = value not in operand
+            if not ok:
+                return False
+        return True
+
+    return matches
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a metadata filter (see compile_filter) against one metadata dictionary.
+
+    Use compile_filter instead when testing many dictionaries against the same filter.
+
+    Args:
+        metadata: Metadata of a stored vector or chunk
+        filter: Filter dictionary, or None to match everything
+
+    Returns:
+        True if the metadata satisfies the filter
+    """
+    return compile_filter(filter)(metadata)
+
+class VectorStore:
+    """
+    Interface shared by the vector index backends.
+
+    Vectors are dictionaries with 'id', 'values' and 'metadata' keys, and
+    query results are dictionaries with 'id', 'score' and 'metadata' keys.
+    Vectors live in namespaces (e.g. one per project or session) which are
+    queried independently and can be dropped as a whole.
+    """
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = DEFAULT_NAMESPACE) -> List[Dict[str, Any]]:
+        """
+        Insert or replace vectors by id.
+
+        Returns:
+            Per-batch reports with 'vectors', 'bytes', 'seconds' and 'error' (None on success)
+        """
+        raise NotImplementedError
+
+    def delete(self, ids: List[str], namespace: str = DEFAULT_NAMESPACE) -> None:
+        """Remove vectors by id; unknown ids are ignored."""
+        raise NotImplementedError
+
+    def query(self, vector: List[float], top_k: int = 5, namespace: str = DEFAULT_NAMESPACE,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Return the top_k vectors of a namespace matching filter that are most similar to vector."""
+        raise NotImplementedError
+
+    def fetch(self, ids: List[str], namespace: str = DEFAULT_NAMESPACE) -> Dict[str, Any]:
+        """
+        Return stored vectors by id, for backends that hold them locally.
+
+        Backends that would need a network round trip return nothing, so
+        callers fall back to the embedding cache. Ids missing from the result
+        are not stored.
+        """
+        return {}
+
+    def delete_namespace(self, namespace: str) -> None:
+        """Remove every vector in a namespace."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persist pending writes, for backends that buffer them."""
+
+class PineconeVectorStore(VectorStore):
+    """
+    Vector store backed by a Pinecone index handle.
+
+    Upserts are packed into batches by estimated payload size and sent with
+    up to concurrency requests in flight.
+    """
+
+    def __init__(self, index, concurrency: int = 4, max_batch_bytes: int = UPSERT_MAX_BATCH_BYTES,
+                 max_batch_items: int = UPSERT_MAX_BATCH_ITEMS):
+        self.index = index
+        self.concurrency = concurrency
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_items = max_batch_items
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = DEFAULT_NAMESPACE) -> List[Dict[str, Any]]:
+        """
+        Upsert vectors in size-bounded batches sent in parallel.
+
+        Each batch is retried on its own, so one failure doesn't redo or abort
+        the others. Failed batches are reported once all batches finished.
+
+        Returns:
+            Per-batch reports with 'vectors', 'bytes', 'seconds' and 'error' (None on success)
+
+        Raises:
+            UpsertError: If any batch still failed after its retries
+        """
+        batches = pack_upsert_batches(vectors, self.max_batch_bytes, self.max_batch_items)
+
+        def send(batch):
+            started = time.perf_counter()
+            error = None
+            try:
+                retry_with_backoff(lambda: self.index.upsert(vectors=batch, namespace=namespace))
+            except Exception as e:
+                error = e
+            return {
+                'vectors': len(batch),
+                'bytes': sum(estimate_vector_bytes(v) for v in batch),
+                'seconds': time.perf_counter() - started,
+                'error': error
+            }
+
+        reports = run_concurrently(send, batches, self.concurrency)
+        if reports:
+            latencies = [r['seconds'] for r in reports]
+            failed = [i for i, r in enumerate(reports) if r['error'] is not None]
+            print(f"Upserted {len(vectors)} vectors in {len(reports)} batches "
+                  f"(mean {sum(latencies) / len(latencies) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms per batch, "
+                  f"{len(failed)} failed)")
+            if failed:
+                for i in failed:
+                    print(f"Upsert batch {i} ({reports[i]['vectors']} vectors) failed: {reports[i]['error']}")
+                raise UpsertError(
+                    f"{len(failed)} of {len(reports)} upsert batches failed",
+                    [v for i in failed for v in batches[i]],
+                    reports
+                )
+        return reports
+
+    def delete(self, ids: List[str], namespace: str = DEFAULT_NAMESPACE) -> None:
+        for i in range(0, len(ids), 1000):
+            batch = ids[i:i+1000]
+            retry_with_backoff(lambda: self.index.delete(ids=batch, namespace=namespace))
+
+    def query(self, vector: List[float], top_k: int = 5, namespace: str = DEFAULT_NAMESPACE,
+              filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        res = retry_with_backoff(lambda: self.index.query(
+            vector=vector, top_k=top_k, namespace=namespace, filter=filter, include_metadata=True
+        ))
+        return [
+            {'id': m.id, 'score': m.score, 'metadata': m.metadata or {}}
+            for m in res.matches
+        ]
+
+    def delete_namespace(self, namespace: str) -> None:
+        retry_with_backoff(lambda: self.index.delete(delete_all=True, namespace=namespace))
@@ -1,64 +1,42 @@
 import streamlit as st
-import openai
-from config import OPENAI_API_KEY
+from config import CHAT_CONTEXT_TOKEN_BUDGET
+from src.core.chunk_store import PROJECT_SOURCE, FILES_SOURCE, SNIPPETS_SOURCE
+from src.core.embeddings import estimate_tokens
+from src.core.llm import CompletionStream
+from src.core.llm_cache import CacheTally, get_llm_cache, format_cache_stats
+from src.core.retriever import rank_chunks
 
-# Initialize OpenAI
-openai.api_key = OPENAI_API_KEY
 LLM_MODEL = "gpt-4o-mini-2024-07-18"
+SYSTEM_PROMPT = "You are a professional software engineer who provides technically precise answers about code."
+# Candidate chunks retrieved when the selected files don't fit the context budget
+CHAT_RETRIEVAL_TOP_K = 50
 
 def render_chat_tab():
     """Render the Code Chatbot tab UI and functionality."""
     st.header("Code Expert Assistant")
     
+    chunk_store = st.session_state.chunk_store
+    # Cache hits and misses of this session's chat answers
+    if 'chat_cache_tally' not in st.session_state:
+        st.session_state.chat_cache_tally = CacheTally()
+    
     # Check if we have any files processed
-    if not st.session_state.get("processed_chunks", []) and not st.session_state.get("project_chunks", []) and not st.session_state.get("file_chunks", []) and not st.session_state.get("snippet_chunks", []):
+    if not len(chunk_store):
         st.warning("Please upload and process files in the File Documentation tab, process a project ZIP, or paste code in the Snippet tab first.")
         return
     
-    # Initialize specific chunk categories if they don't exist
-    if "project_chunks" not in st.session_state:
-        st.session_state.project_chunks = []
-    
-    if "file_chunks" not in st.session_state:
-        st.session_state.file_chunks = []
-        
-    if "snippet_chunks" not in st.session_state:
-        st.session_state.snippet_chunks = []
-    
-    # Track separate file lists for different sources
-    if "project_files" not in st.session_state:
-        st.session_state.project_files = []
-    
-    if "uploaded_files" not in st.session_state:
-        st.session_state.uploaded_files = []
-        
-    if "snippet_files" not in st.session_state:
-        st.session_state.snippet_files = []
-    
-    # Track selected files for each source
-    if "selected_project_files" not in st.session_state:
-        st.session_state.selected_project_files = []
-    
-    if "selected_uploaded_files" not in st.session_state:
-        st.session_state.selected_uploaded_files = []
-        
-    if "selected_snippet_files" not in st.session_state:
-        st.session_state.selected_snippet_files = []
-    
-    # Update available files lists from chunks
-    available_project_files = list(set(chunk['metadata']['file'] for chunk in st.session_state.project_chunks)) if st.session_state.project_chunks else []
-    available_uploaded_files = list(set(chunk['metadata']['file'] for chunk in st.session_state.file_chunks)) if st.session_state.file_chunks else []
-    available_snippet_files = list(set(chunk['metadata']['file'] for chunk in st.session_state.snippet_chunks)) if st.session_state.snippet_chunks else []
-    
-    # Update session state
-    st.session_state.project_files = available_project_files
-    st.session_state.uploaded_files = available_uploaded_files
-    st.session_state.snippet_files = available_snippet_files
+    # File lists come straight from the chunk store's per-source index
+    available_project_files = chunk_store.files(PROJECT_SOURCE)
+    available_uploaded_files = chunk_store.files(FILES_SOURCE)
+    available_snippet_files = chunk_store.files(SNIPPETS_SOURCE)
     
     # Filter selected files to only include available files (prevent errors)
-    st.session_state.selected_project_files = [f for f in st.session_state.selected_project_files if f in available_project_files]
-    st.session_state.selected_uploaded_files = [f for f in st.session_state.selected_uploaded_files if f in available_uploaded_files]
-    st.session_state.selected_snippet_files = [f for f in st.session_state.selected_snippet_files if f in available_snippet_files]
+    project_file_set = set(available_project_files)
+    uploaded_file_set = set(available_uploaded_files)
+    snippet_file_set = set(available_snippet_files)
+    st.session_state.selected_project_files = [f for f in st.session_state.selected_project_files if f in project_file_set]
+    st.session_state.selected_uploaded_files = [f for f in st.session_state.selected_uploaded_files if f in uploaded_file_set]
+    st.session_state.selected_snippet_files = [f for f in st.session_state.selected_snippet_files if f in snippet_file_set]
     
     # File selection UI with tabs for different sources
     st.subheader("Select Files for Context")
@@ -105,17 +83,14 @@ def render_chat_tab():
     
     with source_tabs[3]:
         # Combine all available files
-        all_files = list(set(available_project_files + available_uploaded_files + available_snippet_files))
+        all_files = chunk_store.files()
         
-        # Filter all selected files to only include available files
-        all_selected = [f for f in 
-            list(set(
-                st.session_state.selected_project_files + 
-                st.session_state.selected_uploaded_files +
-                st.session_state.selected_snippet_files
-            )) 
-            if f in all_files
-        ]
+        # Selections were already filtered to available files above
+        all_selected = list(dict.fromkeys(
+            st.session_state.selected_project_files + 
+            st.session_state.selected_uploaded_files +
+            st.session_state.selected_snippet_files
+        ))
         
         if all_files:
             st.multiselect(
@@ -128,14 +103,14 @@ def render_chat_tab():
             selected_all = st.session_state.all_files_select
             
             # Update project and uploaded file selections based on all selection
-            st.session_state.selected_project_files = [f for f in selected_all if f in available_project_files]
-            st.session_state.selected_uploaded_files = [f for f in selected_all if f in available_uploaded_files]
-            st.session_state.selected_snippet_files = [f for f in selected_all if f in available_snippet_files]
+            st.session_state.selected_project_files = [f for f in selected_all if f in project_file_set]
+            st.session_state.selected_uploaded_files = [f for f in selected_all if f in uploaded_file_set]
+            st.session_state.selected_snippet_files = [f for f in selected_all if f in snippet_file_set]
         else:
             st.info("No files available. Please upload files, a project ZIP, or paste code snippets.")
     
     # Get all selected files across all sources
-    selected_files = list(set(
+    selected_files = list(dict.fromkeys(
         st.session_state.selected_project_files + 
         st.session_state.selected_uploaded_files +
         st.session_state.selected_snippet_files
@@ -158,7 +133,10 @@ def render_chat_tab():
         if message["role"] == "user":
             st.chat_message("user").write(message["content"])
         else:
-            st.chat_message("assistant").write(message["content"])
+            with st.chat_message("assistant"):
+                st.write(message["content"])
+                if message.get("usage"):
+                    st.caption(format_usage(message["usage"]))
     
     # Chat input
     user_question = st.chat_input("Ask a question about your code...")
@@ -171,48 +149,115 @@ def render_chat_tab():
         # Generate response
         with st.chat_message("assistant"):
             with st.spinner("Analyzing code..."):
-                # Combine chunks from all sources for selected files
-                all_chunks = st.session_state.project_chunks + st.session_state.file_chunks + st.session_state.snippet_chunks
-                response = query_with_context(user_question, all_chunks, selected_files)
+                # Look up the chunks of the selected files across all sources
+                namespaces = [ns for ns in (st.session_state.get("project_namespace"), st.session_state.get("files_namespace")) if ns]
+                stream, context_usage = stream_with_context(
+                    user_question, chunk_store.chunks_for_files(selected_files), selected_files, namespaces,
+                    tally=st.session_state.chat_cache_tally
+                )
+            
+            # Render the answer as it is generated
+            if stream is None:
+                response, usage = context_usage, None
                 st.write(response)
-                
-                # Add assistant response to chat history
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
+            else:
+                response = st.write_stream(stream)
+                usage = {**context_usage, 'cached': stream.cached, **stream.usage}
+                st.caption(format_usage(usage))
+            
+            # Add assistant response to chat history
+            st.session_state.chat_history.append({"role": "assistant", "content": response, "usage": usage})
+    
+    # Cache hits and misses of this chat, next to the totals of the shared cache
+    if st.session_state.chat_history:
+        st.caption(format_cache_stats(get_llm_cache().stats(), st.session_state.chat_cache_tally))
     
     # Option to clear chat history
     if st.session_state.chat_history and st.button("Clear Chat History"):
         st.session_state.chat_history = []
+        st.session_state.chat_cache_tally = CacheTally()
         st.rerun()
 
-def query_with_context(question, chunks, selected_files=None):
+def format_usage(usage):
+    """Describe the context and token usage of one answer."""
+    mode = "all selected code" if usage['mode'] == "full" else "retrieved chunks"
+    # Streamed answers report estimated token counts
+    approx = "~" if usage.get('estimated') else ""
+    return (f"{usage['context_chunks']} of {usage['total_chunks']} chunks ({mode}, "
+            f"~{usage['context_tokens']} tokens of context) · {approx}{usage['prompt_tokens']} prompt + "
+            f"{approx}{usage['completion_tokens']} completion = {approx}{usage['total_tokens']} tokens"
+            f"{' (cached answer)' if usage.get('cached') else ''}")
+
+def format_chunk(chunk):
+    """Render one chunk as a section of the code context."""
+    return (f"File: {chunk['metadata']['file']}\n"
+            f"Type: {chunk['metadata']['type']}\n"
+            f"Name: {chunk['metadata']['name']}\n"
+            f"Code:\n{chunk['code']}\n\n")
+
+def build_context(question, chunks, namespaces=None, token_budget=CHAT_CONTEXT_TOKEN_BUDGET):
     """
-    Query the LLM with context from selected files.
+    Pack the code context for a question into a token budget.
+    
+    If every chunk fits the budget they are all included. Otherwise the chunks
+    are ranked for the question and the best ones are added until the budget
+    is used up.
     
     Args:
         question: User question
-        chunks: List of all code chunks
+        chunks: Code chunks of the selected files
+        namespaces: Namespaces the chunks are indexed in
+        token_budget: Maximum estimated tokens of context
+        
+    Returns:
+        Tuple of (context text, number of chunks included, estimated context tokens, mode),
+        where mode is "full" or "retrieved"
+    """
+    sections = [format_chunk(chunk) for chunk in chunks]
+    tokens = [estimate_tokens(section) for section in sections]
+    if sum(tokens) <= token_budget:
+        return "".join(sections), len(chunks), sum(tokens), "full"
+    
+    context = []
+    used = 0
+    for chunk in rank_chunks(question, chunks, CHAT_RETRIEVAL_TOP_K, namespaces):
+        section = format_chunk(chunk)
+        section_tokens = estimate_tokens(section)
+        # Skip chunks that don't fit; a smaller, lower-ranked one may still fit
+        if used + section_tokens > token_budget:
+            continue
+        context.append(section)
+        used += section_tokens
+    return "".join(context), len(context), used, "retrieved"
+
+def prepare_query(question, chunks, selected_files=None, namespaces=None,
+                  token_budget=CHAT_CONTEXT_TOKEN_BUDGET):
+    """
+    Build the LLM prompt for a question with context from selected files.
+    
+    Args:
+        question: User question
+        chunks: Code chunks of the selected files
         selected_files: List of files to use as context
+        namespaces: Namespaces the chunks are indexed in, used to retrieve
+            the relevant ones when they don't all fit token_budget
+        token_budget: Maximum estimated tokens of code context
         
     Returns:
-        LLM response
+        Tuple of (prompt, context usage dictionary), or (None, message to show
+        instead of an answer) if there is nothing to ask the LLM
     """
-    # Filter chunks by selected files if provided
-    if selected_files:
-        filtered_chunks = [chunk for chunk in chunks if chunk['metadata']['file'] in selected_files]
-    else:
+    if not selected_files:
         # This case shouldn't occur with the UI restrictions
-        return "Please select at least one file to provide context for the conversation."
+        return None, "Please select at least one file to provide context for the conversation."
     
-    if not filtered_chunks:
-        return "No code context available. The selected files don't contain valid code chunks."
+    if not chunks:
+        return None, "No code context available. The selected files don't contain valid code chunks."
     
-    # Prepare context from filtered chunks
-    context = ""
-    for chunk in filtered_chunks:
-        context += f"File: {chunk['metadata']['file']}\n"
-        context += f"Type: {chunk['metadata']['type']}\n"
-        context += f"Name: {chunk['metadata']['name']}\n"
-        context += f"Code:\n{chunk['code']}\n\n"
+    # Prepare context from the chunks, retrieving the relevant ones if they don't all fit
+    context, context_chunks, context_tokens, mode = build_context(question, chunks, namespaces, token_budget)
+    if not context:
+        return None, "No code in the selected files matches the question closely enough to answer it."
     
     # Create the prompt with the question and context
     prompt = f"""
@@ -227,13 +272,32 @@ QUESTION:
 Please provide a clear, professional answer based on the code context. If the answer isn't clear from the provided code, say so.
 """
     
-    # Call the LLM
-    response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a professional software engineer who provides technically precise answers about code."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    return prompt, {
+        'mode': mode,
+        'context_chunks': context_chunks,
+        'total_chunks': len(chunks),
+        'context_tokens': context_tokens
+    }
+
+def stream_with_context(question, chunks, selected_files=None, namespaces=None,
+                        token_budget=CHAT_CONTEXT_TOKEN_BUDGET, use_cache=True, tally=None):
+    """
+    Query the LLM with context from selected files, streaming the answer as it is written.
     
-    return response.choices[0].message.content
\ No newline at end of file
+    Args:
+        question: User question
+        chunks: Code chunks of the selected files
+        selected_files: List of files to use as context
+        namespaces: Namespaces the chunks are indexed in
+        token_budget: Maximum estimated tokens of code context
+        use_cache: Whether to serve the answer from the LLM response cache
+        tally: Optional CacheTally recording whether the answer was a cache hit
+        
+    Returns:
+        Tuple of (CompletionStream, context usage dictionary), or (None, message
+        to show instead of an answer) if there is nothing to ask the LLM
+    """
+    prompt, context_usage = prepare_query(question, chunks, selected_files, namespaces, token_budget)
+    if prompt is None:
+        return None, context_usage
+    return CompletionStream(SYSTEM_PROMPT, prompt, LLM_MODEL, use_cache, tally), context_usage
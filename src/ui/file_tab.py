@@ -2,9 +2,14 @@ import streamlit as st
 import tempfile
 import os
 import shutil
-from src.core.chunker import extract_chunks
-from src.core.embeddings import upsert_chunks
-from src.core.documentation import generate_file_documentation
+from src.core.chunk_store import FILES_SOURCE
+from src.core.embeddings import upsert_chunks, delete_chunks, get_vector_store
+from src.core.manifest import Manifest
+from src.core.namespaces import collect_stale_namespaces_in_background, get_namespace_registry, namespace_lock
+from src.core.neighbours import compute_neighbours
+from src.core.retriever import index_chunks
+from src.core.documentation import generate_files_documentation
+from src.core.llm_cache import CacheTally, get_llm_cache, format_cache_stats
 
 def render_file_tab():
     """Render the File Documentation tab UI and functionality."""
@@ -18,11 +23,13 @@ def render_file_tab():
         process_uploaded_files(uploaded_files)
     
     # Main area: Generate docs for each file
-    if st.session_state.file_chunks:
+    if st.session_state.chunk_store.files(FILES_SOURCE):
         st.header("Generate Documentation")
         
+        bypass_cache = st.checkbox("Bypass response cache", key="file_bypass_cache",
+                                   help="Regenerate with fresh LLM calls instead of reusing cached responses")
         if st.button("Generate Documentation for All Files"):
-            generate_all_file_documentation()
+            generate_all_file_documentation(use_cache=not bypass_cache)
         
         # Add option to view previously generated documentation
         if st.session_state.file_documentation:
@@ -43,68 +50,68 @@ def process_uploaded_files(uploaded_files):
         
         # Extract and index chunks
         with st.status("Processing files..."):
-            new_chunks = extract_chunks(temp_dir)
+            # Uploads are indexed in a per-session namespace; only files whose
+            # content changed since their last upload are re-parsed
+            namespace = f"files_{st.session_state.session_id}"
+            collect_stale_namespaces_in_background(get_vector_store)
+            # Touching the namespace keeps it alive even when no chunk changed, and its
+            # lock keeps concurrent ingests and garbage collection from interleaving
+            with namespace_lock(namespace):
+                get_namespace_registry().touch(namespace)
+                manifest = Manifest.load(namespace)
+                new_chunks = list(manifest.iter_chunks(temp_dir))
             
-            if new_chunks:
-                # Initialize file_chunks if it doesn't exist
-                if 'file_chunks' not in st.session_state:
-                    st.session_state.file_chunks = []
-                    
-                # Initialize uploaded_files if it doesn't exist
-                if 'uploaded_files' not in st.session_state:
-                    st.session_state.uploaded_files = []
+                if new_chunks:
+                    # Replace chunks of re-uploaded files with their latest version
+                    chunk_store = st.session_state.chunk_store
+                    records = chunk_store.replace_files(FILES_SOURCE, new_chunks)
                 
-                # Get existing file names to avoid duplicates
-                existing_files = set(chunk['metadata']['file'] for chunk in st.session_state.file_chunks)
+                    # Also update selected files for chat to include newly processed files
+                    new_file_names = list(dict.fromkeys(chunk['metadata']['file'] for chunk in new_chunks))
+                    st.session_state.selected_uploaded_files.extend([f for f in new_file_names 
+                                                                  if f not in st.session_state.selected_uploaded_files])
                 
-                # Filter new chunks to avoid duplicates
-                unique_new_chunks = [chunk for chunk in new_chunks 
-                                    if chunk['metadata']['file'] not in existing_files]
+                    # Upsert new or changed chunks and drop vectors of chunks that disappeared
+                    changed_chunks = [chunk for chunk in new_chunks if manifest.is_changed(chunk)]
+                    upsert_chunks(changed_chunks, namespace)
+                    removed_ids = manifest.commit(full_snapshot=False)
+                    delete_chunks(removed_ids, namespace=namespace)
+                    manifest.save()
+                    index_chunks(records, removed_ids, namespace)
+                    st.session_state.files_namespace = namespace
                 
-                # Append new chunks to existing chunks
-                st.session_state.file_chunks.extend(unique_new_chunks)
-                
-                # Also update processed_chunks for backward compatibility
-                st.session_state.processed_chunks = st.session_state.file_chunks
-                
-                # Update available files list
-                new_file_names = list(set(chunk['metadata']['file'] for chunk in new_chunks))
-                st.session_state.uploaded_files.extend([f for f in new_file_names if f not in st.session_state.uploaded_files])
-                
-                # Update available_files for backward compatibility 
-                st.session_state.available_files = st.session_state.uploaded_files.copy()
-                
-                # Also update selected files for chat to include newly processed files
-                if 'selected_uploaded_files' not in st.session_state:
-                    st.session_state.selected_uploaded_files = []
-                    
-                st.session_state.selected_uploaded_files.extend([f for f in new_file_names 
-                                                              if f not in st.session_state.selected_uploaded_files])
-                
-                # Upsert chunks to vector database
-                upsert_chunks(unique_new_chunks)
-                st.success(f"Processed {len(new_chunks)} code chunks from {len(uploaded_files)} files.")
-            else:
-                st.error("No valid code chunks found in the uploaded files.")
+                    # Precompute related-code neighbours across all uploaded files
+                    st.session_state.file_neighbours = compute_neighbours(chunk_store.chunks(FILES_SOURCE), namespace=namespace)
+                    st.success(f"Processed {len(new_chunks)} code chunks from {len(uploaded_files)} files "
+                               f"({len(changed_chunks)} new or changed).")
+                else:
+                    st.error("No valid code chunks found in the uploaded files.")
 
-def generate_all_file_documentation():
+def generate_all_file_documentation(use_cache=True):
     """Generate documentation for all processed files."""
-    with st.status("Generating professional documentation..."):
-        # Group chunks by file for better organization
-        files = {}
-        for chunk in st.session_state.file_chunks:
-            file_name = chunk['metadata']['file']
-            if file_name not in files:
-                files[file_name] = []
-            files[file_name].append(chunk)
+    with st.status("Generating professional documentation...") as status:
+        chunk_store = st.session_state.chunk_store
+        chunks_by_id = {chunk['id']: chunk for chunk in chunk_store.chunks(FILES_SOURCE)}
+        neighbours = st.session_state.get('file_neighbours')
+        file_chunks = {file_name: chunk_store.file_chunks(FILES_SOURCE, file_name)
+                       for file_name in chunk_store.files(FILES_SOURCE)}
         
-        # Generate documentation for each file
-        for file_name, file_chunks in files.items():
+        # Generate documentation for all files concurrently, reporting each finished file
+        progress = st.progress(0.0)
+        
+        def on_progress(completed, total, file_name):
+            progress.progress(completed / total, text=f"Documented {file_name} ({completed}/{total})")
+        
+        # Cache hits and misses are counted for this run only; the cache is shared by all sessions
+        tally = CacheTally()
+        all_docs = generate_files_documentation(file_chunks, neighbours, chunks_by_id, on_progress=on_progress,
+                                                use_cache=use_cache, tally=tally)
+        status.update(label=f"Documented {len(all_docs)} files", state="complete")
+        st.caption(format_cache_stats(get_llm_cache().stats(), tally))
+        
+        for file_name, docs in all_docs.items():
             st.subheader(f"File: {file_name}")
             
-            # Generate documentation for this file
-            docs = generate_file_documentation(file_name, file_chunks)
-            
             # Store documentation in session state
             st.session_state.file_documentation[file_name] = {
                 'docs': docs
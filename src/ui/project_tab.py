@@ -2,15 +2,22 @@ import streamlit as st
 import tempfile
 import os
 import shutil
-import openai
-from config import OPENAI_API_KEY
 
 # Import processing modules
 from src.processing.zip_handler import process_zip_file, list_all_files_in_directory
 from src.processing.project_analyzer import analyze_project_structure, generate_project_summary
-from src.core.chunker import extract_chunks
-from src.core.embeddings import upsert_chunks
+from src.core.chunker import CHUNK_WORKERS
+from src.core.chunk_store import PROJECT_SOURCE
+from src.core.pipeline import run_ingest_pipeline, format_pipeline_stats
+from src.core.manifest import Manifest
+from src.core.embeddings import delete_chunks, get_vector_store
+from src.core.namespaces import collect_stale_namespaces_in_background, get_namespace_registry, namespace_lock
+from src.core.neighbours import compute_neighbours
+from src.core.retriever import index_chunks
 from src.core.documentation import generate_project_documentation
+from src.core.documentation.generator import LLM_MODEL
+from src.core.doc_records import DocumentationRecord
+from src.core.llm_cache import CacheTally, get_llm_cache, format_cache_stats
 
 def render_project_tab():
     """Render the Project Documentation tab UI and functionality."""
@@ -24,17 +31,19 @@ def render_project_tab():
     # Debug mode toggle
     debug_mode = st.checkbox("Enable Debug Mode", 
                            help="Show detailed information about the ZIP processing")
+    bypass_cache = st.checkbox("Bypass response cache",
+                               help="Regenerate every section with fresh LLM calls instead of reusing cached responses")
     
     if uploaded_zip:
         # Show project processing button
         if st.button("Process Project and Generate Documentation"):
-            process_uploaded_project(uploaded_zip, debug_mode)
+            process_uploaded_project(uploaded_zip, debug_mode, use_cache=not bypass_cache)
     
     # Display project documentation if available
     if st.session_state.project_documentation:
         display_project_documentation()
 
-def process_uploaded_project(uploaded_zip, debug_mode):
+def process_uploaded_project(uploaded_zip, debug_mode, use_cache=True):
     """Process the uploaded ZIP file and generate documentation."""
     with st.status("Processing project...") as status:
         # Save uploaded zip to temp file
@@ -77,9 +86,40 @@ def process_uploaded_project(uploaded_zip, debug_mode):
                 st.write(project_info['all_files'])
             return
         
-        # Extract code chunks
-        status.update(label=f"Extracting code chunks from {project_info['py_file_count']} Python files...")
-        chunks = extract_chunks(extract_dir)
+        # Extract, embed and index code chunks as overlapping stages.
+        # The project gets its own namespace per session, whose manifest lets a re-upload
+        # of the same ZIP skip unchanged files and chunks.
+        status.update(label=f"Extracting and indexing code chunks from {project_info['py_file_count']} Python files...")
+        namespace = f"project_{st.session_state.session_id}_{uploaded_zip.name}"
+        collect_stale_namespaces_in_background(get_vector_store)
+        # Parsed chunks go straight into the session chunk store (code in its heap file) and the
+        # lexical index, replacing any previous project; later passes read them from the store
+        chunk_store = st.session_state.chunk_store
+        chunk_store.replace_source(PROJECT_SOURCE, [])
+        
+        # The lexical index is fed the store's records, so no reference to the parsed
+        # chunk (and its code) outlives the pipeline batch it travels in
+        def on_chunk(chunk):
+            index_chunks(chunk_store.add(PROJECT_SOURCE, [chunk]), namespace=namespace)
+        
+        # Touching the namespace keeps it alive even when no chunk changed, and its
+        # lock keeps concurrent ingests and garbage collection from interleaving
+        with namespace_lock(namespace):
+            get_namespace_registry().touch(namespace)
+            manifest = Manifest.load(namespace)
+            run_ingest_pipeline(
+                manifest.iter_chunks(extract_dir, workers=CHUNK_WORKERS),
+                on_chunk=on_chunk,
+                on_progress=lambda stats: status.update(label=f"Indexing code for search... {format_pipeline_stats(stats)}"),
+                should_index=manifest.is_changed,
+                namespace=namespace
+            )
+            removed_ids = manifest.commit(full_snapshot=True)
+            delete_chunks(removed_ids, namespace=namespace)
+            manifest.save()
+            index_chunks([], removed_ids, namespace)
+        st.session_state.project_namespace = namespace
+        chunks = chunk_store.chunks(PROJECT_SOURCE)
         
         if not chunks:
             status.update(label="No valid code chunks found in Python files!", state="error")
@@ -89,27 +129,34 @@ def process_uploaded_project(uploaded_zip, debug_mode):
                 st.write("Python files found but couldn't be parsed:")
                 st.write(project_info['python_files'])
             return
-            
-        # Store chunks in session state - both in the general variable and project-specific
-        st.session_state.processed_chunks = chunks
-        st.session_state.project_chunks = chunks
-        
-        # Track available files
-        st.session_state.available_files = list(set(chunk['metadata']['file'] for chunk in chunks))
-        st.session_state.project_files = st.session_state.available_files.copy()
         
         # Also update selected files for chat to include newly processed files
         if not st.session_state.selected_project_files:
-            st.session_state.selected_project_files = st.session_state.project_files.copy()
+            st.session_state.selected_project_files = chunk_store.files(PROJECT_SOURCE)
         
-        # Upsert chunks to vector database
-        status.update(label="Indexing code for search...")
-        upsert_chunks(chunks)
+        # Precompute related-code neighbours so documentation needs no per-module searches
+        status.update(label="Linking related code...")
+        st.session_state.project_neighbours = compute_neighbours(chunks, namespace=namespace)
         
         # Generate project documentation
         status.update(label="Generating comprehensive project documentation...")
-        project_docs = generate_project_documentation(project_info, chunks)
+        progress = st.progress(0.0)
+        
+        # Files are summarized first, then packages are documented from the file summaries
+        def on_progress(completed, total, item_name):
+            progress.progress(completed / total, text=f"Documented {item_name} ({completed}/{total})")
+        
+        # Sections recorded for an earlier upload of this project are reused if their code is unchanged
+        doc_record = DocumentationRecord.load(namespace, LLM_MODEL)
+        # Cache hits and misses are counted for this run only; the cache is shared by all sessions
+        tally = CacheTally()
+        project_docs = generate_project_documentation(
+            project_info, chunks, st.session_state.project_neighbours, on_progress=on_progress,
+            use_cache=use_cache, record=doc_record, tally=tally
+        )
+        doc_record.save(LLM_MODEL)
         st.session_state.project_documentation = project_docs
+        st.caption(format_cache_stats(get_llm_cache().stats(), tally))
         
         status.update(label=f"Documentation complete! Processed {len(chunks)} code chunks from "
                      f"{project_info['py_file_count']} Python files.", state="complete")
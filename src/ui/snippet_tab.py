@@ -1,5 +1,6 @@
 import streamlit as st
-from src.core.documentation import generate_documentation
+from src.core.chunk_store import SNIPPETS_SOURCE
+from src.core.documentation import generate_documentation_stream
 
 def render_snippet_tab():
     """Render the Code Snippet Documentation tab UI and functionality."""
@@ -19,14 +20,18 @@ def process_code_snippet(user_code):
         return
         
     # Create a unique name for the snippet
-    snippet_count = len(st.session_state.get("snippet_chunks", []))
+    snippet_count = len(st.session_state.chunk_store.files(SNIPPETS_SOURCE))
     snippet_name = f"snippet_{snippet_count + 1}"
     
     # Let the enhanced generate.py handle code type inference
     metadata = {'file': snippet_name, 'name': 'code_snippet', 'type': 'Code'}
     
-    with st.status("Generating professional documentation..."):
-        docs = generate_documentation(user_code, metadata)
+    # Context is only retrieved from code indexed in this session
+    namespaces = [ns for ns in (st.session_state.get("project_namespace"), st.session_state.get("files_namespace")) if ns]
+    
+    with st.status("Generating professional documentation...", expanded=True):
+        # Documentation is rendered as it is written; write_stream returns the full text
+        docs = st.write_stream(generate_documentation_stream(user_code, metadata, namespaces=namespaces))
         
         # Create a chunk for this snippet to be available in chat
         snippet_chunk = {
@@ -35,33 +40,14 @@ def process_code_snippet(user_code):
             'metadata': metadata
         }
         
-        # Initialize snippet_chunks if it doesn't exist
-        if "snippet_chunks" not in st.session_state:
-            st.session_state.snippet_chunks = []
-            
-        # Store the snippet in session state
-        st.session_state.snippet_chunks.append(snippet_chunk)
+        # Store the snippet in the session chunk store
+        st.session_state.chunk_store.add(SNIPPETS_SOURCE, [snippet_chunk])
         
-        # Initialize snippet_files if it doesn't exist
-        if "snippet_files" not in st.session_state:
-            st.session_state.snippet_files = []
-            
-        # Add the snippet file to available files
-        if snippet_name not in st.session_state.snippet_files:
-            st.session_state.snippet_files.append(snippet_name)
-            
-        # Initialize selected_snippet_files if it doesn't exist
-        if "selected_snippet_files" not in st.session_state:
-            st.session_state.selected_snippet_files = []
-            
         # Add the snippet to selected files for chat
         if snippet_name not in st.session_state.selected_snippet_files:
             st.session_state.selected_snippet_files.append(snippet_name)
         
-        # Display documentation with download option
-        st.markdown(docs)
-        
-        # Use a professional filename
+        # Offer the finished documentation for download under a professional filename
         st.download_button(
             label="Download Documentation",
             data=docs,
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Keep caches written during tests out of the working tree; must be set before config is imported
+os.environ.setdefault("CODE_DOC_CACHE_DIR", tempfile.mkdtemp(prefix="code-doc-tests-"))
+
+# Make the repository root importable (src.*, config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import pytest
+
+# The chat tab is a Streamlit module
+pytest.importorskip("streamlit")
+from src.ui import chat_tab
+from src.ui.chat_tab import build_context, format_chunk, prepare_query
+from src.core.embeddings import estimate_tokens
+
+def _chunk(name, lines=1):
+    code = f"def {name}():\n" + "    pass\n" * lines
+    return {'id': f"a.py::{name}", 'code': code, 'metadata': {'file': 'a.py', 'name': name, 'type': 'FunctionDef'}}
+
+def test_all_chunks_are_used_when_they_fit():
+    chunks = [_chunk('f'), _chunk('g')]
+    context, count, tokens, mode = build_context("what does f do?", chunks, token_budget=1000)
+    assert mode == "full" and count == 2
+    assert context == format_chunk(chunks[0]) + format_chunk(chunks[1])
+    assert tokens == sum(estimate_tokens(format_chunk(c)) for c in chunks)
+
+def test_ranked_chunks_are_packed_into_the_budget(monkeypatch):
+    small, large, other = _chunk('small'), _chunk('large', lines=60), _chunk('other')
+    ranked = []
+
+    def rank(question, chunks, top_k, namespaces):
+        ranked.append((question, namespaces))
+        return [large, small, other]
+
+    monkeypatch.setattr(chat_tab, "rank_chunks", rank)
+    budget = estimate_tokens(format_chunk(small)) + estimate_tokens(format_chunk(other))
+    context, count, tokens, mode = build_context("q", [small, large, other], ["ns"], token_budget=budget)
+    # The large chunk ranks first but doesn't fit; the smaller ones after it still do
+    assert mode == "retrieved" and count == 2 and tokens <= budget
+    assert context == format_chunk(small) + format_chunk(other)
+    assert ranked == [("q", ["ns"])]
+
+def test_nothing_retrieved_means_no_prompt(monkeypatch):
+    monkeypatch.setattr(chat_tab, "rank_chunks", lambda question, chunks, top_k, namespaces: [])
+    prompt, message = prepare_query("q", [_chunk('f', lines=60)], ['a.py'], token_budget=10)
+    assert prompt is None and "matches the question" in message
+    assert prepare_query("q", [], ['a.py'])[0] is None
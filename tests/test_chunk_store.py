@@ -0,0 +1,70 @@
+from src.core.chunk_store import FILES_SOURCE, PROJECT_SOURCE, SNIPPETS_SOURCE, ChunkStore
+
+def _chunk(file, name, code=None):
+    return {'id': f"{file}::{name}", 'code': code or f"def {name}(): pass",
+            'metadata': {'file': file, 'name': name, 'type': 'FunctionDef'}}
+
+def test_files_and_chunks_keep_insertion_order_per_source():
+    store = ChunkStore()
+    store.add(PROJECT_SOURCE, [_chunk('b.py', 'f'), _chunk('a.py', 'g'), _chunk('b.py', 'h')])
+    store.add(FILES_SOURCE, [_chunk('a.py', 'u')])
+    assert len(store) == 4
+    assert store.files(PROJECT_SOURCE) == ['b.py', 'a.py']
+    assert store.files() == ['b.py', 'a.py']
+    assert [c['id'] for c in store.file_chunks(PROJECT_SOURCE, 'b.py')] == ['b.py::f', 'b.py::h']
+    assert [c['id'] for c in store.chunks()] == ['b.py::f', 'b.py::h', 'a.py::g', 'a.py::u']
+    assert store.file_chunks(SNIPPETS_SOURCE, 'b.py') == []
+
+def test_chunks_for_files_looks_up_selected_files_only():
+    store = ChunkStore()
+    store.add(PROJECT_SOURCE, [_chunk('a.py', 'f'), _chunk('b.py', 'g')])
+    store.add(FILES_SOURCE, [_chunk('a.py', 'u'), _chunk('c.py', 'v')])
+    ids = [c['id'] for c in store.chunks_for_files(['a.py', 'c.py', 'a.py', 'missing.py'])]
+    assert ids == ['a.py::f', 'a.py::u', 'c.py::v']
+    assert [c['id'] for c in store.chunks_for_files(['a.py'], source=FILES_SOURCE)] == ['a.py::u']
+
+def test_replace_files_keeps_other_files():
+    store = ChunkStore()
+    store.add(FILES_SOURCE, [_chunk('a.py', 'f'), _chunk('a.py', 'g'), _chunk('b.py', 'h')])
+    store.replace_files(FILES_SOURCE, [_chunk('a.py', 'f2')])
+    assert len(store) == 2
+    assert [c['id'] for c in store.chunks(FILES_SOURCE)] == ['b.py::h', 'a.py::f2']
+
+def test_replace_source_drops_every_chunk_of_the_source():
+    store = ChunkStore()
+    store.add(PROJECT_SOURCE, [_chunk('a.py', 'f')])
+    store.add(SNIPPETS_SOURCE, [_chunk('snippet_1.py', 's')])
+    store.replace_source(PROJECT_SOURCE, [_chunk('z.py', 'z')])
+    assert store.files() == ['z.py', 'snippet_1.py'] and len(store) == 2
+
+def test_records_read_like_chunk_dictionaries():
+    store = ChunkStore()
+    code = "def f():\n    return 'é'\n"
+    record, = store.add(FILES_SOURCE, [_chunk('pkg/a.py', 'f', code)])
+    assert record['id'] == 'pkg/a.py::f' and record['code'] == code and record.get('missing') is None
+    assert dict(record['metadata']) == {'file': 'pkg/a.py', 'name': 'f', 'type': 'FunctionDef'}
+    assert record['metadata']['file'] is record.file and record['metadata'] is record.metadata
+    assert store.code_bytes() == len(code.encode('utf-8'))
+
+def test_heap_is_compacted_once_mostly_replaced():
+    store = ChunkStore()
+    big = "x = 1\n" * 100000
+    store.add(FILES_SOURCE, [_chunk('a.py', 'f', big), _chunk('b.py', 'g', "b = 2\n")])
+    heap = store._heaps[FILES_SOURCE]
+    store.replace_files(FILES_SOURCE, [_chunk('a.py', 'f', big.replace("1", "3"))])
+    # Heaps of up to 1 MB are never compacted
+    assert store._heaps[FILES_SOURCE] is heap
+    store.replace_files(FILES_SOURCE, [_chunk('a.py', 'f', "small = 1\n")])
+    compacted = store._heaps[FILES_SOURCE]
+    assert compacted is not heap and len(compacted) == store.code_bytes()
+    assert [c['code'] for c in store.chunks(FILES_SOURCE)] == ["b = 2\n", "small = 1\n"]
+
+def test_replacing_or_closing_releases_heaps():
+    store = ChunkStore()
+    store.add(PROJECT_SOURCE, [_chunk('a.py', 'f')])
+    heap = store._heaps[PROJECT_SOURCE]
+    store.replace_source(PROJECT_SOURCE, [])
+    assert heap._file.closed and PROJECT_SOURCE not in store._heaps
+    store.add(FILES_SOURCE, [_chunk('a.py', 'f')])
+    store.close()
+    assert len(store) == 0 and store.code_bytes() == 0 and not store._heaps
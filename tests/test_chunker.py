@@ -0,0 +1,42 @@
+import pytest
+from src.core.chunker import extract_chunks, extract_file_chunks
+
+@pytest.fixture
+def source_dir(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("def f():\n    return 1\n\nclass C:\n    def m(self):\n        pass\n")
+    (tmp_path / "pkg" / "b.py").write_text("X = 1\n")
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    for i in range(10):
+        (tmp_path / f"m{i}.py").write_text(f"async def g{i}():\n    await x\n")
+    return tmp_path
+
+def test_file_chunks_and_fallbacks(source_dir):
+    chunks = extract_file_chunks(str(source_dir / "pkg" / "a.py"), str(source_dir))
+    assert [(c['id'], c['metadata']['type']) for c in chunks] == [
+        ('pkg/a.py::f', 'FunctionDef'), ('pkg/a.py::C', 'ClassDef'), ('pkg/a.py::m', 'FunctionDef')]
+    assert chunks[0]['code'] == "def f():\n    return 1"
+    # Modules without definitions and files with syntax errors become whole-file chunks
+    module, = extract_file_chunks(str(source_dir / "pkg" / "b.py"), str(source_dir))
+    assert module['id'] == 'pkg/b.py::whole_file' and module['code'] == "X = 1\n"
+    broken, = extract_file_chunks(str(source_dir / "broken.py"), str(source_dir))
+    assert broken['metadata'] == {'file': 'broken.py', 'name': 'broken.py', 'type': 'Module'}
+
+def test_parallel_extraction_matches_serial(source_dir):
+    serial = extract_chunks(str(source_dir), workers=1)
+    assert len(serial) == 15
+    assert extract_chunks(str(source_dir), workers=3) == serial
+
+def test_failure_keeps_chunks_extracted_before_it(source_dir, monkeypatch):
+    calls = []
+
+    def record_then_fail(self, node):
+        calls.append(node)
+        if len(calls) > 1:
+            raise RuntimeError("tokenizer failed")
+        return "text"
+
+    from asttokens import ASTTokens
+    monkeypatch.setattr(ASTTokens, 'get_text', record_then_fail)
+    chunks = extract_file_chunks(str(source_dir / "pkg" / "a.py"), str(source_dir))
+    assert [c['id'] for c in chunks] == ['pkg/a.py::f']
@@ -0,0 +1,52 @@
+import pytest
+from src.core import doc_records
+from src.core.doc_records import DocumentationRecord
+
+@pytest.fixture(autouse=True)
+def record_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(doc_records, "DOC_RECORD_DIR", str(tmp_path))
+    return tmp_path
+
+INPUTS = {'chunks': {'c1': "hash1", 'c2': "hash2"}}
+
+def test_section_is_reused_only_for_identical_inputs():
+    record = DocumentationRecord("project_a")
+    assert record.get("file:a.py", INPUTS) is None
+    record.put("file:a.py", INPUTS, "summary")
+    assert record.get("file:a.py", {'chunks': {'c1': "hash1", 'c2': "hash2"}}) == "summary"
+    assert record.get("file:a.py", {'chunks': {'c1': "hash1", 'c2': "changed"}}) is None
+    assert record.get("file:a.py", {'chunks': {'c1': "hash1"}}) is None
+
+def test_saved_record_is_reused_by_the_same_model():
+    record = DocumentationRecord("project_a")
+    record.put("file:a.py", INPUTS, "summary")
+    record.put("project", {'packages': {}}, "overview")
+    record.save("model-1")
+    loaded = DocumentationRecord.load("project_a", "model-1")
+    assert loaded.get("file:a.py", INPUTS) == "summary"
+    assert loaded.get("project", {'packages': {}}) == "overview"
+
+def test_record_of_another_model_or_version_is_ignored(monkeypatch):
+    record = DocumentationRecord("project_a")
+    record.put("file:a.py", INPUTS, "summary")
+    record.save("model-1")
+    assert DocumentationRecord.load("project_a", "model-2").sections == {}
+    monkeypatch.setattr(doc_records, "DOC_RECORD_VERSION", doc_records.DOC_RECORD_VERSION + 1)
+    assert DocumentationRecord.load("project_a", "model-1").sections == {}
+
+def test_missing_or_corrupt_record_starts_empty(record_dir):
+    assert DocumentationRecord.load("unknown", "model-1").sections == {}
+    (record_dir / "broken.json").write_text("{not json", encoding='utf-8')
+    assert DocumentationRecord.load("broken", "model-1").sections == {}
+
+def test_scopes_are_stored_apart_and_sanitized(record_dir):
+    DocumentationRecord("project_a.zip").save("m")
+    DocumentationRecord("project/../b").save("m")
+    assert sorted(p.name for p in record_dir.iterdir()) == ["project_.._b.json", "project_a.zip.json"]
+
+def test_retain_drops_sections_of_removed_files():
+    record = DocumentationRecord("project_a")
+    for key in ("file:a.py", "file:b.py", "package:root", "project"):
+        record.put(key, INPUTS, key)
+    record.retain(["file:a.py", "package:root", "project"])
+    assert sorted(record.sections) == ["file:a.py", "package:root", "project"]
@@ -0,0 +1,51 @@
+import pytest
+from src.core import embeddings
+from src.core.embedding_cache import EmbeddingCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+
+def test_get_many_returns_hits_in_order_and_counts(cache):
+    cache.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many("m", ["b", "missing", "a", "b"]) == [[3.0, 4.0], None, [1.0, 2.0], [3.0, 4.0]]
+    # Entries are per model
+    assert cache.get_many("other", ["a"]) == [None]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (3, 2, 2)
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(path).put_many("m", ["a"], [[0.5]])
+    assert EmbeddingCache(path).get_many("m", ["a"]) == [[0.5]]
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.core.embedding_cache.time.time", lambda: now[0])
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=10)
+    for i in range(10):
+        now[0] += 1
+        cache.put_many("m", [f"t{i}"], [[float(i)]])
+    # Reading t0 makes it the most recently used entry
+    now[0] += 1
+    cache.get_many("m", ["t0"])
+    now[0] += 1
+    cache.put_many("m", ["t10"], [[10.0]])
+    # 11 entries exceed the cap: the oldest go until 9 remain
+    assert cache.stats()['entries'] == 9
+    assert cache.get_many("m", ["t1", "t2"]) == [None, None]
+    assert cache.get_many("m", ["t0", "t10"]) == [[0.0], [10.0]]
+
+def test_embed_texts_requests_only_distinct_misses(cache, monkeypatch):
+    requests = []
+
+    def request(texts):
+        requests.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(embeddings, "_request_embeddings", request)
+    assert embeddings.embed_texts(["a", "bb", "a"]) == [[1.0], [2.0], [1.0]]
+    assert embeddings.embed_texts(["bb", "ccc", "a"]) == [[2.0], [3.0], [1.0]]
+    assert requests == [["a", "bb"], ["ccc"]]
+    assert embeddings.embed_texts(["ccc"]) == [[3.0]] and len(requests) == 2
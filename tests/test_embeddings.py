@@ -0,0 +1,51 @@
+import threading
+import pytest
+from src.core import clients, embeddings
+from src.core.embeddings import _iter_embedding_batches, _request_embeddings, estimate_tokens
+
+class FakeOpenAI:
+    """Embedding API returning [len(text), position] per input, in reverse order."""
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+        self.Embedding = self
+
+    def create(self, model, input):
+        with self._lock:
+            self.requests.append(list(input))
+        data = [{'index': i, 'embedding': [float(len(text)), float(i)]} for i, text in enumerate(input)]
+        return {'data': data[::-1]}
+
+@pytest.fixture
+def api(monkeypatch):
+    api = FakeOpenAI()
+    monkeypatch.setattr(clients, "get_openai", lambda: api)
+    return api
+
+def test_batches_respect_item_and_token_limits(monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBED_BATCH_MAX_ITEMS", 4)
+    monkeypatch.setattr(embeddings, "EMBED_BATCH_MAX_TOKENS", 100)
+    texts = ["x" * 30] * 10 + ["y" * 600] + ["z"] * 3
+    batches = list(_iter_embedding_batches(texts))
+    # Consecutive ranges covering every text exactly once
+    assert batches[0][0] == 0 and batches[-1][1] == len(texts)
+    assert all(end == start for (_, end), (start, _) in zip(batches, batches[1:]))
+    for start, end in batches:
+        assert end - start <= 4
+        # A single text over the token limit still gets a batch of its own
+        assert end - start == 1 or sum(estimate_tokens(t) for t in texts[start:end]) <= 100
+    assert (10, 11) in batches
+
+def test_requests_are_packed_and_results_keep_input_order(api, monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBED_BATCH_MAX_ITEMS", 3)
+    texts = [f"text {i}" + "." * i for i in range(10)]
+    vectors = _request_embeddings(texts)
+    assert len(api.requests) == 4
+    assert sorted(text for request in api.requests for text in request) == sorted(texts)
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+
+def test_uncached_embedding_sends_every_text(api):
+    vectors = embeddings.embed_texts(["a", "bb", "a"], use_cache=False)
+    assert [v[0] for v in vectors] == [1.0, 2.0, 1.0]
+    assert api.requests == [["a", "bb", "a"]]
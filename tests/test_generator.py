@@ -0,0 +1,42 @@
+from src.core.documentation.generator import _pack_texts, _split_text
+from src.core.embeddings import estimate_tokens
+
+def _lines(n, width=30):
+    return "".join(f"{i:04d} " + "x" * (width - 6) + "\n" for i in range(n))
+
+def test_split_text_keeps_lines_whole_and_in_order():
+    text = _lines(100)
+    pieces = _split_text(text, max_tokens=100)
+    assert len(pieces) > 1
+    assert "".join(pieces) == text
+    assert all(estimate_tokens(piece) <= 100 + 1 for piece in pieces)
+    assert all(piece.endswith("\n") for piece in pieces)
+
+def test_split_text_cuts_overlong_lines():
+    text = "y" * 1000
+    pieces = _split_text(text, max_tokens=50)
+    assert "".join(pieces) == text
+    assert all(len(piece) <= 150 for piece in pieces)
+
+def test_split_text_of_short_text_is_one_piece():
+    assert _split_text("a = 1\n", max_tokens=100) == ["a = 1\n"]
+    assert _split_text("", max_tokens=100) == []
+
+def test_pack_texts_groups_in_order_within_budget():
+    texts = [f"text {i} " + "z" * 60 for i in range(10)]
+    groups = _pack_texts(texts, max_tokens=60)
+    assert [text for group in groups for text in group] == texts
+    assert all(sum(estimate_tokens(text) for text in group) <= 60 for group in groups)
+    # Each text is ~23 tokens, so two fit in a group
+    assert len(groups) == 5
+
+def test_pack_texts_splits_texts_larger_than_budget():
+    large = _lines(50)
+    groups = _pack_texts(["small", large, "tail"], max_tokens=100)
+    flat = [text for group in groups for text in group]
+    assert flat[0] == "small" and flat[-1] == "tail"
+    assert "".join(flat[1:-1]) == large
+    assert all(sum(estimate_tokens(text) for text in group) <= 100 + 1 for group in groups)
+
+def test_pack_texts_of_nothing():
+    assert _pack_texts([], max_tokens=100) == []
@@ -0,0 +1,61 @@
+from src.core.lexical_index import BM25Index, is_identifier_query, split_identifier, tokenize_code
+
+def _chunk(chunk_id, code, file='a.py', name=None):
+    return {'id': chunk_id, 'code': code, 'metadata': {'file': file, 'name': name or chunk_id, 'type': 'FunctionDef'}}
+
+CHUNKS = [
+    _chunk('upsert', "def upsert_chunks(chunks):\n    store.upsert(chunks)", name='upsert_chunks'),
+    _chunk('query', "def query_store(vector):\n    return store.query(vector)", file='b.py', name='query_store'),
+    _chunk('parse', "def parse_file(path):\n    return ast.parse(open(path).read())", file='b.py', name='parse_file'),
+]
+
+def test_split_and_tokenize_identifiers():
+    assert split_identifier("upsert_chunks") == ["upsert", "chunks"]
+    assert split_identifier("LocalVectorStore") == ["local", "vector", "store"]
+    assert split_identifier("HTTPServer") == ["http", "server"]
+    tokens = tokenize_code("store.upsert_chunks(x)")
+    assert {"upsert_chunks", "upsert", "chunks", "store", "x"} <= set(tokens)
+
+def test_identifier_queries():
+    assert is_identifier_query("`upsert_chunks`")
+    assert is_identifier_query("LocalVectorStore.query()")
+    assert not is_identifier_query("parse files")
+    assert not is_identifier_query("")
+
+def test_search_ranks_matching_chunk_first():
+    index = BM25Index()
+    index.add(CHUNKS)
+    assert len(index) == 3 and 'query' in index
+    hits = index.search("upsert chunks", top_k=3)
+    assert hits[0][0]['id'] == 'upsert'
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+    assert index.search("nothing matches this") == []
+
+def test_name_tokens_are_boosted():
+    index = BM25Index()
+    index.add([_chunk('mentions', "x = parse(y)\nparse(z)", name='helper'), _chunk('named', "return 1", name='parse')])
+    assert index.search("parse", top_k=1)[0][0]['id'] == 'named'
+
+def test_search_filter():
+    index = BM25Index()
+    index.add(CHUNKS)
+    hits = index.search("store", top_k=5, filter={'file': {'$in': ['b.py']}})
+    assert [chunk['id'] for chunk, _ in hits] == ['query']
+
+def test_add_replaces_and_remove_drops():
+    index = BM25Index()
+    index.add(CHUNKS)
+    index.add([_chunk('upsert', "def renamed():\n    pass", name='renamed')])
+    assert len(index) == 3
+    assert all(chunk['id'] != 'upsert' for chunk, _ in index.search("upsert_chunks"))
+    index.remove(['query', 'unknown'])
+    assert 'query' not in index and len(index) == 2
+    assert index.search("query_store") == []
+    index.remove(['upsert', 'parse'])
+    assert index.search("parse") == [] and not index._postings
+
+def test_hits_carry_metadata_but_no_code():
+    index = BM25Index()
+    index.add(CHUNKS)
+    hit, _ = index.search("upsert_chunks", top_k=1)[0]
+    assert hit == {'id': 'upsert', 'metadata': CHUNKS[0]['metadata']}
@@ -0,0 +1,40 @@
+import pytest
+from src.core import llm
+from src.core.llm_cache import CacheTally, LLMResponseCache
+
+class FakeOpenAI:
+    """Streams a fixed answer in two deltas and counts the requests."""
+    requests = 0
+
+    class ChatCompletion:
+        @staticmethod
+        def create(**params):
+            FakeOpenAI.requests += 1
+            assert params['stream']
+            return iter([{'choices': [{'delta': {'content': "Hello"}}]},
+                         {'choices': [{'delta': {'content': " world"}}]},
+                         {'choices': [{'delta': {}}]}])
+
+@pytest.fixture(autouse=True)
+def fake_api(tmp_path, monkeypatch):
+    FakeOpenAI.requests = 0
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm, "get_openai", lambda: FakeOpenAI)
+    monkeypatch.setattr(llm, "get_llm_cache", lambda: cache)
+
+def test_stream_is_cached_and_tallied():
+    tally = CacheTally()
+    stream = llm.CompletionStream("sys", "user", "model", tally=tally)
+    assert list(stream) == ["Hello", " world"]
+    assert stream.content == "Hello world" and not stream.cached and stream.usage['estimated']
+
+    again = llm.CompletionStream("sys", "user", "model", tally=tally)
+    assert list(again) == ["Hello world"] and again.cached
+    assert FakeOpenAI.requests == 1
+    assert (tally.hits, tally.misses) == (1, 1)
+
+def test_stream_without_cache_always_requests():
+    tally = CacheTally()
+    for _ in range(2):
+        assert "".join(llm.CompletionStream("sys", "user", "model", use_cache=False, tally=tally)) == "Hello world"
+    assert FakeOpenAI.requests == 2 and (tally.hits, tally.misses) == (0, 2)
@@ -0,0 +1,66 @@
+import pytest
+from src.core.llm_cache import CacheTally, LLMResponseCache, format_cache_stats, request_key
+
+USAGE = {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr("src.core.llm_cache.time.time", lambda: now[0])
+    return now
+
+def test_request_key_depends_on_every_input():
+    key = request_key("m", "sys", "user", {'temperature': 0})
+    assert key == request_key("m", "sys", "user", {'temperature': 0})
+    assert len({key, request_key("m2", "sys", "user", {'temperature': 0}),
+                request_key("m", "sys2", "user", {'temperature': 0}),
+                request_key("m", "sys", "user2", {'temperature': 0}),
+                request_key("m", "sys", "user", {'temperature': 1})}) == 5
+
+def test_put_get_and_counters(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k") is None
+    cache.put("k", "m", "answer", USAGE)
+    assert cache.get("k") == {'content': "answer", 'usage': USAGE}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (1, 1, 1, len("answer"))
+    assert stats['hit_rate'] == 0.5
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMResponseCache(path).put("k", "m", "answer", USAGE)
+    assert LLMResponseCache(path).get("k")['content'] == "answer"
+
+def test_least_recently_used_entries_are_evicted_to_90_percent(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=1000)
+    for i in range(5):
+        clock[0] += 1
+        cache.put(f"k{i}", "m", "x" * 200, USAGE)
+    # Reading k0 makes it the most recently used entry
+    clock[0] += 1
+    assert cache.get("k0") is not None
+    clock[0] += 1
+    cache.put("k5", "m", "x" * 200, USAGE)
+    # 1200 bytes exceed the cap: the oldest entries go until at most 900 bytes remain
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert all(cache.get(f"k{i}") is not None for i in (0, 3, 4, 5))
+    assert cache.stats()['bytes'] == 800
+
+def test_expired_entries_are_misses_and_dropped(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), max_age_seconds=60)
+    cache.put("old", "m", "stale", USAGE)
+    clock[0] += 30
+    cache.put("new", "m", "fresh", USAGE)
+    clock[0] += 40
+    assert cache.get("old") is None
+    assert cache.get("new")['content'] == "fresh"
+    assert cache.stats()['entries'] == 1
+
+def test_tally_counts_one_run():
+    tally = CacheTally()
+    for cached in (True, True, False):
+        tally.record(cached)
+    assert tally.stats() == {'hits': 2, 'misses': 1, 'hit_rate': pytest.approx(2 / 3)}
+    line = format_cache_stats({'hits': 100, 'misses': 100, 'hit_rate': 0.5, 'entries': 3, 'bytes': 2000000}, tally)
+    assert line == "LLM cache: 2 hits / 1 misses (67% hit rate), 3 entries, 2.0 MB"
@@ -0,0 +1,154 @@
+import json
+import numpy as np
+import pytest
+from src.core.local_vector_store import LocalVectorPartition, LocalVectorStore
+
+DIM = 16
+
+def _vectors(n, seed=0, files=('a.py', 'b.py', 'c.py')):
+    rng = np.random.default_rng(seed)
+    return [
+        {'id': f"c{i}", 'values': rng.standard_normal(DIM).tolist(),
+         'metadata': {'file': files[i % len(files)], 'name': f"f{i}", 'type': 'FunctionDef'}}
+        for i in range(n)
+    ]
+
+def _exact_top(vectors, query, top_k, keep=lambda v: True):
+    """Reference cosine top_k by brute force."""
+    q = np.asarray(query) / np.linalg.norm(query)
+    scored = [(float(np.dot(v['values'], q) / np.linalg.norm(v['values'])), v['id']) for v in vectors if keep(v)]
+    return [vector_id for _, vector_id in sorted(scored, reverse=True)[:top_k]]
+
+def test_query_returns_nearest_vectors_best_first():
+    vectors = _vectors(200)
+    partition = LocalVectorPartition(DIM)
+    partition.upsert(vectors)
+    query = np.random.default_rng(1).standard_normal(DIM)
+    results = partition.query(query.tolist(), top_k=5)
+    assert [r['id'] for r in results] == _exact_top(vectors, query, 5)
+    assert [r['score'] for r in results] == sorted((r['score'] for r in results), reverse=True)
+    assert results[0]['metadata'] == next(v['metadata'] for v in vectors if v['id'] == results[0]['id'])
+
+def test_upsert_replaces_existing_ids():
+    partition = LocalVectorPartition(DIM)
+    vectors = _vectors(10)
+    partition.upsert(vectors)
+    replaced = dict(vectors[3], values=vectors[7]['values'], metadata={'file': 'new.py'})
+    partition.upsert([replaced])
+    assert len(partition) == 10
+    results = partition.query(vectors[7]['values'], top_k=2)
+    assert {r['id'] for r in results} == {'c3', 'c7'}
+    assert partition.query(vectors[7]['values'], top_k=1, filter={'file': 'new.py'})[0]['id'] == 'c3'
+
+def test_delete_removes_vectors_and_keeps_others_searchable():
+    vectors = _vectors(50)
+    partition = LocalVectorPartition(DIM)
+    partition.upsert(vectors)
+    partition.delete(['c0', 'c10', 'missing'])
+    assert len(partition) == 48
+    remaining = [v for v in vectors if v['id'] not in ('c0', 'c10')]
+    for v in remaining[::7]:
+        assert partition.query(v['values'], top_k=1)[0]['id'] == v['id']
+    assert all(r['id'] not in ('c0', 'c10') for r in partition.query(vectors[0]['values'], top_k=50))
+
+@pytest.mark.parametrize("filter", [
+    {'file': 'a.py'},
+    {'file': {'$in': ['a.py', 'c.py']}},
+    {'file': {'$nin': ['a.py']}},
+    {'file': {'$in': ['b.py']}, 'name': {'$ne': 'f1'}},
+    {'file': 'nowhere.py'},
+])
+def test_filtered_query_only_returns_matching_vectors(filter):
+    from src.core.vector_store import matches_filter
+    vectors = _vectors(90)
+    partition = LocalVectorPartition(DIM)
+    partition.upsert(vectors)
+    partition.delete(['c1', 'c2'])
+    vectors = [v for v in vectors if v['id'] not in ('c1', 'c2')]
+    query = np.random.default_rng(2).standard_normal(DIM)
+    results = partition.query(query.tolist(), top_k=10, filter=filter)
+    assert [r['id'] for r in results] == _exact_top(vectors, query, 10, lambda v: matches_filter(v['metadata'], filter))
+
+def test_flush_and_reload(tmp_path):
+    path = str(tmp_path / "ns" / "index")
+    vectors = _vectors(30)
+    partition = LocalVectorPartition(DIM, path=path)
+    partition.upsert(vectors)
+    partition.delete(['c5'])
+    partition.flush()
+    assert not list(tmp_path.glob("ns/*.tmp"))
+
+    reloaded = LocalVectorPartition(DIM, path=path)
+    assert len(reloaded) == 29
+    query = vectors[8]['values']
+    assert [r['id'] for r in reloaded.query(query, top_k=5)] == [r['id'] for r in partition.query(query, top_k=5)]
+    assert reloaded.query(query, top_k=30, filter={'file': 'c.py'})
+    assert reloaded.fetch(['c8', 'c5']).keys() == {'c8'}
+
+def test_reload_rejects_inconsistent_files(tmp_path):
+    path = str(tmp_path / "index")
+    partition = LocalVectorPartition(DIM, path=path)
+    partition.upsert(_vectors(5))
+    partition.flush()
+    with open(path + ".json", encoding='utf-8') as f:
+        state = json.load(f)
+    state['ids'].pop()
+    with open(path + ".json", 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    with pytest.raises(ValueError):
+        LocalVectorPartition(DIM, path=path)
+
+@pytest.mark.parametrize("storage, search_dims", [('float16', None), ('int8', None), ('float32', 8)])
+def test_compact_storage_reranks_exactly(tmp_path, storage, search_dims):
+    vectors = _vectors(300)
+    partition = LocalVectorPartition(DIM, path=str(tmp_path / "index"), storage=storage, search_dims=search_dims)
+    partition.upsert(vectors)
+    query = vectors[42]['values']
+    assert partition.query(query, top_k=1)[0]['id'] == 'c42'
+    assert partition.query(query, top_k=1)[0]['score'] == pytest.approx(1.0, abs=1e-5)
+
+def test_ann_index_is_built_and_used():
+    vectors = _vectors(400)
+    partition = LocalVectorPartition(DIM, ann_min_vectors=100, n_probe=64)
+    partition.upsert(vectors[:50])
+    assert partition.ann is None
+    partition.upsert(vectors[50:])
+    partition.build_ann()
+    assert partition.ann is not None
+    for v in vectors[::40]:
+        assert partition.query(v['values'], top_k=1)[0]['id'] == v['id']
+
+def test_failed_ann_build_does_not_block_rebuilds(monkeypatch):
+    from src.core import ann_index
+    partition = LocalVectorPartition(DIM, ann_min_vectors=10 ** 9)
+    partition.upsert(_vectors(50))
+
+    def fail(self, vectors):
+        raise RuntimeError("training failed")
+
+    monkeypatch.setattr(ann_index.IVFIndex, 'train', fail)
+    with pytest.raises(RuntimeError):
+        partition.build_ann()
+    assert partition._ann_pending is None and partition._ann_builds == 0
+    monkeypatch.undo()
+    partition.build_ann()
+    assert partition.ann is not None
+
+def test_store_keeps_namespaces_apart(tmp_path):
+    store = LocalVectorStore(DIM, path=str(tmp_path))
+    vectors = _vectors(10)
+    store.upsert(vectors[:5], namespace="one")
+    store.upsert(vectors[5:], namespace="two")
+    assert {r['id'] for r in store.query(vectors[0]['values'], top_k=10, namespace="one")} == {f"c{i}" for i in range(5)}
+    assert store.query(vectors[0]['values'], namespace="missing") == []
+    store.flush()
+    store.delete_namespace("one")
+    assert store.query(vectors[0]['values'], namespace="one") == []
+    assert LocalVectorStore(DIM, path=str(tmp_path)).query(vectors[5]['values'], top_k=1, namespace="two")[0]['id'] == 'c5'
+
+def test_store_upsert_reports_one_batch():
+    store = LocalVectorStore(DIM)
+    reports = store.upsert(_vectors(7), namespace="one")
+    assert len(reports) == 1
+    assert reports[0]['vectors'] == 7 and reports[0]['error'] is None and reports[0]['bytes'] > 0
+    assert store.upsert([], namespace="one") == []
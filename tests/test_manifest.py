@@ -0,0 +1,77 @@
+import json
+import pytest
+from src.core import manifest as manifest_module
+from src.core.content_store import get_content_store
+from src.core.manifest import Manifest
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_module, "MANIFEST_DIR", str(tmp_path / "manifests"))
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "a.py").write_text("def f():\n    return 1\n\ndef g():\n    return 2\n")
+    (source / "b.py").write_text("class C:\n    pass\n")
+    return source
+
+def _ingest(source, scope, full_snapshot=True):
+    """Run one ingest like the UI: index changed chunks, commit and save."""
+    manifest = Manifest.load(scope)
+    chunks = list(manifest.iter_chunks(str(source)))
+    changed = [chunk['id'] for chunk in chunks if manifest.is_changed(chunk)]
+    get_content_store().put_many(scope, chunks)
+    removed = manifest.commit(full_snapshot)
+    manifest.save()
+    return chunks, changed, removed
+
+def test_unchanged_files_are_replayed_without_parsing(project, monkeypatch, capsys):
+    chunks, changed, removed = _ingest(project, "scope_a")
+    assert sorted(changed) == ['a.py::f', 'a.py::g', 'b.py::C'] and removed == []
+
+    def no_parsing(source_dir, workers, paths):
+        assert paths == [], "unchanged files were parsed"
+        return iter([])
+
+    monkeypatch.setattr(manifest_module, "iter_file_chunks", no_parsing)
+    replayed, changed, removed = _ingest(project, "scope_a")
+    assert "0 of 2 files changed" in capsys.readouterr().out
+    assert sorted(replayed, key=lambda c: c['id']) == sorted(chunks, key=lambda c: c['id'])
+    assert changed == [] and removed == []
+
+def test_changed_chunks_and_removed_ids(project):
+    _ingest(project, "scope_a")
+    (project / "a.py").write_text("def f():\n    return 10\n")
+    (project / "b.py").unlink()
+    (project / "c.py").write_text("def h():\n    pass\n")
+    _, changed, removed = _ingest(project, "scope_a")
+    assert sorted(changed) == ['a.py::f', 'c.py::h']
+    assert removed == ['a.py::g', 'b.py::C']
+
+def test_partial_upload_keeps_files_not_seen(project, tmp_path):
+    _ingest(project, "scope_a")
+    other = tmp_path / "upload"
+    other.mkdir()
+    (other / "b.py").write_text("class D:\n    pass\n")
+    _, changed, removed = _ingest(other, "scope_a", full_snapshot=False)
+    assert changed == ['b.py::D'] and removed == ['b.py::C']
+    assert set(Manifest.load("scope_a").files) == {'a.py', 'b.py'}
+
+def test_saved_manifest_holds_no_code(project):
+    _ingest(project, "scope_a")
+    with open(Manifest.path_for("scope_a"), encoding='utf-8') as f:
+        data = json.load(f)
+    assert 'return 1' not in json.dumps(data)
+    assert data['files']['b.py']['chunks'] == [{'id': 'b.py::C', 'sha256': data['chunks']['b.py::C'], 'name': 'C', 'type': 'ClassDef'}]
+
+def test_missing_stored_code_falls_back_to_parsing(project):
+    chunks, _, _ = _ingest(project, "scope_a")
+    get_content_store().delete_namespace("scope_a")
+    replayed, changed, _ = _ingest(project, "scope_a")
+    assert sorted(replayed, key=lambda c: c['id']) == sorted(chunks, key=lambda c: c['id']) and changed == []
+
+def test_outdated_or_corrupt_manifest_starts_empty(project, monkeypatch):
+    _ingest(project, "scope_a")
+    monkeypatch.setattr(manifest_module, "MANIFEST_VERSION", manifest_module.MANIFEST_VERSION + 1)
+    assert Manifest.load("scope_a").files == {}
+    with open(Manifest.path_for("scope_b"), 'w', encoding='utf-8') as f:
+        f.write("{broken")
+    assert Manifest.load("scope_b").files == {}
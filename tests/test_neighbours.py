@@ -0,0 +1,63 @@
+import re
+import numpy as np
+import pytest
+from src.core import embeddings, neighbours
+from src.core.local_vector_store import LocalVectorStore
+from src.core.neighbours import compute_neighbours
+
+DIM = 8
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Local vector store serving the embeddings; embedding a chunk again is an error."""
+    store = LocalVectorStore(DIM, path=str(tmp_path / "vectors"))
+    monkeypatch.setattr(embeddings, "get_vector_store", lambda: store)
+    monkeypatch.setattr(embeddings, "embed_texts", lambda texts: pytest.fail("chunk was re-embedded"))
+    monkeypatch.setattr(neighbours, "NEIGHBOUR_DIR", str(tmp_path / "neighbours"))
+    # Small blocks exercise the blocked products
+    monkeypatch.setattr(neighbours, "_NEIGHBOUR_BLOCK", 16)
+    return store
+
+def _upsert(store, chunks, vectors):
+    store.upsert([{'id': c['id'], 'values': vectors[c['id']].tolist(), 'metadata': {}} for c in chunks], "ns")
+
+def _exact(chunks, vectors, k):
+    """Reference neighbour ids by brute force."""
+    unit = {i: v / np.linalg.norm(v) for i, v in vectors.items()}
+    result = {}
+    for c in chunks:
+        scored = sorted(((float(unit[c['id']] @ unit[o['id']]), o['id']) for o in chunks if o is not c), reverse=True)
+        result[c['id']] = [other for _, other in scored[:k]]
+    return result
+
+def _rows_computed(capsys):
+    return int(re.search(r"for (\d+) of", capsys.readouterr().out).group(1))
+
+def test_incremental_update_matches_brute_force_and_recomputes_few_rows(store, capsys):
+    rng = np.random.default_rng(0)
+    chunks = [{'id': f"c{i}", 'code': f"def f{i}(): pass"} for i in range(60)]
+    vectors = {c['id']: rng.standard_normal(DIM) for c in chunks}
+    _upsert(store, chunks, vectors)
+
+    result = compute_neighbours(chunks, top_k=3, namespace="ns")
+    assert {i: [n for n, _ in v] for i, v in result.items()} == _exact(chunks, vectors, 3)
+    assert _rows_computed(capsys) == 60
+
+    # Nothing changed: every row is reused
+    assert compute_neighbours(chunks, top_k=3, namespace="ns") == result
+    assert _rows_computed(capsys) == 0
+
+    # Change two chunks and drop one
+    for i in (5, 17):
+        chunks[i] = {'id': f"c{i}", 'code': f"def g{i}(): pass"}
+        vectors[f"c{i}"] = rng.standard_normal(DIM)
+    _upsert(store, [chunks[5], chunks[17]], vectors)
+    del chunks[30]
+    result = compute_neighbours(chunks, top_k=3, namespace="ns")
+    assert {i: [n for n, _ in v] for i, v in result.items()} == _exact(chunks, {c['id']: vectors[c['id']] for c in chunks}, 3)
+    assert 2 <= _rows_computed(capsys) < 30
+
+def test_without_namespace_nothing_is_recorded(store, tmp_path):
+    chunks = [{'id': 'a', 'code': "a"}]
+    assert compute_neighbours(chunks) == {'a': []}
+    assert not (tmp_path / "neighbours").exists()
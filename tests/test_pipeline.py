@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from src.core import pipeline
+from src.core.pipeline import format_pipeline_stats, run_ingest_pipeline
+from src.core.vector_store import UpsertError, VectorStore
+
+class RecordingStore(VectorStore):
+    """Vector store recording upsert calls; ids listed in fail_once fail their first upsert."""
+
+    def __init__(self, fail_once=()):
+        self.calls = []
+        self.fail_once = set(fail_once)
+        self.release = threading.Event()
+        self.release.set()
+
+    def upsert(self, vectors, namespace=""):
+        self.release.wait()
+        self.calls.append([v['id'] for v in vectors])
+        failed = [v for v in vectors if v['id'] in self.fail_once]
+        self.fail_once -= {v['id'] for v in failed}
+        reports = [{'vectors': len(vectors), 'bytes': 0, 'seconds': 0.0, 'error': RuntimeError("503") if failed else None}]
+        if failed:
+            raise UpsertError("1 of 1 upsert batches failed", failed, reports)
+        return reports
+
+@pytest.fixture
+def store(monkeypatch):
+    store = RecordingStore()
+    monkeypatch.setattr(pipeline, "get_vector_store", lambda: store)
+    monkeypatch.setattr(pipeline, "embed_texts", lambda texts: [[float(len(t)), 1.0] for t in texts])
+    return store
+
+def _chunks(n):
+    return [{'id': f"c{i}", 'code': f"def f{i}(): pass", 'metadata': {'file': 'a.py', 'name': f"f{i}", 'type': 'FunctionDef'}}
+            for i in range(n)]
+
+def test_every_indexed_chunk_is_upserted_in_parse_order(store):
+    seen = []
+    stats = run_ingest_pipeline(iter(_chunks(250)), on_chunk=lambda c: seen.append(c['id']),
+                                should_index=lambda c: int(c['id'][1:]) % 5 != 0, namespace="ns", batch_size=20)
+    assert seen == [f"c{i}" for i in range(250)]
+    assert [i for call in store.calls for i in call] == [f"c{i}" for i in range(250) if i % 5]
+    assert (stats['parse']['items'], stats['embed']['items'], stats['upsert']['items']) == (250, 200, 200)
+
+def test_parsing_is_held_back_by_a_slow_upsert(store):
+    consumed = []
+
+    def chunks():
+        for chunk in _chunks(1000):
+            consumed.append(chunk['id'])
+            yield chunk
+
+    store.release.clear()
+    thread = threading.Thread(target=run_ingest_pipeline, args=(chunks(),),
+                              kwargs={'batch_size': 10, 'queue_size': 2, 'upsert_max_vectors': 10})
+    thread.start()
+    time.sleep(0.5)
+    # Two queues of two batches, one batch in each stage and the one being built
+    assert len(consumed) <= (2 * 2 + 3) * 10
+    store.release.set()
+    thread.join(timeout=10)
+    assert len(consumed) == 1000
+
+def test_failed_batches_are_resent_and_counted(store):
+    store.fail_once = {'c3', 'c45'}
+    stats = run_ingest_pipeline(iter(_chunks(60)), batch_size=10, upsert_max_vectors=10)
+    assert sorted({i for call in store.calls for i in call}) == sorted(f"c{i}" for i in range(60))
+    assert ['c3'] in store.calls and ['c45'] in store.calls
+    assert (stats['upsert']['batches'], stats['upsert']['failed_batches']) == (8, 2)
+    assert "2 of 8 batches failed" in format_pipeline_stats(stats)
+
+def test_parse_errors_stop_the_pipeline(store):
+    def chunks():
+        yield from _chunks(5)
+        raise ValueError("bad file")
+
+    with pytest.raises(ValueError):
+        run_ingest_pipeline(chunks(), batch_size=2)
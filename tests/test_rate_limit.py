@@ -0,0 +1,91 @@
+import threading
+import time
+import pytest
+from src.core import rate_limit
+from src.core.rate_limit import TokenBucket, is_transient_error, retry_with_backoff, run_concurrently
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock advanced by time.sleep instead of waiting."""
+    now = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit.time, "sleep", sleep)
+    return sleeps
+
+def test_transient_errors():
+    assert is_transient_error(ConnectionError())
+    assert is_transient_error(TimeoutError())
+    assert is_transient_error(StatusError(503)) and is_transient_error(StatusError("429"))
+    assert not is_transient_error(StatusError(400))
+    assert not is_transient_error(ValueError("bad input"))
+
+def test_retry_until_success_with_growing_delay_ceilings(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 4:
+            raise StatusError(503)
+        return "ok"
+
+    assert retry_with_backoff(flaky, base_delay=1.0, max_delay=3.0) == "ok"
+    assert clock == [1.0, 2.0, 3.0]
+
+def test_retry_gives_up(clock):
+    calls = []
+
+    def failing(error):
+        def fn():
+            calls.append(error)
+            raise error
+        return fn
+
+    with pytest.raises(StatusError):
+        retry_with_backoff(failing(StatusError(500)), retries=2)
+    assert len(calls) == 3
+    calls.clear()
+    with pytest.raises(ValueError):
+        retry_with_backoff(failing(ValueError("bad")), retries=2)
+    assert len(calls) == 1
+
+def test_token_bucket_blocks_until_refilled(clock):
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock == []
+    # One token per second
+    bucket.acquire()
+    assert sum(clock) == pytest.approx(1.0)
+    # Requests above the capacity are clipped instead of blocking forever
+    bucket.acquire(10)
+    assert sum(clock) == pytest.approx(3.0)
+
+def test_run_concurrently_keeps_input_order():
+    active = [0, 0]
+    lock = threading.Lock()
+
+    def work(i):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.01 * (5 - i % 5))
+        with lock:
+            active[0] -= 1
+        return i * i
+
+    done = []
+    assert run_concurrently(work, range(10), max_workers=3, on_done=lambda i, r: done.append(i)) == [i * i for i in range(10)]
+    assert done == list(range(10))
+    assert 1 < active[1] <= 3
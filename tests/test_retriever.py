@@ -0,0 +1,30 @@
+from src.core.retriever import RRF_K, fuse_rankings, rank_chunks
+
+def test_fuse_rankings_prefers_results_ranked_high_in_several_lists():
+    a, b, c, d = ({'id': i} for i in "abcd")
+    fused = fuse_rankings([[a, b, c], [b, d, a]], top_k=10)
+    assert [r['id'] for r in fused] == ['b', 'a', 'd', 'c']
+
+def test_fuse_rankings_scores_and_limits():
+    a, b = {'id': 'a', 'source': 1}, {'id': 'b'}
+    fused = fuse_rankings([[a], [b], [{'id': 'a', 'source': 2}]], top_k=1)
+    # a is ranked first twice and beats b; its first occurrence is returned
+    assert fused == [a]
+    assert fuse_rankings([], top_k=5) == []
+
+def test_fuse_rankings_uses_reciprocal_ranks():
+    # x is ranked 1st and 4th, y 2nd twice: with RRF_K = 60, 2/62 > 1/61 + 1/64
+    x, y = {'id': 'x'}, {'id': 'y'}
+    fused = fuse_rankings([[x, y], [{'id': 'f0'}, y, {'id': 'f1'}, x]], top_k=2)
+    assert RRF_K == 60
+    assert [r['id'] for r in fused] == ['y', 'x']
+
+def test_rank_chunks_without_index_uses_a_throwaway_bm25_ranking():
+    chunks = [
+        {'id': 'p', 'code': "def parse_file(path):\n    return ast.parse(path)", 'metadata': {'file': 'a.py', 'name': 'parse_file'}},
+        {'id': 'u', 'code': "def upsert_chunks(chunks):\n    store.upsert(chunks)", 'metadata': {'file': 'a.py', 'name': 'upsert_chunks'}},
+        {'id': 'x', 'code': "X = 1", 'metadata': {'file': 'b.py', 'name': 'b.py'}},
+    ]
+    ranked = rank_chunks("how are chunks upserted?", chunks, top_k=5)
+    # The given chunk objects come back; chunks matching nothing are left out
+    assert ranked == [chunks[1]]
@@ -0,0 +1,61 @@
+import pytest
+from src.core.vector_store import compile_filter, estimate_vector_bytes, matches_filter, pack_upsert_batches
+
+METADATA = {'file': 'src/app.py', 'name': 'main', 'type': 'FunctionDef'}
+
+def _vector(i, dims=4, metadata=None):
+    return {'id': f"v{i}", 'values': [0.1] * dims, 'metadata': metadata or {'file': 'a.py'}}
+
+@pytest.mark.parametrize("filter, expected", [
+    (None, True),
+    ({}, True),
+    ({'file': 'src/app.py'}, True),
+    ({'file': 'other.py'}, False),
+    ({'file': {'$eq': 'src/app.py'}}, True),
+    ({'file': {'$ne': 'src/app.py'}}, False),
+    ({'file': {'$in': ['a.py', 'src/app.py']}}, True),
+    ({'file': {'$in': ['a.py']}}, False),
+    ({'file': {'$nin': ['a.py']}}, True),
+    ({'file': {'$nin': ['src/app.py']}}, False),
+    ({'file': {'$in': ['src/app.py']}, 'type': 'ClassDef'}, False),
+    ({'file': {'$in': ['src/app.py']}, 'type': {'$in': ['FunctionDef', 'ClassDef']}}, True),
+    ({'missing': {'$nin': ['x']}}, True),
+    ({'missing': 'x'}, False),
+])
+def test_matches_filter(filter, expected):
+    assert matches_filter(METADATA, filter) is expected
+
+def test_compiled_filter_matches_like_matches_filter():
+    filter = {'file': {'$in': ['a.py', 'b.py']}, 'type': {'$nin': ['ClassDef']}}
+    matches = compile_filter(filter)
+    for metadata in ({'file': 'a.py', 'type': 'FunctionDef'}, {'file': 'b.py', 'type': 'ClassDef'},
+                     {'file': 'c.py', 'type': 'FunctionDef'}, {}):
+        assert matches(metadata) == matches_filter(metadata, filter)
+
+def test_compile_filter_accepts_unhashable_operands():
+    assert compile_filter({'tags': {'$in': [['a'], ['b']]}})({'tags': ['b']})
+
+def test_unsupported_operator_is_rejected():
+    with pytest.raises(ValueError):
+        matches_filter(METADATA, {'file': {'$gt': 'a'}})
+
+def test_pack_upsert_batches_keeps_order_and_item_limit():
+    vectors = [_vector(i) for i in range(25)]
+    batches = pack_upsert_batches(vectors, max_bytes=10 ** 9, max_items=10)
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert [v for batch in batches for v in batch] == vectors
+
+def test_pack_upsert_batches_respects_byte_limit():
+    vectors = [_vector(i, dims=100) for i in range(10)]
+    size = estimate_vector_bytes(vectors[0])
+    batches = pack_upsert_batches(vectors, max_bytes=3 * size, max_items=1000)
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert all(sum(estimate_vector_bytes(v) for v in batch) <= 3 * size for batch in batches)
+
+def test_pack_upsert_batches_gives_oversized_vector_its_own_batch():
+    small, large = _vector(0), _vector(1, dims=1000)
+    batches = pack_upsert_batches([small, large, small], max_bytes=estimate_vector_bytes(small) * 2)
+    assert batches == [[small], [large], [small]]
+
+def test_pack_upsert_batches_of_nothing():
+    assert pack_upsert_batches([]) == []